@@ -0,0 +1,60 @@
+#!/usr/bin/env bash
+
+# Copyright 2021 Kyoto University (Hirofumi Inaguma)
+#  Apache 2.0  (http://www.apache.org/licenses/LICENSE-2.0)
+
+# Compare WER and RTF of float32 and dynamic int8 quantized models on CPU
+
+model=
+lm=
+stdout=false
+n_threads=1
+eval_set="train"
+cmd_coverage="coverage run -a"
+
+### path to save preproecssed data
+data=./data
+
+batch_size=1
+beam_width=2
+lm_weight=0.5
+ctc_weight=0.0
+n_average=1
+
+. ./cmd.sh
+. ./path.sh
+. utils/parse_options.sh
+
+set -e
+set -u
+set -o pipefail
+
+export OMP_NUM_THREADS=${n_threads}
+
+for set in ${eval_set}; do
+    for quantize in false true; do
+        recog_dir=$(dirname ${model})/decode_${set}_beam${beam_width}_quantize_${quantize}
+        mkdir -p ${recog_dir}
+
+        ${cmd_coverage} ${NEURALSP_ROOT}/neural_sp/bin/asr/eval.py \
+            --recog_n_gpus 0 \
+            --recog_sets ${data}/dataset/${set}_char.tsv \
+            --recog_dir ${recog_dir} \
+            --recog_model ${model} \
+            --recog_batch_size ${batch_size} \
+            --recog_beam_width ${beam_width} \
+            --recog_lm ${lm} \
+            --recog_lm_weight ${lm_weight} \
+            --recog_ctc_weight ${ctc_weight} \
+            --recog_n_average ${n_average} \
+            --recog_quantize ${quantize} \
+            --recog_stdout ${stdout} || exit 1;
+    done
+
+    echo "${set}:"
+    for quantize in false true; do
+        recog_dir=$(dirname ${model})/decode_${set}_beam${beam_width}_quantize_${quantize}
+        echo "  int8 quantization: ${quantize}"
+        grep -h -E "WER|PER|RTF" ${recog_dir}/decode.log | sed -e 's/^.*INFO: /    /'
+    done
+done
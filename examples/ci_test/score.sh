@@ -39,6 +39,7 @@ n_average=2  # for Transformer
 oracle=false
 longform_max_n_frames=0
 mma_delay_threshold=-1  # for MMA
+quantize=false  # dynamic int8 quantization (CPU only)
 
 # for streaming
 streaming_encoding=false
@@ -106,6 +107,9 @@ for set in ${eval_set}; do
     if [ ${mma_delay_threshold} != -1 ]; then
         recog_dir=${recog_dir}_epswait${mma_delay_threshold}
     fi
+    if [ ${quantize} = true ]; then
+        recog_dir=${recog_dir}_int8
+    fi
     if [ ! -z ${model3} ]; then
         recog_dir=${recog_dir}_ensemble4
     elif [ ! -z ${model2} ]; then
@@ -149,5 +153,6 @@ for set in ${eval_set}; do
         --recog_ctc_vad_blank_threshold ${blank_threshold} \
         --recog_ctc_vad_spike_threshold ${spike_threshold} \
         --recog_ctc_vad_n_accum_frames ${n_accum_frames} \
+        --recog_quantize ${quantize} \
         --recog_stdout ${stdout} || exit 1;
 done
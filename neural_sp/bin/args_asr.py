@@ -9,7 +9,7 @@ import logging
 from omegaconf import OmegaConf
 import os
 
-from neural_sp.bin.train_utils import load_config
+from neural_sp.bin.train_utils import load_model_config
 from neural_sp.bin.args_common import add_args_common
 
 ENCODER_TYPES = ['blstm', 'lstm', 'bgru', 'gru',
@@ -60,7 +60,7 @@ def parse_args_eval(input_args):
 
     # Load a yaml config file
     dir_name = os.path.dirname(user_args.recog_model[0])
-    config = load_config(os.path.join(dir_name, 'conf.yml'))
+    config = load_model_config(user_args.recog_model[0])
 
     # register module specific arguments to support new args after training
     # encoder
@@ -315,6 +315,15 @@ def build_parser():
                         help='Teacher LM for knowledge distillation')
     parser.add_argument('--distillation_weight', type=float, default=0.1,
                         help='soft label weight for knowledge distillation')
+    # attention plotting during training
+    parser.add_argument('--plot_attention_layers', type=str, default="",
+                        help='indices of layers to plot attention weights, separated by "_". Empty for all layers')
+    parser.add_argument('--plot_attention_heads', type=str, default="",
+                        help='indices of heads to plot attention weights, separated by "_". Empty for all heads')
+    parser.add_argument('--plot_attention_utt_ids', type=str, default="0",
+                        help='indices of utterances in a dev mini-batch to plot attention weights, separated by "_"')
+    parser.add_argument('--plot_attention_max_len', type=int, default=256,
+                        help='maximum length of each axis of attention maps after downsampling')
     # special label
     parser.add_argument('--replace_sos', type=strtobool, default=False,
                         help='')
@@ -323,6 +332,15 @@ def build_parser():
                         help='word alignment directory paths for the evaluation sets')
     parser.add_argument('--recog_first_n_utt', type=int, default=-1,
                         help='recognize the first N utterances for quick evaluation')
+    parser.add_argument('--recog_batch_size_type', type=str, default='seq',
+                        choices=['seq', 'padded_frame'],
+                        help='type of batch size counting in evaluation. padded_frame: recog_batch_size is the number of input frames including padding, and utterances are sorted by input length')
+    parser.add_argument('--recog_n_jobs', type=int, default=1,
+                        help='number of CPU processes for parallel evaluation (utterances are sharded)')
+    parser.add_argument('--recog_n_threads', type=int, default=0,
+                        help='number of threads per process in parallel evaluation (0: divide all cores equally)')
+    parser.add_argument('--recog_quantize', type=strtobool, default=False,
+                        help='apply dynamic int8 quantization to linear/LSTM layers of ASR models and LMs (CPU only)')
     parser.add_argument('--recog_model_bwd', type=str, default=False, nargs='?',
                         help='model path in the reverse direction')
     parser.add_argument('--recog_unit', type=str, default=False, nargs='?',
@@ -362,6 +380,8 @@ def build_parser():
                                   First-pass backward LM in case of synchronous bidirectional decoding.')
     parser.add_argument('--recog_cache_embedding', type=strtobool, default=True,
                         help='cache token emebdding')
+    parser.add_argument('--recog_cache_encoder_outputs', type=strtobool, default=True,
+                        help='reuse encoder outputs of the same utterances across tasks and decoding calls')
     parser.add_argument('--recog_ctc_weight', type=float, default=0.0,
                         help='weight of CTC score')
     parser.add_argument('--recog_lm', type=str, default=False, nargs='?',
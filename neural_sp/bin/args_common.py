@@ -30,6 +30,8 @@ def add_args_common(parser):
                         help='print to standard output during training')
     parser.add_argument('--remove_old_checkpoints', type=strtobool, default=True,
                         help='remove old checkpoints to save disk (turned off when training Transformer')
+    parser.add_argument('--async_checkpoint', type=strtobool, default=False,
+                        help='save checkpoints on a background thread to overlap serialization with training')
     parser.add_argument('--use_wandb', type=strtobool, default=False,
                         help='use wandb for reporting')
     parser.add_argument('--seed', type=int, default=1,
@@ -9,7 +9,7 @@ import logging
 from omegaconf import OmegaConf
 import os
 
-from neural_sp.bin.train_utils import load_config
+from neural_sp.bin.train_utils import load_model_config
 from neural_sp.bin.args_common import add_args_common
 
 logger = logging.getLogger(__name__)
@@ -39,7 +39,7 @@ def parse_args_eval(input_args):
 
     # Load a yaml config file
     dir_name = os.path.dirname(user_args.recog_model[0])
-    config = load_config(os.path.join(dir_name, 'conf.yml'))
+    config = load_model_config(user_args.recog_model[0])
 
     # register module specific arguments to support new args after training
     parser = register_args_lm(parser, user_args, config.lm_type)
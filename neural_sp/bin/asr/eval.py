@@ -11,14 +11,17 @@ import logging
 import os
 import sys
 import time
+import torch
 
 from neural_sp.bin.args_asr import parse_args_eval
 from neural_sp.bin.eval_utils import (
     average_checkpoints,
-    load_lm
+    is_inference_checkpoint,
+    load_lm,
+    save_averaged_checkpoint
 )
 from neural_sp.bin.train_utils import (
-    load_config,
+    load_model_config,
     set_logger
 )
 from neural_sp.datasets.asr.build import build_dataloader
@@ -26,10 +29,16 @@ from neural_sp.evaluators.accuracy import eval_accuracy
 from neural_sp.evaluators.character import eval_char
 from neural_sp.evaluators.phone import eval_phone
 from neural_sp.evaluators.ppl import eval_ppl
+from neural_sp.evaluators.trn import (
+    merge_trn,
+    score_trn
+)
 from neural_sp.evaluators.word import eval_word
 from neural_sp.evaluators.wordpiece import eval_wordpiece
 from neural_sp.evaluators.wordpiece_bleu import eval_wordpiece_bleu
 from neural_sp.models.seq2seq.speech2text import Speech2Text
+from neural_sp.models.torch_utils import quantize_model
+from neural_sp.utils import mkdir_join
 
 logger = logging.getLogger(__name__)
 
@@ -44,40 +53,6 @@ def main():
         os.remove(os.path.join(args.recog_dir, 'decode.log'))
     set_logger(os.path.join(args.recog_dir, 'decode.log'), stdout=args.recog_stdout)
 
-    # Load ASR model
-    model = Speech2Text(args, dir_name)
-    average_checkpoints(model, args.recog_model[0], n_average=args.recog_n_average)
-
-    # Ensemble
-    ensemble_models = [model]
-    if len(args.recog_model) > 1:
-        for recog_model_e in args.recog_model[1:]:
-            conf_e = load_config(os.path.join(os.path.dirname(recog_model_e), 'conf.yml'))
-            args_e = copy.deepcopy(args)
-            for k, v in conf_e.items():
-                if 'recog' not in k:
-                    setattr(args_e, k, v)
-            model_e = Speech2Text(args_e)
-            average_checkpoints(model_e, recog_model_e, n_average=args.recog_n_average)
-            ensemble_models += [model_e]
-
-    # Load LM for shallow fusion
-    if not args.lm_fusion:
-        if args.recog_lm is not None and args.recog_lm_weight > 0:
-            lm = load_lm(args.recog_lm, args.recog_mem_len)
-            if lm.backward:
-                model.lm_bwd = lm
-            else:
-                model.lm_fwd = lm
-
-        # second pass (forward)
-        if args.recog_lm_second is not None and args.recog_lm_second_weight > 0:
-            model.lm_second = load_lm(args.recog_lm_second, args.recog_mem_len)
-
-        # second pass (backward)
-        if args.recog_lm_bwd is not None and args.recog_lm_bwd_weight > 0:
-            model.lm_bwd = load_lm(args.recog_lm_bwd, args.recog_mem_len)
-
     if not args.recog_unit:
         args.recog_unit = args.unit
 
@@ -85,6 +60,7 @@ def main():
     logger.info('recog metric: %s' % args.recog_metric)
     logger.info('recog oracle: %s' % args.recog_oracle)
     logger.info('batch size: %d' % args.recog_batch_size)
+    logger.info('batch size type: %s' % args.recog_batch_size_type)
     logger.info('beam width: %d' % args.recog_beam_width)
     logger.info('min length ratio: %.3f' % args.recog_min_len_ratio)
     logger.info('max length ratio: %.3f' % args.recog_max_len_ratio)
@@ -99,10 +75,19 @@ def main():
     logger.info('LM weight (first-pass): %.3f' % args.recog_lm_weight)
     logger.info('LM weight (second-pass): %.3f' % args.recog_lm_second_weight)
     logger.info('LM weight (backward): %.3f' % args.recog_lm_bwd_weight)
-    logger.info('ensemble: %d' % (len(ensemble_models)))
+    logger.info('ensemble: %d' % (len(args.recog_model)))
     logger.info('ASR decoder state carry over: %s' % (args.recog_asr_state_carry_over))
     logger.info('LM state carry over: %s' % (args.recog_lm_state_carry_over))
     logger.info('model average: %d' % (args.recog_n_average))
+    logger.info('number of jobs: %d' % (args.recog_n_jobs))
+    logger.info('int8 quantization: %s' % (args.recog_quantize))
+
+    if args.recog_n_jobs > 1:
+        eval_parallel(args, dir_name)
+        return
+
+    ensemble_models = load_models(args, dir_name)
+    model = ensemble_models[0]
 
     # GPU setting
     if args.recog_n_gpus >= 1:
@@ -202,5 +187,184 @@ def main():
         print('BLEU (avg.): %.3f' % (bleu / len(args.recog_sets)))
 
 
+def load_models(args, dir_name):
+    """Load ASR models (and LMs for shallow fusion).
+
+    Args:
+        args (omegaconf.dictconfig.DictConfig): configuration
+        dir_name (str): directory of the main model
+    Returns:
+        ensemble_models (List): ASR models, the first of which is the main model
+
+    """
+    # NOTE: inference checkpoints exported with int8 quantization are quantized on CPU only
+    quantize = args.recog_n_gpus == 0
+
+    # Load ASR model
+    model = Speech2Text(args, dir_name)
+    average_checkpoints(model, args.recog_model[0], n_average=args.recog_n_average, quantize=quantize)
+
+    # Ensemble
+    ensemble_models = [model]
+    if len(args.recog_model) > 1:
+        for recog_model_e in args.recog_model[1:]:
+            conf_e = load_model_config(recog_model_e)
+            args_e = copy.deepcopy(args)
+            for k, v in conf_e.items():
+                if 'recog' not in k:
+                    setattr(args_e, k, v)
+            model_e = Speech2Text(args_e)
+            average_checkpoints(model_e, recog_model_e, n_average=args.recog_n_average, quantize=quantize)
+            ensemble_models += [model_e]
+
+    # Load LM for shallow fusion
+    if not args.lm_fusion:
+        if args.recog_lm is not None and args.recog_lm_weight > 0:
+            lm = load_lm(args.recog_lm, args.recog_mem_len, quantize=quantize)
+            if lm.backward:
+                model.lm_bwd = lm
+            else:
+                model.lm_fwd = lm
+
+        # second pass (forward)
+        if args.recog_lm_second is not None and args.recog_lm_second_weight > 0:
+            model.lm_second = load_lm(args.recog_lm_second, args.recog_mem_len, quantize=quantize)
+
+        # second pass (backward)
+        if args.recog_lm_bwd is not None and args.recog_lm_bwd_weight > 0:
+            model.lm_bwd = load_lm(args.recog_lm_bwd, args.recog_mem_len, quantize=quantize)
+
+    # Dynamic int8 quantization (including LMs registered as submodules)
+    if args.recog_quantize:
+        if args.recog_n_gpus > 0:
+            raise ValueError('Quantized models are supported on CPU only.')
+        for m in ensemble_models:
+            quantize_model(m)
+
+    return ensemble_models
+
+
+def eval_shard(args, dir_name, shard_id, n_threads):
+    """Decode a shard of every evaluation set and write shard trn files.
+
+    Args:
+        args (omegaconf.dictconfig.DictConfig): configuration
+        dir_name (str): directory of the main model
+        shard_id (int): index of the shard
+        n_threads (int): number of intra-op threads for this worker
+    Returns:
+        results (List[tuple]): elapsed time and number of frames of each evaluation set
+
+    """
+    torch.set_num_threads(n_threads)
+    set_logger(mkdir_join(args.recog_dir, 'shard%d' % shard_id, 'decode.log'),
+               stdout=args.recog_stdout)
+    ensemble_models = load_models(args, dir_name)
+
+    results = []
+    for s in args.recog_sets:
+        dataloader = build_dataloader(args=args,
+                                      tsv_path=s,
+                                      batch_size=1,
+                                      is_test=True,
+                                      first_n_utterances=args.recog_first_n_utt,
+                                      shard_id=shard_id,
+                                      n_shards=args.recog_n_jobs)
+        save_dir = os.path.join(args.recog_dir, 'shard%d' % shard_id, dataloader.set)
+
+        start_time = time.time()
+        if args.recog_unit in ['word', 'word_char']:
+            eval_word(ensemble_models, dataloader, args, save_dir=save_dir,
+                      edit_distance=False)
+        elif args.recog_unit == 'wp':
+            eval_wordpiece(ensemble_models, dataloader, args, save_dir=save_dir,
+                           edit_distance=False)
+        elif 'char' in args.recog_unit:
+            eval_char(ensemble_models, dataloader, args, save_dir=save_dir,
+                      task_idx=0, edit_distance=False)
+        elif 'phone' in args.recog_unit:
+            eval_phone(ensemble_models, dataloader, args, save_dir=save_dir,
+                       edit_distance=False)
+        else:
+            raise ValueError(args.recog_unit)
+        results.append((time.time() - start_time, int(dataloader.n_frames)))
+
+    return results
+
+
+def eval_parallel(args, dir_name):
+    """Evaluate with multiple CPU processes.
+
+    Utterances are assigned to args.recog_n_jobs shards in a round-robin manner.
+    Each worker loads its own copy of the models and writes hyp/ref trn files of its shard.
+    The shard trn files are merged in the original utterance order and then scored.
+
+    Args:
+        args (omegaconf.dictconfig.DictConfig): configuration
+        dir_name (str): directory of the main model
+
+    """
+    if args.recog_metric != 'edit_distance':
+        raise NotImplementedError(args.recog_metric)
+    if args.recog_n_gpus > 0:
+        raise ValueError('Parallel evaluation is supported on CPU only.')
+    if args.recog_streaming or args.recog_block_sync or args.recog_longform_max_n_frames > 0:
+        raise ValueError('Parallel evaluation does not support streaming or long-form decoding.')
+
+    n_jobs = args.recog_n_jobs
+    n_threads = args.recog_n_threads
+    if n_threads <= 0:
+        n_threads = max(1, os.cpu_count() // n_jobs)
+    logger.info('number of threads per job: %d' % n_threads)
+
+    # average checkpoints once here, then each worker loads the averaged one
+    if args.recog_n_average > 1:
+        for recog_model in args.recog_model:
+            if 'avg' not in recog_model and not is_inference_checkpoint(recog_model):
+                save_averaged_checkpoint(recog_model, args.recog_n_average)
+
+    ctx = torch.multiprocessing.get_context('spawn')
+    start_time = time.time()
+    with ctx.Pool(n_jobs) as pool:
+        results = pool.starmap(eval_shard,
+                               [(args, dir_name, shard_id, n_threads) for shard_id in range(n_jobs)],
+                               chunksize=1)
+    logger.info('Total elapsed time: %.3f [sec]' % (time.time() - start_time))
+
+    wer_avg, cer_avg = 0, 0
+    for i, s in enumerate(args.recog_sets):
+        set_name = os.path.basename(s).split('.')[0]
+        for trn in ['ref.trn', 'hyp.trn']:
+            merge_trn([os.path.join(args.recog_dir, 'shard%d' % shard_id, set_name, trn)
+                       for shard_id in range(n_jobs)],
+                      os.path.join(args.recog_dir, trn))
+
+        if 'phone' in args.recog_unit:
+            wer, _ = score_trn(os.path.join(args.recog_dir, 'ref.trn'),
+                               os.path.join(args.recog_dir, 'hyp.trn'),
+                               args.recog_unit, args.corpus)
+            logger.info('PER (%s): %.2f %%' % (set_name, wer))
+        else:
+            wer, cer = score_trn(os.path.join(args.recog_dir, 'ref.trn'),
+                                 os.path.join(args.recog_dir, 'hyp.trn'),
+                                 args.recog_unit, args.corpus)
+            logger.info('WER / CER (%s): %.2f / %.2f %%' % (set_name, wer, cer))
+        wer_avg += wer
+        cer_avg += cer if 'phone' not in args.recog_unit else 0
+
+        # NOTE: workers run concurrently, so the slowest one determines the wall-clock time
+        elapsed_times = [results[shard_id][i][0] for shard_id in range(n_jobs)]
+        n_frames = sum([results[shard_id][i][1] for shard_id in range(n_jobs)])
+        logger.info('Elapsed time: %.3f [sec]' % max(elapsed_times))
+        logger.info('RTF: %.3f' % (max(elapsed_times) / (n_frames * 0.01)))
+        logger.info('RTF (per job): %.3f' % (sum(elapsed_times) / (n_frames * 0.01)))
+
+    if 'phone' in args.recog_unit:
+        logger.info('PER (avg.): %.2f %%\n' % (wer_avg / len(args.recog_sets)))
+    else:
+        logger.info('WER / CER (avg.): %.2f / %.2f %%\n' %
+                    (wer_avg / len(args.recog_sets), cer_avg / len(args.recog_sets)))
+
+
 if __name__ == '__main__':
     main()
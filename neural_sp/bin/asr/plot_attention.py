@@ -19,7 +19,7 @@ from neural_sp.bin.eval_utils import (
 )
 from neural_sp.bin.plot_utils import plot_attention_weights
 from neural_sp.bin.train_utils import (
-    load_config,
+    load_model_config,
     set_logger
 )
 from neural_sp.datasets.asr.build import build_dataloader
@@ -47,7 +47,7 @@ def main():
     ensemble_models = [model]
     if len(args.recog_model) > 1:
         for recog_model_e in args.recog_model[1:]:
-            conf_e = load_config(os.path.join(os.path.dirname(recog_model_e), 'conf.yml'))
+            conf_e = load_model_config(recog_model_e)
             args_e = copy.deepcopy(args)
             for k, v in conf_e.items():
                 if 'recog' not in k:
@@ -44,6 +44,10 @@ from neural_sp.models.data_parallel import (
 )
 from neural_sp.models.lm.build import build_lm
 from neural_sp.models.seq2seq.speech2text import Speech2Text
+from neural_sp.trainers.attention_capture import (
+    AttentionCapture,
+    AttentionPlotter
+)
 from neural_sp.trainers.lr_scheduler import LRScheduler
 from neural_sp.trainers.optimizer import set_optimizer
 from neural_sp.trainers.reporter import Reporter
@@ -196,7 +200,8 @@ def main(args):
                             model_size=args.get('transformer_enc_d_model', args.get('transformer_dec_d_model', 0)),
                             factor=args.lr_factor,
                             noam=args.optimizer == 'noam',
-                            save_checkpoints_topk=10 if is_transformer else 1)
+                            save_checkpoints_topk=10 if is_transformer else 1,
+                            save_checkpoints_async=args.get('async_checkpoint', False))
 
     if args.resume:
         # Restore the last saved model
@@ -291,6 +296,16 @@ def main(args):
             save_config(args.lm_conf, os.path.join(args.save_path, 'conf_lm.yml'))
         # NOTE: save after reporter for wandb ID
 
+    # Capture attention weights of selected layers/heads/utterances for plotting
+    capture = AttentionCapture(layers=args.get('plot_attention_layers', ''),
+                               heads=args.get('plot_attention_heads', ''),
+                               utt_ids=args.get('plot_attention_utt_ids', '0'),
+                               max_len=args.get('plot_attention_max_len', 256))
+    plotter = None
+    if args.local_rank == 0:
+        capture.attach(model.module)
+        plotter = AttentionPlotter()
+
     # Define tasks
     if args.mtl_per_batch:
         # NOTE: from easier to harder tasks
@@ -323,7 +338,7 @@ def main(args):
     for ep in range(resume_epoch, args.n_epochs):
         train_one_epoch(model, train_set, dev_set, eval_sets,
                         scheduler, reporter, logger, args, amp, scaler,
-                        tasks, teacher, teacher_lm)
+                        tasks, teacher, teacher_lm, capture, plotter)
 
         # Save checkpoint and validate model per epoch
         if reporter.n_epochs + 1 < args.eval_start_epoch:
@@ -375,6 +390,7 @@ def main(args):
         if args.get('mocha_stableemit_start_epoch', 0) == (ep + 1):
             model.module.trigger_stableemit()
 
+    scheduler.wait_checkpoint()
     logger.info('Total time: %.2f hour' % ((time.time() - start_time_train) / 3600))
     reporter.close()
 
@@ -383,7 +399,7 @@ def main(args):
 
 def train_one_epoch(model, train_set, dev_set, eval_sets,
                     scheduler, reporter, logger, args, amp, scaler,
-                    tasks, teacher, teacher_lm):
+                    tasks, teacher, teacher_lm, capture, plotter):
     """Train model for one epoch."""
     if args.local_rank == 0:
         pbar_epoch = tqdm(total=len(train_set))
@@ -459,7 +475,12 @@ def train_one_epoch(model, train_set, dev_set, eval_sets,
         if reporter.n_steps > 0 and reporter.n_steps % print_step == 0:
             # Compute loss in the dev set
             batch_dev = next(iter(dev_set))
-            loss, observation = model(batch_dev, task='all', is_eval=True)
+            # capture attention weights on the dev batch for plotting
+            is_plot_step = args.local_rank == 0 and reporter.n_steps % (print_step * 10) == 0
+            with capture(enabled=is_plot_step):
+                loss, observation = model(batch_dev, task='all', is_eval=True)
+            if is_plot_step:
+                plotter.put(capture.pop(), mkdir_join(args.save_path, 'att_weights'))
             reporter.add_observation(observation, is_eval=True)
             loss_dev = loss.item()
             del loss
@@ -483,7 +504,7 @@ def train_one_epoch(model, train_set, dev_set, eval_sets,
         # Save figures of loss and accuracy
         if args.local_rank == 0 and reporter.n_steps > 0 and reporter.n_steps % (print_step * 10) == 0:
             reporter.snapshot()
-            model.module.plot_attention()
+            model.module.plot_attention()  # NOTE: RNN decoders only
             model.module.plot_ctc()
 
         # Ealuate model every 0.1 epoch during MBR training
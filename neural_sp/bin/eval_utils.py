@@ -10,7 +10,8 @@ import torch
 
 from neural_sp.bin.train_utils import (
     load_checkpoint,
-    load_config
+    load_checkpoint_lazy,
+    load_model_config
 )
 from neural_sp.models.lm.build import build_lm
 
@@ -18,29 +19,65 @@ from neural_sp.models.lm.build import build_lm
 logger = logging.getLogger(__name__)
 
 
-def load_lm(lm_path, mem_len=0):
-    conf_lm = load_config(os.path.join(os.path.dirname(lm_path), 'conf.yml'))
+def load_lm(lm_path, mem_len=0, quantize=False):
+    conf_lm = load_model_config(lm_path)
     args_lm = argparse.Namespace()
     for k, v in conf_lm.items():
         setattr(args_lm, k, v)
     args_lm.recog_mem_len = mem_len
     lm = build_lm(args_lm)
-    load_checkpoint(lm_path, lm)
+    load_checkpoint(lm_path, lm, quantize=quantize)
     lm.backward = args_lm.backward
     return lm
 
 
-def average_checkpoints(model, best_model_path, n_average, topk_list=[]):
-    if n_average == 1:
+def is_inference_checkpoint(checkpoint_path):
+    """Return True if the checkpoint is exported by save_inference_checkpoint."""
+    return 'config' in load_checkpoint_lazy(checkpoint_path)
+
+
+def average_checkpoints(model, best_model_path, n_average, topk_list=[], quantize=False):
+    """Load the averaged parameters of the last (or top-K) checkpoints to the model.
+
+    Args:
+        model (torch.nn.Module): model to load the averaged parameters
+        best_model_path (str): path to the best checkpoint (model.epoch-*) or averaged one (model-avg*)
+        n_average (int): number of checkpoints to average
+        topk_list (List): (epoch, metric)
+        quantize (bool): apply dynamic int8 quantization if the inference checkpoint
+            is exported with it (see `load_checkpoint`)
+    Returns:
+        model (torch.nn.Module):
+
+    """
+    if n_average == 1 or is_inference_checkpoint(best_model_path):
+        load_checkpoint(best_model_path, model, quantize=quantize)
         return model
 
     if 'avg' in best_model_path:
-        checkpoint_avg = torch.load(best_model_path, map_location='cpu')
-        model.load_state_dict(checkpoint_avg['model_state_dict'])
-        return model
+        checkpoint_avg_path = best_model_path
+    else:
+        checkpoint_avg_path = save_averaged_checkpoint(best_model_path, n_average, topk_list)
+    logger.info("=> Loading averaged checkpoint: %s" % checkpoint_avg_path)
+    model.load_state_dict(load_checkpoint_lazy(checkpoint_avg_path)['model_state_dict'])
+    return model
+
+
+def save_averaged_checkpoint(best_model_path, n_average, topk_list=[]):
+    """Average parameters of the last (or top-K) checkpoints and save them as a new checkpoint.
+
+    Checkpoints are loaded one by one and accumulated in float32, so peak memory is
+    about twice the model size regardless of n_average. The averaged checkpoint
+    (model-avg*) is reused as long as it is built from the same checkpoints and is newer than them.
 
-    n_models = 0
-    checkpoint_avg = {'model_state_dict': None}
+    Args:
+        best_model_path (str): path to the best checkpoint (model.epoch-*)
+        n_average (int): number of checkpoints to average
+        topk_list (List): (epoch, metric)
+    Returns:
+        checkpoint_avg_path (str): path to the averaged checkpoint
+
+    """
     if len(topk_list) == 0:
         epoch = int(float(best_model_path.split('model.epoch-')[1]) * 10) / 10
         score = None
@@ -49,30 +86,55 @@ def average_checkpoints(model, best_model_path, n_average, topk_list=[]):
             topk_list = [(i, score) for i in range(epoch, max(0, epoch - n_average - 1), -1)]
         else:
             topk_list = [(epoch, score)]
+    checkpoint_paths = []
     for ep, _ in topk_list:
-        if n_models == n_average:
+        if len(checkpoint_paths) == n_average:
             break
         checkpoint_path = best_model_path.split('model.epoch-')[0] + 'model.epoch-' + str(ep)
         if os.path.isfile(checkpoint_path):
-            logger.info("=> Loading checkpoint (epoch:%d): %s" % (ep, checkpoint_path))
-            checkpoint = torch.load(checkpoint_path, map_location='cpu')
-            if checkpoint_avg['model_state_dict'] is None:
-                # first checkpoint
-                checkpoint_avg['model_state_dict'] = checkpoint['model_state_dict']
-                n_models += 1
-                continue
-            for k, v in checkpoint['model_state_dict'].items():
-                checkpoint_avg['model_state_dict'][k] += v
-            n_models += 1
+            checkpoint_paths.append(checkpoint_path)
+
+    if len(checkpoint_paths) == 0:
+        raise ValueError("No checkpoint found at %s" % best_model_path)
+    checkpoint_names = [os.path.basename(p) for p in checkpoint_paths]
+
+    checkpoint_avg_path = best_model_path.split('model.epoch-')[0] + 'model-avg' + str(n_average)
+    if os.path.isfile(checkpoint_avg_path) and \
+            all([os.path.getmtime(checkpoint_avg_path) >= os.path.getmtime(p) for p in checkpoint_paths]) and \
+            load_checkpoint_lazy(checkpoint_avg_path).get('checkpoint_names') == checkpoint_names:
+        logger.info("=> Reuse the averaged checkpoint: %s" % checkpoint_avg_path)
+        return checkpoint_avg_path
+
+    model_state_dict_avg = None
+    dtypes = {}
+    for checkpoint_path in checkpoint_paths:
+        logger.info("=> Loading checkpoint: %s" % checkpoint_path)
+        model_state_dict = load_checkpoint_lazy(checkpoint_path)['model_state_dict']
+        if model_state_dict_avg is None:
+            # first checkpoint
+            model_state_dict_avg = {}
+            for k, v in model_state_dict.items():
+                dtypes[k] = v.dtype
+                if v.is_floating_point():
+                    model_state_dict_avg[k] = v.to(torch.float32, copy=True)
+                else:
+                    model_state_dict_avg[k] = v.clone()  # e.g., num_batches_tracked in BatchNorm
+        else:
+            for k, v in model_state_dict.items():
+                if v.is_floating_point():
+                    model_state_dict_avg[k].add_(v)
+        del model_state_dict
 
     # take an average
+    n_models = len(checkpoint_paths)
     logger.info('Take average for %d models' % n_models)
-    for k, v in checkpoint_avg['model_state_dict'].items():
-        checkpoint_avg['model_state_dict'][k] /= n_models
-    model.load_state_dict(checkpoint_avg['model_state_dict'])
+    for k, v in model_state_dict_avg.items():
+        if v.is_floating_point():
+            model_state_dict_avg[k] = v.div_(n_models).to(dtypes[k])
 
     # save as a new checkpoint
-    checkpoint_avg_path = best_model_path.split('model.epoch-')[0] + 'model-avg' + str(n_average)
-    if os.path.isfile(checkpoint_avg_path):
-        os.remove(checkpoint_avg_path)
-    torch.save(checkpoint_avg, checkpoint_avg_path)
+    checkpoint_avg_path_tmp = checkpoint_avg_path + '.tmp%d' % os.getpid()
+    torch.save({'model_state_dict': model_state_dict_avg,
+                'checkpoint_names': checkpoint_names}, checkpoint_avg_path_tmp)
+    os.replace(checkpoint_avg_path_tmp, checkpoint_avg_path)  # atomic
+    return checkpoint_avg_path
@@ -35,7 +35,7 @@ def main():
 
     # Load the LM
     model = build_lm(args)
-    load_checkpoint(args.recog_model[0], model)
+    load_checkpoint(args.recog_model[0], model, quantize=args.recog_n_gpus == 0)
     # NOTE: model averaging is not helpful for LM
 
     logger.info('batch size: %d' % args.recog_batch_size)
@@ -37,7 +37,7 @@ def main():
 
     # Load the LM
     model = build_lm(args, dir_name)
-    load_checkpoint(args.recog_model[0], model)
+    load_checkpoint(args.recog_model[0], model, quantize=args.recog_n_gpus == 0)
     # NOTE: model averaging is not helpful for LM
 
     logger.info('batch size: %d' % args.recog_batch_size)
@@ -79,12 +79,16 @@ def main():
             ys, is_new_epoch = dataset.next()
 
             for t in range(ys.shape[1] - 1):
+                if token_count == n_tokens:
+                    # NOTE: keys are the cache attended by the current token,
+                    # which is registered to the cache after the forward pass
+                    cache_ids_keys = model.cache_history()
                 loss, hidden = model(ys[:, t:t + 2], hidden, is_eval=True, n_caches=args.recog_n_caches)[:2]
 
                 if len(model.cache_attn) > 0:
                     if token_count == n_tokens:
-                        tokens_keys = dataset.idx2token[0](model.cache_ids[:args.recog_n_caches], return_list=True)
-                        tokens_query = dataset.idx2token[0](model.cache_ids[-n_tokens:], return_list=True)
+                        tokens_keys = dataset.idx2token[0](cache_ids_keys[:args.recog_n_caches], return_list=True)
+                        tokens_query = dataset.idx2token[0](model.cache_history()[-n_tokens:], return_list=True)
 
                         # Slide attention matrix
                         n_keys = len(tokens_keys)
@@ -134,7 +134,8 @@ def main(args):
                             model_size=args.get('transformer_d_model', 0),
                             factor=args.lr_factor,
                             noam=args.optimizer == 'noam',
-                            save_checkpoints_topk=10 if is_transformer else 1)
+                            save_checkpoints_topk=10 if is_transformer else 1,
+                            save_checkpoints_async=args.get('async_checkpoint', False))
 
     if args.resume:
         # Restore the last saved model
@@ -258,6 +259,7 @@ def main(args):
         if reporter.n_epochs >= args.n_epochs:
             break
 
+    scheduler.wait_checkpoint()
     logger.info('Total time: %.2f hour' % ((time.time() - start_time_train) / 3600))
     reporter.close()
 
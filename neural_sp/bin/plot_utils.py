@@ -3,21 +3,31 @@
 
 """Plot attention weights & ctc probabilities."""
 
-import seaborn as sns
+import functools
+import math
 import numpy as np
-from matplotlib import pyplot as plt
-import matplotlib.ticker as ticker
-import matplotlib
-matplotlib.use('Agg')
+import os
+import shutil
 
-plt.style.use('ggplot')
-sns.set_style("white")
 blue = '#4682B4'
 orange = '#D2691E'
 green = '#006400'
 
-# sns.set(font='IPAMincho')
-sns.set(font='Noto Sans CJK JP')
+
+@functools.lru_cache(maxsize=None)
+def _import_plot_modules():
+    """Import matplotlib and seaborn on first use because they are slow to import."""
+    import matplotlib
+    matplotlib.use('Agg')
+    from matplotlib import pyplot as plt
+    import matplotlib.ticker as ticker
+    import seaborn as sns
+
+    plt.style.use('ggplot')
+    sns.set_style("white")
+    # sns.set(font='IPAMincho')
+    sns.set(font='Noto Sans CJK JP')
+    return plt, sns, ticker
 
 
 def plot_attention_weights(aw, tokens=[], spectrogram=None, factor=4,
@@ -47,6 +57,7 @@ def plot_attention_weights(aw, tokens=[], spectrogram=None, factor=4,
     if n_heads > 1:
         figsize = (20, 16)
 
+    plt, sns, ticker = _import_plot_modules()
     plt.clf()
     plt.figure(figsize=figsize)
     # Plot attention weights
@@ -132,6 +143,7 @@ def plot_hierarchical_attention_weights(aw, aw_sub, tokens=[], tokens_sub=[],
     if spectrogram is not None:
         n_col += 1
 
+    plt, sns, ticker = _import_plot_modules()
     plt.clf()
     plt.figure(figsize=figsize)
 
@@ -191,6 +203,7 @@ def plot_ctc_probs(ctc_probs, topk_ids, spectrogram=None, factor=4,
     if spectrogram is not None:
         n_col += 1
 
+    plt, sns, ticker = _import_plot_modules()
     plt.clf()
     plt.figure(figsize=figsize)
     if hyp is not None:
@@ -257,6 +270,7 @@ def plot_hierarchical_ctc_probs(ctc_probs, topk_ids, ctc_probs_sub, topk_ids_sub
     if spectrogram is not None:
         n_col += 1
 
+    plt, sns, ticker = _import_plot_modules()
     plt.clf()
     plt.figure(figsize=figsize)
     if hyp is not None:
@@ -315,3 +329,38 @@ def plot_hierarchical_ctc_probs(ctc_probs, topk_ids, ctc_probs_sub, topk_ids_sub
         plt.savefig(save_path)
 
     plt.close()
+
+
+def plot_attention_maps(aws_dict, save_path, n_cols=2):
+    """Plot captured attention weights for each head.
+
+    This does not use pyplot, and is safe to call from a background thread.
+
+    Args:
+        aws_dict (dict): `[n_utts, H, qlen, klen]` (np.ndarray) per name
+        save_path (str): directory to save figures
+        n_cols (int): number of columns in each figure
+
+    """
+    from matplotlib.figure import Figure
+
+    # Clean directory
+    if os.path.isdir(save_path):
+        shutil.rmtree(save_path)
+    os.makedirs(save_path)
+
+    for k, aws in aws_dict.items():
+        n_utts, n_heads = aws.shape[:2]
+        n_cols_tmp = min(n_cols, n_heads)
+        n_rows = math.ceil(n_heads / n_cols_tmp)
+        for b in range(n_utts):
+            fig = Figure(figsize=(10 * n_cols_tmp, 4 * n_rows))
+            axes = fig.subplots(n_rows, n_cols_tmp, squeeze=False)
+            for h in range(n_heads):
+                ax = axes[h // n_cols_tmp, h % n_cols_tmp]
+                ax.imshow(aws[b, h].astype(np.float32), aspect="auto")
+                ax.grid(False)
+                ax.set_xlabel("Input (head%d)" % h)
+                ax.set_ylabel("Output (head%d)" % h)
+            fig.tight_layout()
+            fig.savefig(os.path.join(save_path, '%s_utt%d.png' % (k, b)))
@@ -3,6 +3,7 @@
 
 """Utility functions for training."""
 
+from distutils.version import LooseVersion
 import functools
 import logging
 import numpy as np
@@ -11,8 +12,16 @@ import os
 import time
 import torch
 
+from neural_sp.models.torch_utils import quantize_model
+
 logger = logging.getLogger(__name__)
 
+torch_21_plus = LooseVersion(torch.__version__) >= LooseVersion("2.1")
+
+# configuration entries pointing to files required for inference
+INFERENCE_FILE_KEYS = ['dict', 'dict_sub1', 'dict_sub2',
+                       'wp_model', 'wp_model_sub1', 'wp_model_sub2', 'nlsyms']
+
 
 def compute_subsampling_factor(args):
     """Register subsample factors to args.
@@ -128,31 +137,64 @@ def set_save_path(save_path):
     return save_path_new
 
 
-def load_checkpoint(checkpoint_path, model=None, scheduler=None, amp=None):
+def load_checkpoint_lazy(checkpoint_path):
+    """Load a checkpoint with memory-mapped tensors if possible.
+
+    Tensors are read from the disk only when they are accessed, so that
+    optimizer states in the checkpoint are never loaded into memory.
+
+    Args:
+        checkpoint_path (str): path to the saved model
+    Returns:
+        checkpoint (dict):
+
+    """
+    if torch_21_plus:
+        try:
+            return torch.load(checkpoint_path, map_location='cpu', mmap=True)
+        except RuntimeError:
+            pass  # legacy serialization format does not support mmap
+    return torch.load(checkpoint_path, map_location='cpu')
+
+
+def load_checkpoint(checkpoint_path, model=None, scheduler=None, amp=None, quantize=False):
     """Load checkpoint.
 
     Args:
-        checkpoint_path (str): path to the saved model (model.epoch-*)
+        checkpoint_path (str): path to the saved model (model.epoch-*) or inference checkpoint
         model (torch.nn.Module):
         scheduler (LRScheduler): optimizer wrapped by LRScheduler class
         amp ():
+        quantize (bool): apply dynamic int8 quantization if the checkpoint is exported
+            with it. This must be False when the model runs on GPU.
     Returns:
         topk_list (List): (epoch, metric)
 
     """
-    if os.path.isfile(checkpoint_path):
-        checkpoint = torch.load(checkpoint_path, map_location='cpu')
-    else:
+    if not os.path.isfile(checkpoint_path):
         raise ValueError("No checkpoint found at %s" % checkpoint_path)
+    if scheduler is None and amp is None:
+        # only parameters are needed
+        checkpoint = load_checkpoint_lazy(checkpoint_path)
+    else:
+        checkpoint = torch.load(checkpoint_path, map_location='cpu')
 
     # Restore parameters
-    if 'avg' not in checkpoint_path:
+    if 'config' in checkpoint:
+        logger.info("=> Loading inference checkpoint (%s): %s" % (checkpoint['dtype'], checkpoint_path))
+    elif 'avg' not in checkpoint_path:
         epoch = int(os.path.basename(checkpoint_path).split('-')[-1]) - 1
         logger.info("=> Loading checkpoint (epoch:%d): %s" % (epoch + 1, checkpoint_path))
     else:
         logger.info("=> Loading checkpoint: %s" % checkpoint_path)
     if model is not None:
+        # NOTE: half-precision parameters are cast to the dtype of the model
         model.load_state_dict(checkpoint['model_state_dict'])
+        if checkpoint.get('quantize', False):
+            if quantize:
+                quantize_model(model)
+            else:
+                logger.info('int8 quantization is skipped (CPU inference only).')
 
     # Restore scheduler/optimizer
     if scheduler is not None:
@@ -175,3 +217,81 @@ def load_checkpoint(checkpoint_path, model=None, scheduler=None, amp=None):
     else:
         topk_list = []
     return topk_list
+
+
+def save_inference_checkpoint(checkpoint_path, save_path, dtype='float16', quantize=False):
+    """Export a model-only checkpoint for inference.
+
+    Optimizer states are dropped and floating-point parameters are cast to `dtype`.
+    The configuration (conf.yml) and files such as the dictionary are embedded,
+    so that the exported checkpoint can be used without the experiment directory.
+
+    Args:
+        checkpoint_path (str): path to the saved model (model.epoch-* or model-avg*)
+        save_path (str): path to the inference checkpoint
+        dtype (str): float16/bfloat16/float32
+        quantize (bool): apply dynamic int8 quantization when loading the checkpoint on CPU.
+            Packed int8 weights are not stored because their format depends on
+            the quantization engine (fbgemm/qnnpack) of each machine.
+    Returns:
+        checkpoint (dict): exported checkpoint
+
+    """
+    if dtype not in ['float16', 'bfloat16', 'float32']:
+        raise ValueError(dtype)
+    config = load_config(os.path.join(os.path.dirname(checkpoint_path), 'conf.yml'))
+
+    model_state_dict = {}
+    for k, v in load_checkpoint_lazy(checkpoint_path)['model_state_dict'].items():
+        model_state_dict[k] = v.to(getattr(torch, dtype)) if v.is_floating_point() else v
+
+    files = {}
+    for k in INFERENCE_FILE_KEYS:
+        path = config.get(k, False)
+        if path and os.path.isfile(path):
+            with open(path, 'rb') as f:
+                files[k] = (os.path.basename(path), f.read())
+
+    checkpoint = {
+        "model_state_dict": model_state_dict,
+        "config": OmegaConf.to_yaml(config),
+        "files": files,
+        "dtype": dtype,
+        "quantize": quantize,
+    }
+    save_path_tmp = save_path + '.tmp%d' % os.getpid()
+    torch.save(checkpoint, save_path_tmp)
+    os.replace(save_path_tmp, save_path)  # atomic
+    logger.info("=> Saved inference checkpoint (%s%s): %s" % (dtype, ', int8' if quantize else '', save_path))
+    return checkpoint
+
+
+def load_model_config(checkpoint_path):
+    """Load the configuration of a model.
+
+    Inference checkpoints carry their own configuration. Embedded files are
+    extracted next to the checkpoint if the original paths do not exist any more.
+    Otherwise, conf.yml in the same directory is loaded.
+
+    Args:
+        checkpoint_path (str): path to the saved model
+    Returns:
+        config (omegaconf.dictconfig.DictConfig): configuration
+
+    """
+    checkpoint = None
+    if os.path.isfile(checkpoint_path):
+        checkpoint = load_checkpoint_lazy(checkpoint_path)
+    if checkpoint is None or 'config' not in checkpoint:
+        return load_config(os.path.join(os.path.dirname(checkpoint_path), 'conf.yml'))
+
+    config = OmegaConf.create(checkpoint['config'])
+    for k, (name, content) in checkpoint['files'].items():
+        if os.path.isfile(config[k]):
+            continue
+        path = os.path.join(os.path.dirname(checkpoint_path), name)
+        if not os.path.isfile(path):
+            with open(path, 'wb') as f:
+                f.write(content)
+        config[k] = path
+    return config
@@ -18,7 +18,8 @@ def build_dataloader(args, tsv_path, batch_size, batch_size_type='seq', is_test=
                      tsv_path_sub1=False, tsv_path_sub2=False,
                      num_workers=0, pin_memory=False, distributed=False,
                      first_n_utterances=-1, word_alignment_dir=None, ctc_alignment_dir=None,
-                     max_n_frames=1600, longform_max_n_frames=0, resume_epoch=0):
+                     max_n_frames=1600, longform_max_n_frames=0, resume_epoch=0,
+                     shard_id=0, n_shards=1):
 
     dataset = CustomDataset(corpus=args.corpus,
                             tsv_path=tsv_path,
@@ -48,7 +49,9 @@ def build_dataloader(args, tsv_path, batch_size, batch_size_type='seq', is_test=
                             first_n_utterances=first_n_utterances,
                             simulate_longform=longform_max_n_frames > 0,
                             word_alignment_dir=word_alignment_dir,
-                            ctc_alignment_dir=ctc_alignment_dir)
+                            ctc_alignment_dir=ctc_alignment_dir,
+                            shard_id=shard_id,
+                            n_shards=n_shards)
 
     batch_sampler = CustomBatchSampler(dataset=dataset,
                                        distributed=distributed,
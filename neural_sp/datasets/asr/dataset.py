@@ -6,7 +6,6 @@
 import kaldiio
 import numpy as np
 import os
-import pandas as pd
 from torch.utils.data import Dataset
 
 from neural_sp.datasets.token_converter.character import (
@@ -43,7 +42,8 @@ class CustomDataset(Dataset):
                  ctc, ctc_sub1, ctc_sub2,
                  sort_by, short2long, is_test,
                  discourse_aware=False, simulate_longform=False, first_n_utterances=-1,
-                 word_alignment_dir=None, ctc_alignment_dir=None):
+                 word_alignment_dir=None, ctc_alignment_dir=None,
+                 shard_id=0, n_shards=1):
         """Custom Dataset class.
 
         Args:
@@ -68,6 +68,8 @@ class CustomDataset(Dataset):
             first_n_utterances (int): evaluate the first N utterances
             word_alignment_dir (str): path to word alignment directory
             ctc_alignment_dir (str): path to CTC alignment directory
+            shard_id (int): index of the shard to keep (for parallel evaluation)
+            n_shards (int): number of shards. Utterances are assigned in a round-robin manner
 
         """
         super(Dataset, self).__init__()
@@ -139,6 +141,7 @@ class CustomDataset(Dataset):
                 setattr(self, '_vocab_sub' + str(i), -1)
 
         # Load dataset tsv file
+        import pandas as pd  # slow to import
         chunk = pd.read_csv(tsv_path, encoding='utf-8',
                             delimiter='\t', chunksize=1000000)
         df = pd.concat(chunk)
@@ -169,6 +172,9 @@ class CustomDataset(Dataset):
                 df = df[df.apply(lambda x: x['ylen'] > 0, axis=1)]
                 df = df.truncate(before=0, after=first_n_utterances - 1)
                 print(f"Select first {len(df)} utterances")
+            if n_shards > 1:
+                df = df.iloc[shard_id::n_shards]
+                print(f"Select {len(df)} utterances for shard {shard_id}/{n_shards}")
         else:
             df = df[df.apply(lambda x: min_n_frames <= x[
                 'xlen'] <= max_n_frames, axis=1)]
@@ -297,6 +303,7 @@ class CustomDataset(Dataset):
                 utt_ids (List): name of each utterance
                 speakers (List): name of each speaker
                 sessions (List): name of each session
+                indices (List): indices of dataframe
 
         """
         # inputs
@@ -354,6 +361,7 @@ class CustomDataset(Dataset):
             'feat_path': feat_path,  # for plot
             'trigger_points': trigger_points,
             'longform': self.simulate_longform,
+            'indices': i,
         }
 
         return mini_batch_dict
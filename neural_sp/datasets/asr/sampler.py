@@ -10,6 +10,7 @@ import torch.distributed as dist
 
 from neural_sp.datasets.utils import (
     discourse_bucketing,
+    length_sorted_bucketing,
     longform_bucketing,
     shuffle_bucketing,
     sort_bucketing
@@ -36,6 +37,11 @@ class CustomBatchSampler(sampler):
             dataset (Dataset): pytorch Dataset class
             batch_size (int): size of mini-batch
             batch_size_type (str): type of batch size counting
+                seq: number of utterances
+                frame: number of input frames
+                token: number of output tokens
+                padded_frame: number of input frames including padding.
+                    Utterances are sorted by input length (for evaluation)
             dynamic_batching (bool): change batch size dynamically in training
             shuffle_bucket (bool): gather similar length of utterances and shuffle them
             discourse_aware (bool): sort in the discourse order
@@ -80,6 +86,9 @@ class CustomBatchSampler(sampler):
         elif longform_max_n_frames > 0:
             assert not distributed
             self.indices_buckets = longform_bucketing(self.df, self.batch_size, longform_max_n_frames)
+        elif batch_size_type == 'padded_frame':
+            assert not distributed
+            self.indices_buckets = length_sorted_bucketing(self.df, self.batch_size)
         else:
             self.indices_buckets = sort_bucketing(self.df, self.batch_size, batch_size_type, self.dynamic_batching,
                                                   num_replicas=self.num_replicas)
@@ -127,6 +136,8 @@ class CustomBatchSampler(sampler):
             self.indices_buckets = discourse_bucketing(self.df, batch_size)
         elif self.longform_xmax > 0:
             self.indices_buckets = longform_bucketing(self.df, batch_size, self.longform_xmax)
+        elif batch_size_type == 'padded_frame':
+            self.indices_buckets = length_sorted_bucketing(self.df, batch_size)
         else:
             self.indices_buckets = sort_bucketing(self.df, batch_size, batch_size_type, self.dynamic_batching,
                                                   num_replicas=self.num_replicas)
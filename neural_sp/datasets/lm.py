@@ -9,7 +9,6 @@
 import logging
 import numpy as np
 import os
-import pandas as pd
 import random
 import torch.distributed as dist
 
@@ -66,6 +65,7 @@ class Dataset(object):
         assert bptt >= 2
 
         # Load dataset tsv file
+        import pandas as pd  # slow to import
         chunk = pd.read_csv(tsv_path, encoding='utf-8',
                             delimiter='\t', chunksize=1000000)
         self.df = pd.concat(chunk)
@@ -99,6 +99,34 @@ def sort_bucketing(df, batch_size, batch_size_type, dynamic_batching,
     return indices_buckets
 
 
+def length_sorted_bucketing(df, max_n_frames):
+    """Bucket utterances sorted by input length to minimize padding in evaluation.
+
+    Utterances are sorted in the descending order of input length, and then
+    batch size is determined so that (maximum input length in a mini-batch) x (batch size)
+    does not exceed max_n_frames. An utterance longer than max_n_frames forms a mini-batch by itself.
+
+    Args:
+        df (pandas.DataFrame): dataframe
+        max_n_frames (int): maximum number of frames in a mini-batch including padding
+    Returns:
+        indices_buckets (List[List]): bucketted utterances
+
+    """
+    df_sorted = df.sort_values(by=['xlen'], ascending=False, kind='mergesort')  # stable
+    indices = list(df_sorted.index)
+    xlens = df_sorted['xlen'].values
+
+    indices_buckets = []  # list of list
+    offset = 0
+    while offset < len(indices):
+        _batch_size = max(1, max_n_frames // xlens[offset])
+        indices_buckets.append(indices[offset:offset + _batch_size])
+        offset += _batch_size
+
+    return indices_buckets
+
+
 def shuffle_bucketing(df, batch_size, batch_size_type, dynamic_batching,
                       seed=None, num_replicas=1):
     """Bucket utterances having a similar length and shuffle them for Transformer training.
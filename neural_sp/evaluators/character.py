@@ -3,12 +3,12 @@
 
 """Evaluate character-level model by WER & CER."""
 
-import codecs
 import logging
 import numpy as np
 from tqdm import tqdm
 
 from neural_sp.evaluators.edit_distance import compute_wer
+from neural_sp.evaluators.trn import write_trn
 from neural_sp.utils import mkdir_join
 
 logger = logging.getLogger(__name__)
@@ -70,14 +70,12 @@ def eval_char(models, dataloader, params, epoch=-1, rank=0,
     last_success_frame_ratio = 0
 
     # Reset data counter
-    dataloader.reset(params.get('recog_batch_size'), 'seq')
+    dataloader.reset(params.get('recog_batch_size'), params.get('recog_batch_size_type', 'seq'))
 
     if progressbar:
         pbar = tqdm(total=len(dataloader))
 
-    if rank == 0:
-        f_hyp = codecs.open(hyp_trn_path, 'w', encoding='utf-8')
-        f_ref = codecs.open(ref_trn_path, 'w', encoding='utf-8')
+    trn = []  # (index of dataframe, reference, hypothesis, utterance name)
 
     if task_idx == 0:
         task = 'ys'
@@ -126,9 +124,7 @@ def eval_char(models, dataloader, params, epoch=-1, rank=0,
                 utt_id = str(batch['utt_ids'][b]) + '_0000000_0000001'
             else:
                 utt_id = str(batch['utt_ids'][b])
-            if rank == 0:
-                f_ref.write(ref + ' (' + speaker + '-' + utt_id + ')\n')
-                f_hyp.write(nbest_hyps[0] + ' (' + speaker + '-' + utt_id + ')\n')
+            trn.append((batch['indices'][b], ref, nbest_hyps[0], speaker + '-' + utt_id))
             logger.debug('utt-id (%d/%d): %s' % (n_utt + 1, len(dataloader), utt_id))
             logger.debug('Ref: %s' % ref)
             logger.debug('Hyp: %s' % nbest_hyps[0])
@@ -186,8 +182,7 @@ def eval_char(models, dataloader, params, epoch=-1, rank=0,
             pbar.update(len(batch['utt_ids']))
 
     if rank == 0:
-        f_hyp.close()
-        f_ref.close()
+        write_trn(ref_trn_path, hyp_trn_path, trn)
     if progressbar:
         pbar.close()
 
@@ -69,30 +69,79 @@ def compute_wer(ref, hyp, normalize=False):
         n_del (int): the number of deletion
 
     """
-    # Initialisation
-    d = np.zeros((len(ref) + 1) * (len(hyp) + 1), dtype=np.uint16)
-    d = d.reshape((len(ref) + 1, len(hyp) + 1))
-    for i in range(len(ref) + 1):
-        for j in range(len(hyp) + 1):
-            if i == 0:
-                d[0][j] = j
-            elif j == 0:
-                d[i][0] = i
-
-    # Computation
-    for i in range(1, len(ref) + 1):
-        for j in range(1, len(hyp) + 1):
-            if ref[i - 1] == hyp[j - 1]:
-                d[i][j] = d[i - 1][j - 1]
-            else:
-                sub_tmp = d[i - 1][j - 1] + 1
-                ins_tmp = d[i][j - 1] + 1
-                del_tmp = d[i - 1][j] + 1
-                d[i][j] = min(sub_tmp, ins_tmp, del_tmp)
-
-    wer = d[len(ref)][len(hyp)]
+    d = _edit_distance_matrix(ref, hyp)
+    wer = int(d[len(ref)][len(hyp)])
 
     # Find out the manipulation steps
+    error_list = _backtrack(d, ref, hyp)
+
+    n_sub = error_list.count("S")
+    n_ins = error_list.count("I")
+    n_del = error_list.count("D")
+    n_cor = error_list.count("C")
+
+    assert wer == (n_sub + n_ins + n_del)
+    assert n_cor == (len(ref) - n_sub - n_del)
+
+    if normalize:
+        wer /= len(ref)
+
+    return wer * 100, n_sub * 100, n_ins * 100, n_del * 100
+
+
+def _edit_distance_matrix(ref, hyp):
+    """Compute the Levenshtein distance matrix row by row with numpy.
+
+    For each row, the insertion recurrence `d[i][j] = min(c[j], d[i][j-1] + 1)`
+    is solved at once as `j + cummin(c[k] - k)`. The loop runs over the shorter
+    sequence, and the matrix dtype is chosen so that long sequences do not overflow.
+
+    Args:
+        ref (list): words in the reference transcript
+        hyp (list): words in the predicted transcript
+    Returns:
+        d (np.ndarray): `[len(ref) + 1, len(hyp) + 1]`
+
+    """
+    # Map words to integer IDs for vectorized comparison
+    word2idx = {}
+    ref_ids = np.array([word2idx.setdefault(w, len(word2idx)) for w in ref], dtype=np.int64)
+    hyp_ids = np.array([word2idx.setdefault(w, len(word2idx)) for w in hyp], dtype=np.int64)
+
+    # The distance matrix is symmetric w.r.t. ref and hyp
+    transpose = len(ref) < len(hyp)
+    if transpose:
+        ref_ids, hyp_ids = hyp_ids, ref_ids
+    n_rows, n_cols = len(ref_ids) + 1, len(hyp_ids) + 1
+    dtype = np.uint16 if n_rows + n_cols < np.iinfo(np.uint16).max else np.uint32
+
+    d = np.empty((n_rows, n_cols), dtype=dtype)
+    cols = np.arange(n_cols, dtype=np.int64)
+    row = cols.copy()
+    d[0] = row
+    for i in range(1, n_rows):
+        cand = np.empty(n_cols, dtype=np.int64)
+        cand[0] = i
+        np.minimum(row[:-1] + (hyp_ids != ref_ids[i - 1]), row[1:] + 1, out=cand[1:])
+        row = np.minimum.accumulate(cand - cols) + cols
+        d[i] = row
+
+    if transpose:
+        d = np.ascontiguousarray(d.T)
+    return d
+
+
+def _backtrack(d, ref, hyp):
+    """Find out the manipulation steps from the distance matrix.
+
+    Args:
+        d (np.ndarray): `[len(ref) + 1, len(hyp) + 1]`
+        ref (list): words in the reference transcript
+        hyp (list): words in the predicted transcript
+    Returns:
+        error_list (list): manipulation steps (C/S/I/D) in the reversed order
+
+    """
     x = len(ref)
     y = len(hyp)
     error_list = []
@@ -100,15 +149,17 @@ def compute_wer(ref, hyp, normalize=False):
         if x == 0 and y == 0:
             break
         else:
+            # NOTE: cast to int to avoid unsigned wrap-around
+            d_xy = int(d[x, y])
             if x > 0 and y > 0:
-                if d[x][y] == d[x - 1][y - 1] and ref[x - 1] == hyp[y - 1]:
+                if d_xy == int(d[x - 1, y - 1]) and ref[x - 1] == hyp[y - 1]:
                     error_list.append("C")
                     x = x - 1
                     y = y - 1
-                elif d[x][y] == d[x][y - 1] + 1:
+                elif d_xy == int(d[x, y - 1]) + 1:
                     error_list.append("I")
                     y = y - 1
-                elif d[x][y] == d[x - 1][y - 1] + 1:
+                elif d_xy == int(d[x - 1, y - 1]) + 1:
                     error_list.append("S")
                     x = x - 1
                     y = y - 1
@@ -116,7 +167,7 @@ def compute_wer(ref, hyp, normalize=False):
                     error_list.append("D")
                     x = x - 1
             elif x == 0 and y > 0:
-                if d[x][y] == d[x][y - 1] + 1:
+                if d_xy == int(d[x, y - 1]) + 1:
                     error_list.append("I")
                     y = y - 1
                 else:
@@ -127,19 +178,7 @@ def compute_wer(ref, hyp, normalize=False):
                 x = x - 1
             else:
                 raise ValueError
-
-    n_sub = error_list.count("S")
-    n_ins = error_list.count("I")
-    n_del = error_list.count("D")
-    n_cor = error_list.count("C")
-
-    assert wer == (n_sub + n_ins + n_del)
-    assert n_cor == (len(ref) - n_sub - n_del)
-
-    if normalize:
-        wer /= len(ref)
-
-    return wer * 100, n_sub * 100, n_ins * 100, n_del * 100
+    return error_list
 
 
 def wer_align(ref, hyp, normalize=False, double_byte=False):
@@ -165,60 +204,11 @@ def wer_align(ref, hyp, normalize=False, double_byte=False):
     d_char = "Ｄ" if double_byte else "D"
 
     # Build the matrix
-    d = np.zeros((len(ref) + 1) * (len(hyp) + 1),
-                 dtype=np.uint8).reshape((len(ref) + 1, len(hyp) + 1))
-    for i in range(len(ref) + 1):
-        for j in range(len(hyp) + 1):
-            if i == 0:
-                d[0][j] = j
-            elif j == 0:
-                d[i][0] = i
-    for i in range(1, len(ref) + 1):
-        for j in range(1, len(hyp) + 1):
-            if ref[i - 1] == hyp[j - 1]:
-                d[i][j] = d[i - 1][j - 1]
-            else:
-                n_sub = d[i - 1][j - 1] + 1
-                n_ins = d[i][j - 1] + 1
-                n_del = d[i - 1][j] + 1
-                d[i][j] = min(n_sub, n_ins, n_del)
+    d = _edit_distance_matrix(ref, hyp)
     wer = float(d[len(ref)][len(hyp)])
 
     # Find out the manipulation steps
-    x = len(ref)
-    y = len(hyp)
-    error_list = []
-    while True:
-        if x == 0 and y == 0:
-            break
-        else:
-            if x > 0 and y > 0:
-                if d[x][y] == d[x - 1][y - 1] and ref[x - 1] == hyp[y - 1]:
-                    error_list.append("C")
-                    x = x - 1
-                    y = y - 1
-                elif d[x][y] == d[x][y - 1] + 1:
-                    error_list.append("I")
-                    y = y - 1
-                elif d[x][y] == d[x - 1][y - 1] + 1:
-                    error_list.append("S")
-                    x = x - 1
-                    y = y - 1
-                else:
-                    error_list.append("D")
-                    x = x - 1
-            elif x == 0 and y > 0:
-                if d[x][y] == d[x][y - 1] + 1:
-                    error_list.append("I")
-                    y = y - 1
-                else:
-                    error_list.append("D")
-                    x = x - 1
-            elif y == 0 and x > 0:
-                error_list.append("D")
-                x = x - 1
-            else:
-                raise ValueError
+    error_list = _backtrack(d, ref, hyp)
     error_list = error_list[::-1]
 
     # Print the result in aligned way
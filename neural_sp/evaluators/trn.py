@@ -0,0 +1,117 @@
+# Copyright 2021 Kyoto University (Hirofumi Inaguma)
+#  Apache 2.0  (http://www.apache.org/licenses/LICENSE-2.0)
+
+"""Merge and score trn files written by parallel evaluation."""
+
+import codecs
+import itertools
+import logging
+
+from neural_sp.evaluators.edit_distance import compute_wer
+
+logger = logging.getLogger(__name__)
+
+
+def merge_trn(shard_trn_paths, trn_path):
+    """Merge trn files of round-robin shards in the original utterance order.
+
+    The i-th utterance of the whole set is the (i // n_shards)-th line of
+    the (i % n_shards)-th shard.
+
+    Args:
+        shard_trn_paths (List[str]): paths to trn files of each shard
+        trn_path (str): path to the merged trn file
+    Returns:
+        n_lines (int): number of merged lines
+
+    """
+    shard_lines = []
+    for path in shard_trn_paths:
+        with codecs.open(path, 'r', encoding='utf-8') as f:
+            shard_lines.append(f.readlines())
+
+    n_lines = 0
+    with codecs.open(trn_path, 'w', encoding='utf-8') as f:
+        for lines in itertools.zip_longest(*shard_lines):
+            for line in lines:
+                if line is not None:
+                    f.write(line)
+                    n_lines += 1
+    return n_lines
+
+
+def load_trn(trn_path):
+    """Load transcriptions from a trn file.
+
+    Args:
+        trn_path (str): path to a trn file
+    Returns:
+        trn (List[tuple]): pairs of (utterance name, transcription)
+
+    """
+    trn = []
+    with codecs.open(trn_path, 'r', encoding='utf-8') as f:
+        for line in f:
+            text, utt_name = line.rstrip('\n').rsplit(' (', 1)
+            trn.append((utt_name[:-1], text))
+    return trn
+
+
+def score_trn(ref_trn_path, hyp_trn_path, unit, corpus):
+    """Compute WER/CER (PER for phones) between two trn files.
+
+    The same rules as the per-unit evaluators are applied.
+
+    Args:
+        ref_trn_path (str): path to the reference trn file
+        hyp_trn_path (str): path to the hypothesis trn file
+        unit (str): word/word_char/wp/char/char_space/phone
+        corpus (str): name of corpus
+    Returns:
+        wer (float): word (phone) error rate
+        cer (float): character error rate
+
+    """
+    refs = load_trn(ref_trn_path)
+    hyps = load_trn(hyp_trn_path)
+    assert len(refs) == len(hyps), (len(refs), len(hyps))
+
+    score_word = unit in ['word', 'word_char', 'wp'] or 'phone' in unit or \
+        ('char' in unit and 'nowb' not in unit)
+    score_char = unit == 'wp' or 'char' in unit
+
+    wer, cer = 0, 0
+    n_word, n_char = 0, 0
+    for (utt_name, ref), (utt_name_hyp, hyp) in zip(refs, hyps):
+        assert utt_name == utt_name_hyp, (utt_name, utt_name_hyp)
+        if score_word:
+            wer += compute_wer(ref=ref.split(' '), hyp=hyp.split(' '))[0]
+            n_word += len(ref.split(' '))
+        if score_char:
+            if corpus == 'csj':
+                ref = ref.replace(' ', '')
+                hyp = hyp.replace(' ', '')
+            cer += compute_wer(ref=list(ref), hyp=list(hyp))[0]
+            n_char += len(ref)
+
+    if n_word > 0:
+        wer /= n_word
+    if n_char > 0:
+        cer /= n_char
+    return wer, cer
+
+
+def write_trn(ref_trn_path, hyp_trn_path, trn):
+    """Write hyp/ref trn files in the original utterance order.
+
+    Args:
+        ref_trn_path (str): path to the reference trn file
+        hyp_trn_path (str): path to the hypothesis trn file
+        trn (List[tuple]): tuples of (index of dataframe, reference, hypothesis, utterance name)
+
+    """
+    with codecs.open(ref_trn_path, 'w', encoding='utf-8') as f_ref, \
+            codecs.open(hyp_trn_path, 'w', encoding='utf-8') as f_hyp:
+        for _, ref, hyp, utt_name in sorted(trn, key=lambda x: x[0]):
+            f_ref.write(ref + ' (' + utt_name + ')\n')
+            f_hyp.write(hyp + ' (' + utt_name + ')\n')
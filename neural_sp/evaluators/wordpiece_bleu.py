@@ -3,12 +3,11 @@
 
 """Evaluate wordpiece-level model by corpus-level BLEU."""
 
-import codecs
 import logging
 import numpy as np
 from tqdm import tqdm
-from nltk.translate.bleu_score import corpus_bleu, sentence_bleu
 
+from neural_sp.evaluators.trn import write_trn
 from neural_sp.utils import mkdir_join
 
 logger = logging.getLogger(__name__)
@@ -37,6 +36,7 @@ def eval_wordpiece_bleu(models, dataloader, params, epoch=-1, rank=0,
         c_bleu (float): corpus-level 4-gram BLEU
 
     """
+    from nltk.translate.bleu_score import corpus_bleu, sentence_bleu  # slow to import
     if save_dir is None:
         save_dir = 'decode_' + dataloader.set + '_ep' + \
             str(epoch) + '_beam' + str(params.get('recog_beam_width'))
@@ -60,7 +60,7 @@ def eval_wordpiece_bleu(models, dataloader, params, epoch=-1, rank=0,
     n_utt = 0
 
     # Reset data counter
-    dataloader.reset(params.get('recog_batch_size'), 'seq')
+    dataloader.reset(params.get('recog_batch_size'), params.get('recog_batch_size_type', 'seq'))
 
     if progressbar:
         pbar = tqdm(total=len(dataloader))
@@ -68,9 +68,7 @@ def eval_wordpiece_bleu(models, dataloader, params, epoch=-1, rank=0,
     list_of_references = []
     hypotheses = []
 
-    if rank == 0:
-        f_hyp = codecs.open(hyp_trn_path, 'w', encoding='utf-8')
-        f_ref = codecs.open(ref_trn_path, 'w', encoding='utf-8')
+    trn = []  # (index of dataframe, reference, hypothesis, utterance name)
 
     for batch in dataloader:
         if streaming or params.get('recog_block_sync'):
@@ -101,9 +99,7 @@ def eval_wordpiece_bleu(models, dataloader, params, epoch=-1, rank=0,
                 utt_id = str(batch['utt_ids'][b]) + '_0000000_0000001'
             else:
                 utt_id = str(batch['utt_ids'][b])
-            if rank == 0:
-                f_ref.write(ref + ' (' + speaker + '-' + utt_id + ')\n')
-                f_hyp.write(nbest_hyps[0] + ' (' + speaker + '-' + utt_id + ')\n')
+            trn.append((batch['indices'][b], ref, nbest_hyps[0], speaker + '-' + utt_id))
             logger.debug('utt-id (%d/%d): %s' % (n_utt + 1, len(dataloader), utt_id))
             logger.debug('Ref: %s' % ref)
             logger.debug('Hyp: %s' % nbest_hyps[0])
@@ -136,8 +132,7 @@ def eval_wordpiece_bleu(models, dataloader, params, epoch=-1, rank=0,
             pbar.update(len(batch['utt_ids']))
 
     if rank == 0:
-        f_hyp.close()
-        f_ref.close()
+        write_trn(ref_trn_path, hyp_trn_path, trn)
     if progressbar:
         pbar.close()
 
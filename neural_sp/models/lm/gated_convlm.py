@@ -38,13 +38,11 @@ class GatedConvLM(LMBase):
         # for cache
         self.cache_theta = 0.2  # smoothing parameter
         self.cache_lambda = 0.2  # cache weight
-        self.cache_ids = []
-        self.cache_keys = []
-        self.cache_attn = []
+        self.reset_cache()
         self.embed_cache = None
 
         self.embed = nn.Embedding(self.vocab, args.emb_dim, padding_idx=self.pad)
-        self.dropout_embed = nn.Dropout(p=args.dropout_in)
+        self.dropout_emb = nn.Dropout(p=args.dropout_in)
 
         model_size = args.lm_type.replace('gated_conv_', '')
 
@@ -202,28 +200,36 @@ class GatedConvLM(LMBase):
             ys_emb = self.embed_cache[indices]
         return ys_emb
 
-    def decode(self, ys, state=None, mems=None, incremental=False):
+    def decode(self, ys, state=None, mems=None, cache=None, incremental=False):
         """Decode function.
 
         Args:
             ys (LongTensor): `[B, L]`
-            state: dummy interfance for RNNLM
+            state (List): length of the number of blocks, left context of each block
+                (used only in the incremental mode)
+            mems: dummy interfance for TransformerXL
             cache: dummy interfance for TransformerLM/TransformerXL
-            incremental: dummy interfance for TransformerLM/TransformerXL
+            incremental (bool): ASR decoding mode
         Returns:
             logits (FloatTensor): `[B, L, vocab]`
             out (FloatTensor): `[B, L, d_model]` (for cache)
-            new_cache: dummy interfance for RNNLM/TransformerLM/TransformerXL
-            new_mems: dummy interfance for TransformerXL
+            new_state (List): length of the number of blocks,
+                each of which contains a FloatTensor of size `[B, in_ch, kernel_size - 1, 1]`
 
         """
         out = self.embed_token_id(ys)
 
-        bs, max_ylen = out.size()[:2]
-
         # NOTE: consider embed_dim as in_ch
-        out = out.unsqueeze(3)
-        out = self.blocks(out.transpose(2, 1))  # [B, out_ch, T, 1]
+        out = out.unsqueeze(3).transpose(2, 1)  # `[B, emb_dim, T, 1]`
+        new_state = None
+        if incremental:
+            if state is None:
+                state = [None] * len(self.blocks)
+            new_state = [None] * len(self.blocks)
+            for i, block in enumerate(self.blocks):
+                out, new_state[i] = block.forward_incremental(out, state[i])
+        else:
+            out = self.blocks(out)  # `[B, out_ch, T, 1]`
         out = out.transpose(2, 1).contiguous()  # `[B, T, out_ch, 1]`
         out = out.squeeze(3)
         if self.adaptive_softmax is None:
@@ -231,4 +237,4 @@ class GatedConvLM(LMBase):
         else:
             logits = out
 
-        return logits, out, None
+        return logits, out, new_state
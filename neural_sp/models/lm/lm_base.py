@@ -69,33 +69,31 @@ class LMBase(ModelBase):
             logits = logits[:, -1].unsqueeze(1)
 
         # Compute XE sequence loss
-        if n_caches > 0 and len(self.cache_ids) > 0:
+        if n_caches > 0 and self.cache_len > 0 and self.cache_ids.size(1) == n_caches:
             assert ys_out.size(1) == 1
-            assert ys_out.size(0) == 1
             if self.adaptive_softmax is None:
                 probs = torch.softmax(logits, dim=-1)
             else:
                 probs = self.adaptive_softmax.log_prob(logits).exp()
-            cache_probs = probs.new_zeros(probs.size())
-
-            # Truncate cache
-            self.cache_ids = self.cache_ids[-n_caches:]  # list of `[B, 1]`
-            self.cache_keys = self.cache_keys[-n_caches:]  # list of `[B, 1, n_units]`
 
             # Compute inner-product over caches
+            cache_ids = self.cache_ids[:, :self.cache_len]  # `[B, n_caches]`
+            cache_keys = self.cache_keys[:, :self.cache_len]  # `[B, n_caches, n_units]`
             cache_attn = torch.softmax(self.cache_theta * torch.matmul(
-                torch.cat(self.cache_keys, dim=1), out.transpose(2, 1)).squeeze(2), dim=1)
+                cache_keys, out[:, -1:].transpose(2, 1)).squeeze(2), dim=1)  # `[B, n_caches]`
 
             # For visualization
-            if len(self.cache_ids) == n_caches:
-                self.cache_attn += [cache_attn.cpu().numpy()]
+            if self.cache_len == n_caches:
+                order = (torch.arange(n_caches) + self.cache_ptr) % n_caches  # oldest -> newest
+                self.cache_attn += [cache_attn[:, order.to(cache_attn.device)].cpu().numpy()]
                 self.cache_attn = self.cache_attn[-n_caches:]
 
             # Sum all probabilities
-            for offset, idx in enumerate(self.cache_ids):
-                cache_probs[:, :, idx] += cache_attn[:, offset]
+            cache_probs = probs.new_zeros(probs.size()).scatter_add_(
+                2, cache_ids.unsqueeze(1), cache_attn.unsqueeze(1))
             probs = (1 - self.cache_lambda) * probs + self.cache_lambda * cache_probs
-            loss = -torch.log(probs[:, :, ys_out[:, -1]])
+            loss = -torch.log(torch.gather(probs, 2, ys_out.unsqueeze(2))).mean()
+            ppl = np.exp(loss.item())
         else:
             if self.adaptive_softmax is None:
                 loss, ppl = cross_entropy_lsm(logits, ys_out.contiguous(),
@@ -108,8 +106,7 @@ class LMBase(ModelBase):
 
         if n_caches > 0:
             # Register to cache
-            self.cache_ids += [ys_out[0, -1].item()]
-            self.cache_keys += [out]
+            self.register_cache(ys_out[:, -1], out[:, -1], n_caches)
 
         # Compute token-level accuracy in teacher-forcing
         if self.adaptive_softmax is None:
@@ -121,6 +118,48 @@ class LMBase(ModelBase):
         observation = {'loss.lm': loss.item(), 'acc.lm': acc, 'ppl.lm': ppl}
         return loss, new_state, observation
 
+    def reset_cache(self):
+        """Reset the neural cache implemented as a ring buffer."""
+        self.cache_ids = None  # `[B, n_caches]`
+        self.cache_keys = None  # `[B, n_caches, n_units]`
+        self.cache_ptr = 0  # next position to write
+        self.cache_len = 0  # number of valid entries
+        self.cache_attn = []
+
+    def register_cache(self, ids, keys, n_caches):
+        """Write the latest token IDs and hidden states to the neural cache.
+
+        Args:
+            ids (LongTensor): `[B]`
+            keys (FloatTensor): `[B, n_units]`
+            n_caches (int): number of cached states
+
+        """
+        bs = ids.size(0)
+        if self.cache_ids is None or self.cache_ids.size() != (bs, n_caches):
+            self.reset_cache()
+            self.cache_ids = ids.new_zeros(bs, n_caches)
+            self.cache_keys = keys.new_zeros(bs, n_caches, keys.size(-1))
+        self.cache_ids[:, self.cache_ptr] = ids
+        self.cache_keys[:, self.cache_ptr] = keys
+        self.cache_ptr = (self.cache_ptr + 1) % n_caches
+        self.cache_len = min(self.cache_len + 1, n_caches)
+
+    def cache_history(self, b=0):
+        """Return cached token IDs from the oldest to the newest.
+
+        Args:
+            b (int): index in the batch
+        Returns:
+            ids (List): length `cache_len`
+
+        """
+        if self.cache_len == 0:
+            return []
+        n_caches = self.cache_ids.size(1)
+        order = (torch.arange(self.cache_len) + self.cache_ptr - self.cache_len) % n_caches
+        return self.cache_ids[b, order.to(self.cache_ids.device)].tolist()
+
     def repackage_state(self, state):
         return state
 
@@ -149,7 +188,8 @@ class LMBase(ModelBase):
                 - RNNLM => (dict):
                     hxs (FloatTensor): `[n_layers, B, n_units]`
                     cxs (FloatTensor): `[n_layers, B, n_units]`
-                - TransformerLM => (LongTensor): `[B, L]`
+                - TransformerLM => (List): length `n_layers`, each of which contains a dict of
+                    projected keys/values of previous tokens
                 - TransformerXL => (List): length `n_layers + 1`, each of which contains a tensor`[B, L, d_model]`
             mems (List):
             cache (List):
@@ -159,7 +199,8 @@ class LMBase(ModelBase):
                 - RNNLM (dict):
                     hxs (FloatTensor): `[n_layers, B, n_units]`
                     cxs (FloatTensor): `[n_layers, B, n_units]`
-                - TransformerLM => (LongTensor): `[B, L]`
+                - TransformerLM => (List): length `n_layers`, each of which contains a dict of
+                    projected keys/values of previous tokens
                 - TransformerXL => (List): length `n_layers + 1`, each of which contains a tensor`[B, L, d_model]`
             log_probs (FloatTensor): `[B, L, vocab]`
 
@@ -41,9 +41,7 @@ class RNNLM(LMBase):
         # for cache
         self.cache_theta = 0.2  # smoothing parameter
         self.cache_lambda = 0.2  # cache weight
-        self.cache_ids = []
-        self.cache_keys = []
-        self.cache_attn = []
+        self.reset_cache()
         self.embed_cache = None
 
         self.embed = nn.Embedding(self.vocab, args.emb_dim, padding_idx=self.pad)
@@ -191,7 +189,8 @@ class RNNLM(LMBase):
         residual = None
         new_hxs, new_cxs = [], []
         for lth in range(self.n_layers):
-            self.rnn[lth].flatten_parameters()  # for multi-GPUs
+            if ys_emb.is_cuda:
+                self.rnn[lth].flatten_parameters()  # for multi-GPUs
 
             # Path through RNN
             ys_emb, (h, c) = self.rnn[lth](ys_emb, hx=(state['hxs'][lth:lth + 1],
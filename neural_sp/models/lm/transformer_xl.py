@@ -19,8 +19,6 @@ from neural_sp.models.modules.transformer import TransformerDecoderBlock
 from neural_sp.models.torch_utils import tensor2np
 from neural_sp.utils import mkdir_join
 
-import matplotlib
-matplotlib.use('Agg')
 
 random.seed(1)
 
@@ -58,9 +56,7 @@ class TransformerXL(LMBase):
         # for cache
         self.cache_theta = 0.2  # smoothing parameter
         self.cache_lambda = 0.2  # cache weight
-        self.cache_ids = []
-        self.cache_keys = []
-        self.cache_attn = []
+        self.reset_cache()
         self.embed_cache = None
 
         # positional embedding
@@ -149,43 +145,86 @@ class TransformerXL(LMBase):
             init_like_transformer_xl(n, p, std=0.02)
 
     def init_memory(self):
-        """Initialize memory."""
-        return [torch.empty(0, dtype=torch.float).to(self.device)
-                for _ in range(self.n_layers)]
+        """Initialize memory.
 
-    def update_memory(self, memory_prev, hidden_states):
-        """Update memory.
+        Returns:
+            mems (dict):
+                mems (List): length `n_layers`, each of which contains a ring buffer
+                    of size `[B, mem_len, d_model]` (allocated lazily)
+                offset (int): next position to write in the ring buffers
+                mlen (int): number of valid positions in the ring buffers
+
+        """
+        return {'mems': [None] * self.n_layers, 'offset': 0, 'mlen': 0}
+
+    def read_memory(self, mems):
+        """Read valid positions of memory in the ring order.
+
+        Args:
+            mems (dict): see `init_memory`
+        Returns:
+            memory (List): length `n_layers`,
+                each of which contains a FloatTensor of size `[B, mlen, d_model]` or None
+
+        """
+        mlen = mems['mlen']
+        if mlen == 0:
+            return [None] * self.n_layers
+        return [m[:, :mlen] for m in mems['mems']]
+
+    def update_memory(self, mems, hidden_states):
+        """Update memory in place.
+
+        The last `mem_len` hidden states are written to preallocated per-layer
+        ring buffers at the current offset, so that no new tensor is allocated
+        once the buffers are created.
 
         Args:
-            memory_prev (List): length `n_layers` (inter-utterance),
-                each of which contains a FloatTensor of size `[B, mlen, d_model]`
+            mems (dict): see `init_memory`
             hidden_states (List): length `n_layers` (intra-utterance),
                 each of which contains a FloatTensor of size `[B, L, d_model]`
         Returns:
-            new_mems (List): length `n_layers`,
-                each of which contains a FloatTensor of size `[B, mlen, d_model]`
+            new_mems (dict): see `init_memory`
 
         """
-        if memory_prev is None:
-            memory_prev = self.init_memory()  # 0-th to L-1-th layer
-        assert len(hidden_states) == len(memory_prev), (len(hidden_states), len(memory_prev))
-        mlen = memory_prev[0].size(1) if memory_prev[0].dim() > 1 else 0
-        qlen = hidden_states[0].size(1)
-
-        # There are `mlen + qlen` steps that can be cached into mems
-        # For the next step, the last `ext_len` of the `qlen` tokens
-        # will be used as the extended context. Hence, we only cache
-        # the tokens from `mlen + qlen - self.ext_len - self.mem_len`
-        # to `mlen + qlen - self.ext_len`.
+        if mems is None:
+            mems = self.init_memory()  # 0-th to L-1-th layer
+        assert len(hidden_states) == len(mems['mems']), (len(hidden_states), len(mems['mems']))
+        if self.mem_len == 0:
+            return self.init_memory()
+
+        bs, qlen, d_model = hidden_states[0].size()
         with torch.no_grad():
-            new_mems = []
-            end_idx = mlen + qlen
-            start_idx = max(0, end_idx - self.mem_len)
-            for m, h in zip(memory_prev, hidden_states):
-                cat = torch.cat([m, h], dim=1)  # `[B, mlen + qlen, d_model]`
-                new_mems.append(cat[:, start_idx:end_idx].detach())  # `[B, self.mem_len, d_model]`
+            mems = self._allocate_memory(mems, hidden_states[0])
+            n_write = min(qlen, self.mem_len)
+            slots = (torch.arange(n_write) + mems['offset']) % self.mem_len
+            slots = slots.to(hidden_states[0].device)
+            for m, h in zip(mems['mems'], hidden_states):
+                m.index_copy_(1, slots, h[:, qlen - n_write:].detach())
+
+        return {'mems': mems['mems'],
+                'offset': (mems['offset'] + n_write) % self.mem_len,
+                'mlen': min(mems['mlen'] + n_write, self.mem_len)}
 
-        return new_mems
+    def _allocate_memory(self, mems, hs):
+        """Allocate ring buffers if they do not match the current batch size or `mem_len`.
+
+        Valid positions of the previous buffers are carried over in the chronological order.
+
+        """
+        mem = mems['mems'][0]
+        if mem is not None and mem.size(0) == hs.size(0) and mem.size(1) == self.mem_len:
+            return mems
+
+        new_mems = [hs.new_zeros(hs.size(0), self.mem_len, hs.size(2)) for _ in range(self.n_layers)]
+        mlen = 0
+        if mem is not None and mem.size(0) == hs.size(0):
+            mlen = min(mems['mlen'], self.mem_len)
+            order = (torch.arange(mems['mlen'] - mlen, mems['mlen']) + mems['offset']) % mems['mlen']
+            order = order.to(hs.device)
+            for new_mem, mem in zip(new_mems, mems['mems']):
+                new_mem[:, :mlen] = mem.index_select(1, order)
+        return {'mems': new_mems, 'offset': mlen % self.mem_len, 'mlen': mlen}
 
     def embed_token_id(self, indices):
         """Embed token IDs.
@@ -208,8 +247,7 @@ class TransformerXL(LMBase):
         Args:
             ys (LongTensor): `[B, L]`
             state (List): dummy interfance for RNNLM
-            mems (List): length `n_layers` (inter-utterance),
-                each of which contains a FloatTensor of size `[B, mlen, d_model]`
+            mems (dict): ring buffers of memory (inter-utterance), see `init_memory`
             cache (List): length `n_layers` (intra-utterance),
                 each of which contains a FloatTensor of size `[B, L-1, d_model]`
             incremental (bool): ASR decoding mode
@@ -226,9 +264,9 @@ class TransformerXL(LMBase):
 
         if mems is None:
             mems = self.init_memory()
-            mlen = 0
-        else:
-            mlen = mems[0].size(1)
+        mlen = mems['mlen']
+        mem_offset = mems['offset'] % mlen if mlen > 0 else 0  # oldest position in the ring buffers
+        memory = self.read_memory(mems)
 
         bs, ylen = ys.size()[:2]
         if incremental and cache[0] is not None:
@@ -245,11 +283,12 @@ class TransformerXL(LMBase):
         new_mems = [None] * self.n_layers
         new_cache = [None] * self.n_layers
         hidden_states = [out]
-        for lth, (mem, layer) in enumerate(zip(mems, self.layers)):
+        for lth, (mem, layer) in enumerate(zip(memory, self.layers)):
             if incremental and mlen > 0 and mem.size(0) != bs:
                 mem = mem.repeat([bs, 1, 1])
             out = layer(out, causal_mask, cache=cache[lth],
-                        pos_embs=rel_pos_embs, memory=mem, u_bias=self.u_bias, v_bias=self.v_bias)
+                        pos_embs=rel_pos_embs, memory=mem, u_bias=self.u_bias, v_bias=self.v_bias,
+                        mem_offset=mem_offset)
             if incremental:
                 new_cache[lth] = out
             elif lth < self.n_layers - 1:
@@ -273,6 +312,8 @@ class TransformerXL(LMBase):
 
     def plot_attention(self, n_cols=4):
         """Plot attention for each head in all layers."""
+        import matplotlib
+        matplotlib.use('Agg')
         from matplotlib import pyplot as plt
         from matplotlib.ticker import MaxNLocator
 
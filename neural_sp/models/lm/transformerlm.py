@@ -17,8 +17,6 @@ from neural_sp.models.modules.transformer import TransformerDecoderBlock
 from neural_sp.models.torch_utils import tensor2np
 from neural_sp.utils import mkdir_join
 
-import matplotlib
-matplotlib.use('Agg')
 
 random.seed(1)
 
@@ -54,9 +52,7 @@ class TransformerLM(LMBase):
         # for cache
         self.cache_theta = 0.2  # smoothing parameter
         self.cache_lambda = 0.2  # cache weight
-        self.cache_ids = []
-        self.cache_keys = []
-        self.cache_attn = []
+        self.reset_cache()
         self.embed_cache = None
 
         self.embed = nn.Embedding(self.vocab, self.d_model, padding_idx=self.pad)
@@ -147,6 +143,12 @@ class TransformerLM(LMBase):
             nn.init.constant_(self.output.bias, 0.)
             # nn.init.normal_(self.embed.weight, mean=0., std=self.d_model**-0.5)
 
+    def train(self, mode=True):
+        """Keep self-attention weights in evaluation mode for `plot_attention`."""
+        for layer in self.layers:
+            layer.need_weights = not mode
+        return super().train(mode)
+
     def embed_token_id(self, indices):
         """Embed token IDs.
 
@@ -167,45 +169,32 @@ class TransformerLM(LMBase):
 
         Args:
             ys (LongTensor): `[B, L]`
-            state (List): dummy interfance for RNNLM
-            mems (List): length `n_layers` (inter-utterance),
-                each of which contains a FloatTensor of size `[B, mlen, d_model]`
-            cache (List): length `n_layers` (intra-utterance),
-                each of which contains a FloatTensor of size `[B, L-1, d_model]`
+            state (List): length `n_layers`, projected keys/values of previous tokens
+                in each layer (used only in the incremental mode)
+            mems: dummy interfance for TransformerXL
+            cache: dummy interfance for TransformerXL
             incremental (bool): ASR decoding mode
         Returns:
             logits (FloatTensor): `[B, L, vocab]`
             out (FloatTensor): `[B, L, d_model]`
-            new_cache (List): length `n_layers`,
-                each of which contains a FloatTensor of size `[B, L, d_model]`
+            new_state (List): length `n_layers`, each of which contains a dict of
+                projected keys/values (see `append_kv_cache`)
 
         """
-        # for ASR decoding
-        if cache is None:
-            cache = [None] * self.n_layers  # 1-th to L-th layer
+        if incremental:
+            return self._decode_incremental(ys, state)
 
         bs, ylen = ys.size()[:2]
-        n_hist = 0
-        if incremental and cache[0] is not None:
-            n_hist = cache[0].size(1)
-            ylen += n_hist
 
         # Create the self-attention mask
         causal_mask = ys.new_ones(ylen, ylen).byte()
         causal_mask = torch.tril(causal_mask).unsqueeze(0)
         causal_mask = causal_mask.repeat([bs, 1, 1])  # `[B, L, L]`
 
-        out = self.pos_enc(self.embed_token_id(ys), scale=True, offset=max(0, n_hist))  # scaled + dropout
+        out = self.pos_enc(self.embed_token_id(ys), scale=True)  # scaled + dropout
 
-        new_cache = [None] * self.n_layers
-        hidden_states = [out]
         for lth, layer in enumerate(self.layers):
-            out = layer(out, causal_mask, cache=cache[lth])
-            if incremental:
-                new_cache[lth] = out
-            elif lth < self.n_layers - 1:
-                hidden_states.append(out)
-                # NOTE: outputs from the last layer is not used for cache
+            out = layer(out, causal_mask)
             if not self.training and layer.yy_aws is not None:
                 setattr(self, 'yy_aws_layer%d' % lth, tensor2np(layer.yy_aws))
         out = self.norm_out(out)
@@ -214,10 +203,60 @@ class TransformerLM(LMBase):
         else:
             logits = out
 
-        return logits, out, new_cache
+        return logits, out, [None] * self.n_layers
+
+    def _decode_incremental(self, ys, state=None):
+        """Decode new tokens given projected keys/values of previous tokens.
+
+        Only the new tokens are fed to each layer, and a single query token
+        attends to all cached positions without any mask.
+
+        Args:
+            ys (LongTensor): `[B, L]` (new tokens only)
+            state (List): length `n_layers`, projected keys/values of previous tokens
+                (previous tokens for convolutional positional encoding)
+        Returns:
+            logits (FloatTensor): `[B, L, vocab]`
+            out (FloatTensor): `[B, L, d_model]`
+            new_state (List): length `n_layers`, projected keys/values of all tokens
+
+        """
+        if '1dconv' in self.pos_enc.pe_type:
+            # NOTE: positional encodings by convolution cannot be cached, so fall back to
+            # full decoding over all tokens, which are kept in the state
+            ylen = ys.size(1)
+            if state is not None and state[0] is not None:
+                ys = torch.cat([state[0]['ys'], ys], dim=1)
+            logits, out, _ = self.decode(ys)
+            return logits[:, -ylen:], out[:, -ylen:], [{'ys': ys}] * self.n_layers
+        if state is None:
+            state = [None] * self.n_layers
+
+        ylen = ys.size(1)
+        n_hist = 0 if state[0] is None else state[0]['len']
+
+        causal_mask = None
+        if ylen > 1:
+            causal_mask = ys.new_ones(ylen, n_hist + ylen).byte()
+            causal_mask = torch.tril(causal_mask, diagonal=n_hist).unsqueeze(0)  # `[1, L, L_hist + L]`
+
+        out = self.pos_enc(self.embed_token_id(ys), scale=True, offset=n_hist)  # scaled + dropout
+
+        new_state = [None] * self.n_layers
+        for lth, layer in enumerate(self.layers):
+            out, new_state[lth] = layer.forward_incremental(out, state[lth], causal_mask)
+        out = self.norm_out(out)
+        if self.adaptive_softmax is None:
+            logits = self.output(out)
+        else:
+            logits = out
+
+        return logits, out, new_state
 
     def plot_attention(self, n_cols=4):
         """Plot attention for each head in all layers."""
+        import matplotlib
+        matplotlib.use('Agg')
         from matplotlib import pyplot as plt
         from matplotlib.ticker import MaxNLocator
 
@@ -79,83 +79,125 @@ class CIF(nn.Module):
         alpha = torch.sigmoid(self.proj(conv_feat)).squeeze(2)  # `[B, T]`
 
         # normalization
+        device = eouts.device
+        mask = make_pad_mask(elens.to(device))
         if mode == 'parallel':
             # padding
             assert ylens is not None
-            device = eouts.device
             ylens = ylens.to(device)
-            mask = make_pad_mask(elens.to(device))
             alpha = alpha.clone().masked_fill_(mask == 0, 0)
 
             alpha_norm = alpha / alpha.sum(1, keepdim=True) * ylens.float().unsqueeze(1)
             ymax = int(ylens.max().item())
         elif mode == 'incremental':
-            alpha_norm = alpha  # infernece time
+            alpha_norm = alpha.masked_fill(mask == 0, 0)  # infernece time
+            # fire the first token only
+            ylens = torch.ones(bs, dtype=torch.int64, device=device)
             ymax = 1
-            if bs > 1:
-                raise NotImplementedError('Batch mode is not supported.')
-                # TODO(hirofumi0810): support batch mode
         else:
             raise ValueError(mode)
 
-        cv = eouts.new_zeros(bs, ymax + 1, enc_dim)
-        aws = eouts.new_zeros(bs, ymax + 1, xmax)
-        n_tokens = torch.zeros(bs, dtype=torch.int64)
-        state = eouts.new_zeros(bs, self.enc_dim)
-        alpha_accum = eouts.new_zeros(bs)
-        for j in range(xmax):
-            alpha_accum_prev = alpha_accum
-            alpha_accum += alpha_norm[:, j]
-
-            if mode == 'parallel' and (alpha_accum >= self.beta).sum() == 0:
-                # No boundary is located in all utterances in mini-batch
-                # Carry over to the next frame
-                state += alpha_norm[:, j, None] * eouts[:, j]
-                aws[:, n_tokens, j] += alpha_norm[:, j]
-            else:
-                for b in range(bs):
-                    # skip the padding region
-                    if j > elens[b] - 1:
-                        continue
-
-                    # skip all-fired utterance
-                    if mode == 'parallel' and n_tokens[b].item() >= ylens[b]:
-                        continue
-
-                    if alpha_accum[b] < self.beta:
-                        # No boundary is located
-                        # Carry over to the next frame
-                        state[b] += alpha_norm[b, j, None] * eouts[b, j]
-                        aws[b, n_tokens[b], j] += alpha_norm[b, j]
-
-                        # tail handling
-                        if mode == 'incremental' and j == elens[b] - 1:
-                            if alpha_accum[b] >= 0.5:
-                                n_tokens[b] += 1
-                                cv[b, n_tokens[b]] = state[b]
-                            break
-                    else:
-                        # A boundary is located
-                        ak1 = 1 - alpha_accum_prev[b]
-                        ak2 = alpha_norm[b, j] - ak1
-                        cv[b, n_tokens[b]] = state[b] + ak1 * eouts[b, j]
-                        aws[b, n_tokens[b], j] += ak1
-                        n_tokens[b] += 1
-                        # Carry over to the next frame
-                        state[b] = ak2 * eouts[b, j]
-                        alpha_accum[b] = ak2
-                        aws[b, n_tokens[b], j] += ak2
-
-                        if mode == 'incremental':
-                            break
-
-                if mode == 'incremental' and n_tokens[0] >= 1:
-                    break
-                    # TODO(hirofumi0810): support batch mode
-
-        # truncate
-        cv = cv[:, :ymax]
-        aws = aws[:, :ymax]
+        cv, aws = integrate_and_fire(eouts, alpha_norm, self.beta, elens.to(device), ylens, ymax,
+                                     share_carry_over=(mode == 'parallel'))
         attn_state['alpha'] = alpha
 
         return cv, aws, attn_state
+
+
+def integrate_and_fire(xs, alpha, beta, elens, ylens, ymax, share_carry_over=True):
+    """Integrate weights and fire tokens at boundaries over the whole mini-batch.
+
+    This is equivalent to the recursion over frames below, but the frames are
+    processed at once and only firing frames are located token by token.
+
+        alpha_accum += alpha[j]
+        if alpha_accum < beta:  # carry over to the next frame
+            aws[n, j] += alpha[j]
+        else:  # fire the n-th token
+            ak1 = 1 - alpha_accum
+            aws[n, j] += ak1
+            aws[n + 1, j] += alpha[j] - ak1
+            alpha_accum = alpha[j] - ak1
+            n += 1
+
+    The accumulated weight before the reset at the n-th firing frame `f_n` is
+    `cumsum(alpha)[f_n] + sum_{m<n} (alpha[f_m] - 1)`, so the n-th token fires
+    at the first frame after `f_{n-1}` where the cumulative sum reaches the threshold.
+    Padding frames and tokens after `ylens` are skipped.
+
+    NOTE: When `share_carry_over` is True, frames where no boundary is located
+    in any utterance carry over weights of the whole mini-batch at once, and the
+    weight of the n-th token of each utterance at such a frame is set to that
+    of the last utterance whose n-th token is being integrated (as in the
+    original implementation).
+
+    Args:
+        xs (FloatTensor): `[B, T, enc_dim]`
+        alpha (FloatTensor): `[B, T]` (0 in the padding region)
+        beta (float): boundary threshold
+        elens (IntTensor): `[B]`
+        ylens (IntTensor): `[B]` (maximum number of tokens to fire)
+        ymax (int): maximum number of tokens in mini-batch
+        share_carry_over (bool): carry over weights of the whole mini-batch
+            at frames without any boundary (parallel mode)
+    Returns:
+        cv (FloatTensor): `[B, ymax, enc_dim]` (0 for tokens which are not fired)
+        aws (FloatTensor): `[B, ymax, T]`
+
+    """
+    bs, xmax = alpha.size()
+    device = alpha.device
+    elens = elens.long()
+    ylens = ylens.long()
+
+    alpha_cumsum = torch.cumsum(alpha, dim=1).contiguous()  # `[B, T]`
+
+    # locate boundaries token by token (xmax if not fired)
+    fire = alpha_cumsum.new_full((bs, ymax), xmax, dtype=torch.int64)  # `[B, L]`
+    fire_prev = alpha_cumsum.new_full((bs,), -1, dtype=torch.int64)
+    carry = alpha.new_zeros(bs)  # `sum_{m<n} (alpha[f_m] - 1)`
+    carry_cumsum = [carry]
+    for n in range(ymax):
+        f = torch.searchsorted(alpha_cumsum, (beta - carry).unsqueeze(1)).squeeze(1)
+        f = torch.max(f, fire_prev + 1)
+        f = f.masked_fill((f >= elens) | (n >= ylens), xmax)
+        fired = f < xmax
+        if not fired.any():
+            carry_cumsum += [carry] * (ymax - n)
+            break
+        fire[:, n] = f
+        carry = carry + (torch.gather(alpha, 1, f.clamp(max=xmax - 1).unsqueeze(1)).squeeze(1) - 1) * fired
+        carry_cumsum.append(carry)
+        fire_prev = f
+    carry_cumsum = torch.stack(carry_cumsum, dim=1)  # `[B, L + 1]`
+
+    # number of tokens fired before each frame
+    j = torch.arange(xmax, device=device)
+    n_tokens = torch.searchsorted(fire, j.unsqueeze(0).expand(bs, xmax).contiguous())  # `[B, T]`
+    is_fire = torch.gather(fire, 1, n_tokens.clamp(max=ymax - 1)) == j.unsqueeze(0)  # `[B, T]`
+    is_fire = is_fire & (n_tokens < ymax)
+    # accumulated weights (before the reset at firing frames)
+    alpha_accum = alpha_cumsum + torch.gather(carry_cumsum, 1, n_tokens)  # `[B, T]`
+
+    # weights of each token over frames
+    active = (j.unsqueeze(0) < elens.unsqueeze(1)) & (n_tokens < ylens.unsqueeze(1))  # `[B, T]`
+    ak1 = 1 - alpha_accum
+    rows = torch.arange(ymax + 1, device=device).view(1, ymax + 1, 1)
+    onehot = rows == n_tokens.unsqueeze(1)  # `[B, L + 1, T]`
+    aws = onehot * torch.where(is_fire, ak1, alpha * active).unsqueeze(1)
+    aws = aws + (rows == n_tokens.unsqueeze(1) + 1) * (is_fire * (alpha - ak1)).unsqueeze(1)
+    # NOTE: aws is `[B, L + 1, T]` here
+
+    fired = (fire < xmax).unsqueeze(2)  # `[B, L, 1]`
+    cv = torch.bmm(aws[:, :ymax] * fired, xs)  # `[B, L, enc_dim]`
+
+    if share_carry_over:
+        # frames where no boundary is located in any utterance
+        no_boundary = (alpha_accum < beta).all(0)  # `[T]`
+        # the last utterance whose n-th token is being integrated at each frame
+        utt_ids = torch.arange(1, bs + 1, device=device).view(bs, 1, 1)
+        last = (onehot * utt_ids).max(0)[0] - 1  # `[L + 1, T]`
+        aws_shared = torch.gather(alpha.t(), 1, last.clamp(min=0).t()).t() * (last >= 0)  # `[L + 1, T]`
+        aws = torch.where(no_boundary.view(1, 1, xmax), aws_shared.unsqueeze(0), aws)
+
+    return cv, aws[:, :ymax]
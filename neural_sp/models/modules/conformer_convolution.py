@@ -4,6 +4,7 @@
 """Convolution block for Conformer encoder."""
 
 import logging
+import torch
 import torch.nn as nn
 import torch.nn.functional as F
 
@@ -114,6 +115,50 @@ class ConformerConvBlock(nn.Module):
         if self.causal:
             xs = xs[:, :, :-self.padding]
 
+        return self._forward_post(xs, bs, xmax)
+
+    def forward_incremental(self, xs, cache=None):
+        """Forward pass for new frames only in the causal mode.
+
+        The last `kernel_size - 1` inputs of the depthwise convolution are kept as
+        the left context instead of zero padding, so that outputs are computed for
+        new frames only.
+
+        Args:
+            xs (FloatTensor): `[B, T, d_model]`
+            cache (FloatTensor): `[B, d_model, kernel_size - 1]`
+        Returns:
+            xs (FloatTensor): `[B, T, d_model]`
+            new_cache (FloatTensor): `[B, d_model, kernel_size - 1]`
+
+        """
+        assert self.causal
+        bs, xmax, dim = xs.size()
+
+        xs = xs.transpose(2, 1).contiguous()  # `[B, C, T]`
+        xs = self.pointwise_conv1(xs)  # `[B, 2 * C, T]`
+        xs = F.glu(xs, dim=1)  # `[B, C, T]`
+
+        if cache is None:
+            cache = xs.new_zeros(bs, dim, self.padding)
+        xs = torch.cat([cache, xs], dim=2)  # `[B, C, kernel_size - 1 + T]`
+        new_cache = xs[:, :, xs.size(2) - self.padding:]
+        xs = F.conv1d(xs, self.depthwise_conv.weight, self.depthwise_conv.bias,
+                      groups=self.depthwise_conv.groups)  # `[B, C, T]`
+
+        return self._forward_post(xs, bs, xmax), new_cache
+
+    def _forward_post(self, xs, bs, xmax):
+        """Normalization, activation, and pointwise convolution after depthwise convolution.
+
+        Args:
+            xs (FloatTensor): `[B, C, T]`
+            bs (int): batch size
+            xmax (int): number of frames
+        Returns:
+            xs (FloatTensor): `[B, T, d_model]`
+
+        """
         xs = xs.transpose(2, 1)
         if isinstance(self.norm, nn.LayerNorm):
             xs = self.activation(self.norm(xs))  # `[B, T, C]`
@@ -4,6 +4,7 @@
 """Gated Linear Units (GLU) block."""
 
 from collections import OrderedDict
+import torch
 import torch.nn as nn
 import torch.nn.functional as F
 
@@ -42,6 +43,7 @@ class ConvGLUBlock(nn.Module):
 
         super().__init__()
 
+        self.kernel_size = kernel_size
         self.conv_residual = None
         if in_ch != out_ch:
             self.conv_residual = nn.utils.weight_norm(
@@ -60,7 +62,7 @@ class ConvGLUBlock(nn.Module):
                           kernel_size=(kernel_size, 1)), name='weight', dim=0)
             # TODO(hirofumi0810): padding?
             layers['dropout'] = nn.Dropout(p=dropout)
-            layers['glu'] = nn.GLU()
+            layers['glu'] = nn.GLU(dim=1)  # over channels
 
         elif bottlececk_dim > 0:
             layers['conv_in'] = nn.utils.weight_norm(
@@ -73,12 +75,12 @@ class ConvGLUBlock(nn.Module):
                           out_channels=bottlececk_dim,
                           kernel_size=(kernel_size, 1)), name='weight', dim=0)
             layers['dropout'] = nn.Dropout(p=dropout)
-            layers['glu'] = nn.GLU()
             layers['conv_out'] = nn.utils.weight_norm(
                 nn.Conv2d(in_channels=bottlececk_dim,
                           out_channels=out_ch * 2,
                           kernel_size=(1, 1)), name='weight', dim=0)
             layers['dropout_out'] = nn.Dropout(p=dropout)
+            layers['glu'] = nn.GLU(dim=1)  # over channels
 
         self.layers = nn.Sequential(layers)
 
@@ -98,3 +100,29 @@ class ConvGLUBlock(nn.Module):
         xs = self.layers(xs)  # `[B, out_ch * 2, T ,1]`
         xs = xs + residual
         return xs
+
+    def forward_incremental(self, xs, cache=None):
+        """Forward pass for new frames only.
+
+        The last `kernel_size - 1` input frames are kept as the left context
+        instead of zero padding, so that outputs are computed for new frames only.
+
+        Args:
+            xs (FloatTensor): `[B, in_ch, L, feat_dim]`
+            cache (FloatTensor): `[B, in_ch, kernel_size - 1, feat_dim]`
+        Returns:
+            out (FloatTensor): `[B, out_ch, L, feat_dim]`
+            new_cache (FloatTensor): `[B, in_ch, kernel_size - 1, feat_dim]`
+
+        """
+        residual = xs
+        if self.conv_residual is not None:
+            residual = self.dropout_residual(self.conv_residual(residual))
+        if cache is None:
+            bs, in_ch, _, feat_dim = xs.size()
+            cache = xs.new_zeros(bs, in_ch, self.kernel_size - 1, feat_dim)
+        xs = torch.cat([cache, xs], dim=2)  # `[B, in_ch, kernel-1+L, feat_dim]`
+        new_cache = xs[:, :, xs.size(2) - (self.kernel_size - 1):]
+        xs = self.layers(xs)  # `[B, out_ch, L, feat_dim]`
+        xs = xs + residual
+        return xs, new_cache
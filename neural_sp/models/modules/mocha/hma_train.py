@@ -15,7 +15,7 @@ def parallel_monotonic_attention(e_ma, aw_prev, trigger_points, eps, noise_std,
 
     Args:
         e_ma (FloatTensor): `[B, H_ma, qlen, klen]`
-        aw_prev (FloatTensor): `[B, H_ma, qlen, klen]`
+        aw_prev (FloatTensor): `[B, H_ma, 1, klen]`
         trigger_points (IntTensor): `[B, qlen]`
         eps (float): epsilon parameter to avoid zero division
         noise_std (float): standard deviation for Gaussian noise
@@ -32,41 +32,109 @@ def parallel_monotonic_attention(e_ma, aw_prev, trigger_points, eps, noise_std,
     aw_prev = aw_prev[:, :, :, :klen]
 
     if decot:
-        aw_prev_pad = aw_prev.new_zeros(bs, H_ma, qlen, klen)
+        aw_prev_pad = aw_prev.new_zeros(bs, H_ma, 1, klen)
         aw_prev_pad[:, :, :, :aw_prev.size(3)] = aw_prev
         aw_prev = aw_prev_pad
 
-    bs, H_ma, qlen, klen = e_ma.size()
     p_choose = torch.sigmoid(add_gaussian_noise(e_ma, noise_std))  # `[B, H_ma, qlen, klen]`
-    alpha = []
     if stableemit_weight > 0:
         p_choose = (1 - stableemit_weight) * p_choose
     # safe_cumprod computes cumprod in logspace with numeric checks
     cumprod_1mp_choose = safe_cumprod(1 - p_choose, eps=eps)  # `[B, H_ma, qlen, klen]`
+
+    # Mask the right part from the trigger point
+    keep = None
+    if decot:
+        assert trigger_points is not None
+        boundary = trigger_points[:, :qlen].to(e_ma.device).long() + lookahead
+        keep = torch.arange(klen, device=e_ma.device).view(1, 1, 1, klen) <= \
+            boundary.view(bs, 1, qlen, 1)  # `[B, 1, qlen, klen]`
+
     # Compute recurrence relation solution
-    for i in range(qlen):
-        denom = 1 if no_denom else torch.clamp(
-            cumprod_1mp_choose[:, :, i:i + 1], min=eps, max=1.0)
-        cumsum_in = aw_prev / denom  # `[B, H_ma, 1, klen]`
-
-        monotonic = False
-        if monotonic and i > 0:
-            cumsum_in = torch.cat([denom.new_zeros(bs, H_ma, 1, 1),
-                                   cumsum_in[:, :, :, 1:]], dim=-1)
-
-        aw_prev = p_choose[:, :, i:i + 1] * cumprod_1mp_choose[:, :, i:i + 1] * \
-            torch.cumsum(cumsum_in, dim=-1)  # `[B, H_ma, 1, klen]`
-        # Mask the right part from the trigger point
-        if decot:
-            assert trigger_points is not None
-            for b in range(bs):
-                aw_prev[b, :, :, trigger_points[b, i:i + 1] + lookahead + 1:] = 0
-        alpha.append(aw_prev)
-
-    alpha = torch.cat(alpha, dim=2) if qlen > 1 else alpha[-1]  # `[B, H_ma, qlen, klen]`
+    alpha = MonotonicRecurrence.apply(p_choose, cumprod_1mp_choose, aw_prev, keep,
+                                      eps, no_denom)  # `[B, H_ma, qlen, klen]`
     return alpha, p_choose
 
 
+class MonotonicRecurrence(torch.autograd.Function):
+    """Recurrence relation of the expected monotonic alignment over output steps.
+
+    alpha_i = p_choose_i * cumprod_i * cumsum(alpha_{i-1} / clamp(cumprod_i, min=eps))
+
+    Intermediate results at each step are not kept for backward. Instead, gradients
+    are propagated backward in time by recomputing them from the inputs and alpha,
+    which reduces the activation memory of the recurrence to alpha only.
+
+    """
+    @staticmethod
+    def forward(ctx, p_choose, cumprod_1mp_choose, aw_prev, keep, eps, no_denom):
+        """Forward pass.
+
+        Args:
+            p_choose (FloatTensor): `[B, H_ma, qlen, klen]`
+            cumprod_1mp_choose (FloatTensor): `[B, H_ma, qlen, klen]`
+            aw_prev (FloatTensor): `[B, H_ma, 1, klen]`
+            keep (BoolTensor): `[B, 1, qlen, klen]`. None for no masking.
+            eps (float): epsilon parameter to avoid zero division
+            no_denom (bool): set the denominator to 1
+        Returns:
+            alpha (FloatTensor): `[B, H_ma, qlen, klen]`
+
+        """
+        ctx.eps = eps
+        ctx.no_denom = no_denom
+        alpha = p_choose.new_empty(p_choose.size())
+        a = aw_prev
+        for i in range(p_choose.size(2)):
+            q, denom = _step_inputs(p_choose, cumprod_1mp_choose, keep, i, eps, no_denom)
+            a = q * torch.cumsum(a / denom, dim=-1)  # `[B, H_ma, 1, klen]`
+            alpha[:, :, i:i + 1] = a
+        ctx.save_for_backward(p_choose, cumprod_1mp_choose, aw_prev, keep, alpha)
+        return alpha
+
+    @staticmethod
+    def backward(ctx, grad_alpha):
+        p_choose, cumprod_1mp_choose, aw_prev, keep, alpha = ctx.saved_tensors
+        eps, no_denom = ctx.eps, ctx.no_denom
+        grad_p_choose = torch.empty_like(p_choose)
+        grad_cumprod = torch.empty_like(cumprod_1mp_choose)
+        grad_aw_prev = None
+        for i in range(p_choose.size(2) - 1, -1, -1):
+            g = grad_alpha[:, :, i:i + 1]
+            if grad_aw_prev is not None:
+                g = g + grad_aw_prev
+            a = aw_prev if i == 0 else alpha[:, :, i - 1:i]
+            q, denom = _step_inputs(p_choose, cumprod_1mp_choose, keep, i, eps, no_denom)
+            # through q = p_choose * cumprod (* keep)
+            grad_q = g * torch.cumsum(a / denom, dim=-1)
+            if keep is not None:
+                grad_q = grad_q.masked_fill(~keep[:, :, i:i + 1], 0)
+            grad_p_choose[:, :, i:i + 1] = grad_q * cumprod_1mp_choose[:, :, i:i + 1]
+            grad_cumprod[:, :, i:i + 1] = grad_q * p_choose[:, :, i:i + 1]
+            # through the reversed cumulative sum
+            grad_aw_prev = (g * q).flip(-1).cumsum(-1).flip(-1) / denom
+            if not no_denom:
+                grad_denom = -grad_aw_prev * a / denom
+                grad_cumprod[:, :, i:i + 1] += grad_denom.masked_fill(denom != cumprod_1mp_choose[:, :, i:i + 1], 0)
+        return grad_p_choose, grad_cumprod, grad_aw_prev, None, None, None
+
+
+def _step_inputs(p_choose, cumprod_1mp_choose, keep, i, eps, no_denom):
+    """Return coefficients of the monotonic recurrence at the i-th step.
+
+    Returns:
+        q (FloatTensor): `[B, H_ma, 1, klen]`
+        denom (FloatTensor or float): `[B, H_ma, 1, klen]`
+
+    """
+    cumprod_i = cumprod_1mp_choose[:, :, i:i + 1]
+    q = p_choose[:, :, i:i + 1] * cumprod_i
+    if keep is not None:
+        q = q.masked_fill(~keep[:, :, i:i + 1], 0)
+    denom = 1 if no_denom else torch.clamp(cumprod_i, min=eps, max=1.0)
+    return q, denom
+
+
 def add_gaussian_noise(x, std):
     """Add Gaussian noise to encourage discreteness.
 
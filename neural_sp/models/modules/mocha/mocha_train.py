@@ -29,8 +29,7 @@ def soft_chunkwise_attention(alpha, u, mask, chunk_size, H_ca,
     bs, H_ma, qlen, klen = alpha.size()
     alpha = alpha.unsqueeze(2)  # `[B, H_ma, 1, qlen, klen]`
     u = u.unsqueeze(1)  # `[B, 1, (H_ma*)H_ca, qlen, klen]`
-    if H_ca > 1:
-        alpha = alpha.repeat([1, 1, H_ca, 1, 1])
+    # NOTE: alpha is broadcast over CA heads without being repeated
     if H_ma > 1 and not share_chunkwise_attention:
         u = u.view(bs, H_ma, H_ca, qlen, klen)
     # Shift logits to avoid overflow
@@ -70,14 +69,28 @@ def moving_sum(x, back, forward):
         x_sum (FloatTensor): `[B, H_ma, H_ca, qlen, klen]`
 
     """
-    bs, n_heads_mono, n_heads_chunk, qlen, klen = x.size()
-    x = x.reshape(-1, klen)
-    # Moving sum is computed as a carefully-padded 1D convolution with ones
-    x_padded = F.pad(x, pad=[back, forward])  # `[B * H_ma * H_ca * qlen, back + klen + forward]`
-    # Add a "channel" dimension
-    x_padded = x_padded.unsqueeze(1)
-    # Construct filters
-    filters = x.new_ones(1, 1, back + forward + 1)
-    x_sum = F.conv1d(x_padded, filters)
-    x_sum = x_sum.squeeze(1).view(bs, n_heads_mono, n_heads_chunk, qlen, -1)
+    klen = x.size(-1)
+    back = min(back, klen - 1)
+    forward = min(forward, klen - 1)
+    if back == 0 and forward == klen - 1:
+        # suffix sum (infinite lookback attention)
+        return x.flip(-1).cumsum(-1).flip(-1)
+    if forward == 0 and back == klen - 1:
+        # prefix sum
+        return x.cumsum(-1)
+    # Add window sums of power-of-two sizes, which are computed by doubling,
+    # instead of a 1D convolution with ones over all frames in the window
+    window = back + forward + 1
+    x_pow = F.pad(x, pad=[back, forward])  # window sums of size 1
+    x_sum = None
+    offset, size = 0, 1
+    while window > 0:
+        if window & 1:
+            x_sum = x_pow[..., offset:offset + klen] if x_sum is None else \
+                x_sum + x_pow[..., offset:offset + klen]
+            offset += size
+        window >>= 1
+        if window > 0:
+            x_pow = x_pow[..., :-size] + x_pow[..., size:]  # window sums of size `2 * size`
+            size *= 2
     return x_sum
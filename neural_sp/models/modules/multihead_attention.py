@@ -8,11 +8,14 @@ import math
 import numpy as np
 import torch
 import torch.nn as nn
+import torch.nn.functional as F
 
 from neural_sp.models.modules.headdrop import headdrop
 
 logger = logging.getLogger(__name__)
 
+sdpa_available = hasattr(F, 'scaled_dot_product_attention')
+
 
 class MultiheadAttentionMechanism(nn.Module):
     """Multi-headed attention (MHA) layer.
@@ -91,7 +94,8 @@ class MultiheadAttentionMechanism(nn.Module):
         self.mask = None
 
     def forward(self, key, value, query, mask, aw_prev=None, aw_lower=None,
-                cache=False, mode='', trigger_points=None, eps_wait=-1, streaming=False):
+                cache=False, mode='', trigger_points=None, eps_wait=-1, streaming=False,
+                need_weights=True):
         """Forward pass.
 
         Args:
@@ -105,9 +109,11 @@ class MultiheadAttentionMechanism(nn.Module):
             trigger_points: dummy interface for MoChA/MMA
             eps_wait: dummy interface for MMA
             streaming: dummy interface for streaming attention
+            need_weights (bool): return attention weights. If False, the fused kernel
+                (scaled_dot_product_attention) is used when available.
         Returns:
             cv (FloatTensor): `[B, qlen, vdim]`
-            aw (FloatTensor): `[B, H, qlen, klen]`
+            aw (FloatTensor): `[B, H, qlen, klen]`. None if not need_weights.
             attn_state (dict): dummy interface
 
         """
@@ -120,8 +126,8 @@ class MultiheadAttentionMechanism(nn.Module):
             self.key = self.w_key(key).view(bs, -1, self.n_heads, self.d_k)  # `[B, klen, H, d_k]`
             self.value = self.w_value(value).view(bs, -1, self.n_heads, self.d_k)  # `[B, klen, H, d_k]`
             if mask is not None:
-                self.mask = mask.unsqueeze(3).repeat([1, 1, 1, self.n_heads])
-                mask_size = (bs, qlen, klen, self.n_heads)
+                self.mask = mask.unsqueeze(3)  # `[B, qlen, klen, 1]`, broadcast over heads
+                mask_size = (bs, qlen, klen, 1)
                 assert self.mask.size() == mask_size, (self.mask.size(), mask_size)
             else:
                 self.mask = None
@@ -129,6 +135,10 @@ class MultiheadAttentionMechanism(nn.Module):
         key = self.key
         query = self.w_query(query).view(bs, -1, self.n_heads, self.d_k)  # `[B, qlen, H, d_k]`
 
+        if not need_weights and self.atype == 'scaled_dot' and sdpa_available:
+            if not (self.dropout_head > 0 and self.training):
+                return self._forward_fused(query), None, attn_state
+
         if self.atype == 'scaled_dot':
             e = torch.einsum("bihd,bjhd->bijh", (query, key)) / self.scale
         elif self.atype == 'add':
@@ -155,3 +165,220 @@ class MultiheadAttentionMechanism(nn.Module):
         aw = aw.permute(0, 3, 1, 2)  # `[B, H, qlen, klen]`
 
         return cv, aw, attn_state
+
+    def _forward_fused(self, query):
+        """Scaled dot-product attention with the fused kernel.
+
+        Attention weights are not materialized for each head.
+
+        Args:
+            query (FloatTensor): `[B, qlen, H, d_k]` (projected)
+        Returns:
+            cv (FloatTensor): `[B, qlen, vdim]`
+
+        """
+        bs = query.size(0)
+        attn_mask = None
+        if self.mask is not None:
+            # NOTE: use an additive mask so that fully-masked queries (padding) attend to
+            # all keys uniformly as in the unfused path, rather than outputting zeros
+            NEG_INF = float(np.finfo(torch.tensor(0, dtype=query.dtype).numpy().dtype).min)
+            attn_mask = query.new_zeros(self.mask.size()).masked_fill_(self.mask == 0, NEG_INF)
+            attn_mask = attn_mask.permute(0, 3, 1, 2)  # `[B, 1, qlen, klen]`
+        cv = F.scaled_dot_product_attention(
+            query.transpose(2, 1), self.key.transpose(2, 1), self.value.transpose(2, 1),
+            attn_mask=attn_mask,
+            dropout_p=self.dropout_attn.p if self.training else 0.)  # `[B, H, qlen, d_k]`
+        cv = cv.transpose(2, 1).contiguous().view(bs, -1, self.n_heads * self.d_k)  # `[B, qlen, H * d_k]`
+        return self.w_out(cv)
+
+    def forward_incremental(self, key, query, kv_cache=None, mask=None):
+        """Incremental self-attention over cached projected keys and values.
+
+        Keys and values of new positions are projected once and appended to
+        preallocated buffers, so that previous positions are never recomputed.
+
+        Args:
+            key (FloatTensor): `[B, qlen, kdim]` (new positions only, also used as value)
+            query (FloatTensor): `[B, qlen, qdim]`
+            kv_cache (dict): projected keys/values of previous positions
+                key (FloatTensor): `[B, H, capacity, d_k]`
+                value (FloatTensor): `[B, H, capacity, d_k]`
+                len (int): number of valid positions
+            mask (ByteTensor): `[B, qlen, klen]`. This can be None for a single query.
+        Returns:
+            cv (FloatTensor): `[B, qlen, vdim]`
+            aw (FloatTensor): `[B, H, qlen, klen]`
+            kv_cache (dict): updated cache
+
+        """
+        assert self.atype == 'scaled_dot', self.atype
+        bs, qlen = query.size()[:2]
+
+        k = self.w_key(key).view(bs, -1, self.n_heads, self.d_k).transpose(2, 1)  # `[B, H, qlen, d_k]`
+        v = self.w_value(key).view(bs, -1, self.n_heads, self.d_k).transpose(2, 1)  # `[B, H, qlen, d_k]`
+        kv_cache = append_kv_cache(kv_cache, k, v)
+        klen = kv_cache['len']
+        k = kv_cache['key'][:, :, :klen]  # `[B, H, klen, d_k]`
+        v = kv_cache['value'][:, :, :klen]  # `[B, H, klen, d_k]`
+
+        q = self.w_query(query).view(bs, -1, self.n_heads, self.d_k).transpose(2, 1)  # `[B, H, qlen, d_k]`
+        e = torch.matmul(q, k.transpose(3, 2)) / self.scale  # `[B, H, qlen, klen]`
+        if mask is not None:
+            NEG_INF = float(np.finfo(torch.tensor(0, dtype=e.dtype).numpy().dtype).min)
+            e = e.masked_fill_(mask.unsqueeze(1) == 0, NEG_INF)
+        aw = torch.softmax(e, dim=-1)
+        aw = self.dropout_attn(aw)
+
+        cv = torch.matmul(aw, v)  # `[B, H, qlen, d_k]`
+        cv = cv.transpose(2, 1).contiguous().view(bs, -1, self.n_heads * self.d_k)  # `[B, qlen, H * d_k]`
+        cv = self.w_out(cv)
+
+        return cv, aw, kv_cache
+
+    def forward_block(self, query, kv_cache, mask=None):
+        """Self-attention for a new block over ring buffers of projected keys and values.
+
+        Keys and values of previous blocks are kept up to a fixed left-context budget,
+        so that computation and memory per block are independent of the input length.
+
+        Args:
+            query (FloatTensor): `[B, qlen, qdim]` (new positions only, also used as key/value)
+            kv_cache (dict): ring buffers of projected keys/values (see `update_kv_ring_buffer`)
+            mask (ByteTensor): `[B, qlen, qlen]` over new positions.
+                All cached positions are visible from new positions.
+        Returns:
+            cv (FloatTensor): `[B, qlen, vdim]`
+            aw (FloatTensor): `[B, H, qlen, mlen+qlen]`
+            kv_cache (dict): updated cache
+
+        """
+        assert self.atype == 'scaled_dot', self.atype
+        bs, qlen = query.size()[:2]
+        mlen = kv_cache['len']
+
+        k = self.w_key(query).view(bs, -1, self.n_heads, self.d_k).transpose(2, 1)  # `[B, H, qlen, d_k]`
+        v = self.w_value(query).view(bs, -1, self.n_heads, self.d_k).transpose(2, 1)  # `[B, H, qlen, d_k]`
+        q = self.w_query(query).view(bs, -1, self.n_heads, self.d_k).transpose(2, 1)  # `[B, H, qlen, d_k]`
+        if mlen > 0:
+            # NOTE: the order of cached positions does not matter without positional terms
+            k_all = torch.cat([kv_cache['key'][:, :, :mlen], k], dim=2)  # `[B, H, mlen+qlen, d_k]`
+            v_all = torch.cat([kv_cache['value'][:, :, :mlen], v], dim=2)  # `[B, H, mlen+qlen, d_k]`
+        else:
+            k_all, v_all = k, v
+
+        e = torch.matmul(q, k_all.transpose(3, 2)) / self.scale  # `[B, H, qlen, mlen+qlen]`
+        if mask is not None:
+            NEG_INF = float(np.finfo(torch.tensor(0, dtype=e.dtype).numpy().dtype).min)
+            e[:, :, :, mlen:] = e[:, :, :, mlen:].masked_fill(mask.unsqueeze(1) == 0, NEG_INF)
+        aw = torch.softmax(e, dim=-1)
+        aw = self.dropout_attn(aw)
+
+        cv = torch.matmul(aw, v_all)  # `[B, H, qlen, d_k]`
+        cv = cv.transpose(2, 1).contiguous().view(bs, -1, self.n_heads * self.d_k)  # `[B, qlen, H * d_k]`
+        cv = self.w_out(cv)
+
+        kv_cache = update_kv_ring_buffer(kv_cache, k, v)
+        return cv, aw, kv_cache
+
+
+def init_kv_ring_buffer(max_len):
+    """Initialize ring buffers of projected keys and values.
+
+    Args:
+        max_len (int): maximum number of cached positions (left-context budget)
+    Returns:
+        kv_cache (dict):
+            key (FloatTensor): `[B, H, capacity, d_k]`. Allocated at the first update.
+            value (FloatTensor): `[B, H, capacity, d_k]`. Allocated at the first update.
+            len (int): number of valid positions
+            offset (int): buffer index of the oldest position
+            max_len (int): maximum number of cached positions
+
+    """
+    return {'key': None, 'value': None, 'len': 0, 'offset': 0, 'max_len': max_len}
+
+
+def update_kv_ring_buffer(kv_cache, key, value, min_capacity=64):
+    """Write projected keys and values of new positions to ring buffers.
+
+    Only the last `max_len` positions are kept. The buffers grow up to `max_len`
+    positions, and then the oldest positions are overwritten in place.
+    Cached positions are in chronological order from the `offset`-th entry.
+
+    Args:
+        kv_cache (dict): ring buffers (see `init_kv_ring_buffer`)
+        key (FloatTensor): `[B, H, L, d_k]`
+        value (FloatTensor): `[B, H, L, d_k]`
+        min_capacity (int): minimum number of positions to allocate
+    Returns:
+        kv_cache (dict): updated ring buffers
+
+    """
+    bs, n_heads, L, d_k = key.size()
+    max_len = kv_cache['max_len']
+    n_hist, offset = kv_cache['len'], kv_cache['offset']
+    kv_cache = dict(kv_cache)
+    if max_len == 0:
+        return kv_cache
+    if L > max_len:
+        key, value = key[:, :, L - max_len:], value[:, :, L - max_len:]
+
+    capacity = 0 if kv_cache['key'] is None else kv_cache['key'].size(2)
+    if n_hist + L > capacity and capacity < max_len:
+        # grow before wrapping around (offset is always 0 here)
+        capacity = min(max_len, max(min_capacity, capacity * 2, n_hist + L))
+        key_buf = key.new_zeros(bs, n_heads, capacity, d_k)
+        value_buf = value.new_zeros(bs, n_heads, capacity, d_k)
+        if n_hist > 0:
+            key_buf[:, :, :n_hist] = kv_cache['key'][:, :, :n_hist]
+            value_buf[:, :, :n_hist] = kv_cache['value'][:, :, :n_hist]
+        kv_cache['key'], kv_cache['value'] = key_buf, value_buf
+
+    n_write = key.size(2)
+    slots = (offset + n_hist + L - n_write + torch.arange(n_write, device=key.device)) % capacity
+    kv_cache['key'].index_copy_(2, slots, key)
+    kv_cache['value'].index_copy_(2, slots, value)
+    if n_hist + L > capacity:
+        kv_cache['offset'] = (offset + n_hist + L - capacity) % capacity
+    kv_cache['len'] = min(capacity, n_hist + L)
+    return kv_cache
+
+
+def append_kv_cache(kv_cache, key, value, min_capacity=64):
+    """Append projected keys and values to preallocated buffers.
+
+    The buffers are reallocated with doubled capacity only when they are full,
+    so that appending a single position costs amortized constant time.
+    NOTE: buffers are written in place beyond `len`. When multiple hypotheses
+    are branched from the same cache, copy it first (e.g., by `index_select`
+    over the batch dimension).
+
+    Args:
+        kv_cache (dict): key/value buffers. None for the first call.
+        key (FloatTensor): `[B, H, L, d_k]`
+        value (FloatTensor): `[B, H, L, d_k]`
+        min_capacity (int): minimum number of positions to preallocate
+    Returns:
+        kv_cache (dict):
+            key (FloatTensor): `[B, H, capacity, d_k]`
+            value (FloatTensor): `[B, H, capacity, d_k]`
+            len (int): number of valid positions
+
+    """
+    bs, n_heads, L, d_k = key.size()
+    n_hist = 0 if kv_cache is None else kv_cache['len']
+    capacity = 0 if kv_cache is None else kv_cache['key'].size(2)
+
+    if n_hist + L > capacity:
+        capacity = max(min_capacity, capacity * 2, n_hist + L)
+        key_buf = key.new_zeros(bs, n_heads, capacity, d_k)
+        value_buf = value.new_zeros(bs, n_heads, capacity, d_k)
+        if n_hist > 0:
+            key_buf[:, :, :n_hist] = kv_cache['key'][:, :, :n_hist]
+            value_buf[:, :, :n_hist] = kv_cache['value'][:, :, :n_hist]
+        kv_cache = {'key': key_buf, 'value': value_buf, 'len': n_hist}
+
+    kv_cache['key'][:, :, n_hist:n_hist + L] = key
+    kv_cache['value'][:, :, n_hist:n_hist + L] = value
+    return {'key': kv_cache['key'], 'value': kv_cache['value'], 'len': n_hist + L}
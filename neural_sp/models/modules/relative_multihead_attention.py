@@ -3,7 +3,7 @@
 
 """Relative multi-head attention layer for TransformerXL."""
 
-from distutils.version import LooseVersion
+import functools
 import logging
 import math
 import numpy as np
@@ -11,11 +11,42 @@ import torch
 import torch.nn as nn
 
 from neural_sp.models.modules.headdrop import headdrop
+from neural_sp.models.modules.multihead_attention import update_kv_ring_buffer
 
 
 logger = logging.getLogger(__name__)
 
-torch_12_plus = LooseVersion(torch.__version__) >= LooseVersion("1.2")
+
+def make_rel_pos_idx(qlen, klen, mem_offset=0, clamp_len=-1, device=None):
+    """Make indices of relative positional embeddings for each query-key pair.
+
+    Args:
+        qlen (int): query length
+        klen (int): key length (mlen+qlen)
+        mem_offset (int): position of the oldest state in memory (ring buffer)
+        clamp_len (int): maximum relative distance
+        device (torch.device): device
+    Returns:
+        rel_pos_idx (LongTensor): `[klen, qlen]`
+
+    """
+    mlen = klen - qlen
+    k_idx = torch.arange(klen, device=device)
+    if mem_offset > 0:  # memory is not empty
+        # map ring buffer slots to chronological positions
+        k_idx = torch.where(k_idx < mlen, (k_idx - mem_offset) % mlen, k_idx)
+    q_idx = torch.arange(qlen, device=device)
+    rel_pos_idx = (mlen + q_idx.unsqueeze(0) - k_idx.unsqueeze(1)).abs()
+    # NOTE: original postional encodings are generated with reversed order
+    if clamp_len > 0:
+        rel_pos_idx = rel_pos_idx.clamp(max=clamp_len)
+    return rel_pos_idx
+
+
+@functools.lru_cache(maxsize=64)
+def make_rel_pos_idx_cached(qlen, klen, mem_offset=0, clamp_len=-1, device=None):
+    """Cached `make_rel_pos_idx` shared by all layers. Do not modify outputs in-place."""
+    return make_rel_pos_idx(qlen, klen, mem_offset, clamp_len, device)
 
 
 class RelativeMultiheadAttentionMechanism(nn.Module):
@@ -109,11 +140,13 @@ class RelativeMultiheadAttentionMechanism(nn.Module):
 
         return xs_shifted.view(qlen, klen, bs, n_heads).permute(2, 0, 1, 3)
 
-    def _rel_shift(self, xs):
+    def _rel_shift(self, xs, mem_offset=0):
         """Calculate relative positional attention efficiently.
 
         Args:
             xs (FloatTensor): `[B, qlen, klen, H]`
+            mem_offset (int): position of the oldest state in memory.
+                Memory is stored in a ring buffer, whose `mem_offset`-th entry is the oldest.
         Returns:
             xs_shifted (FloatTensor): `[B, qlen, klen, H]`
 
@@ -121,29 +154,17 @@ class RelativeMultiheadAttentionMechanism(nn.Module):
         bs, qlen, klen, n_heads = xs.size()
         xs = xs.permute(0, 3, 2, 1)  # `[B, H, klen, qlen]`
 
-        idx = torch.arange(klen, device=xs.device)
-        k_idx, q_idx = idx.unsqueeze(0), idx.unsqueeze(1)
-        rel_pos_idx = torch.abs(k_idx - q_idx)
-        # original postional encodings are generated with reversed order
-
-        # for streaming inference
-        if klen != qlen:
-            rel_pos_idx = rel_pos_idx[:, :qlen]
-            mask = xs.new_ones(qlen, klen, dtype=torch.bool if torch_12_plus else torch.uint8)
-            mask = torch.tril(mask, diagonal=0).transpose(1, 0)
-            rel_pos_idx[mask] *= -1
-            rel_pos_idx = klen - qlen - rel_pos_idx
-            rel_pos_idx[rel_pos_idx < 0] *= -1
-
-        if self.clamp_len > 0:
-            rel_pos_idx.clamp_(max=self.clamp_len)
-        rel_pos_idx = rel_pos_idx.expand_as(xs)
-        x_shift = torch.gather(xs, dim=2, index=rel_pos_idx)  # `[B, H, klen, qlen]`
+        if torch.jit.is_tracing():
+            # NOTE: lengths are dynamic in traced graphs
+            rel_pos_idx = make_rel_pos_idx(qlen, klen, mem_offset, self.clamp_len, xs.device)
+        else:
+            rel_pos_idx = make_rel_pos_idx_cached(qlen, klen, mem_offset, self.clamp_len, xs.device)
+        x_shift = torch.gather(xs, dim=2, index=rel_pos_idx.expand_as(xs))  # `[B, H, klen, qlen]`
 
         x_shift = x_shift.permute(0, 3, 2, 1)
         return x_shift
 
-    def forward(self, key, query, pos_embs, mask, u_bias=None, v_bias=None):
+    def forward(self, key, query, pos_embs, mask, u_bias=None, v_bias=None, mem_offset=0):
         """Forward pass.
 
         Args:
@@ -152,6 +173,7 @@ class RelativeMultiheadAttentionMechanism(nn.Module):
             pos_embs (LongTensor): `[mlen+qlen, 1, d_model]`
             u_bias (nn.Parameter): `[H, d_k]`
             v_bias (nn.Parameter): `[H, d_k]`
+            mem_offset (int): position of the oldest state in memory (ring buffer)
         Returns:
             cv (FloatTensor): `[B, qlen, vdim]`
             aw (FloatTensor): `[B, H, qlen, mlen+qlen]`
@@ -193,7 +215,7 @@ class RelativeMultiheadAttentionMechanism(nn.Module):
             BD = torch.einsum("bihd,jhd->bijh", (q, _pos_embs))  # `[B, qlen, mlen+qlen, H]`
 
         # Compute positional attention efficiently
-        BD = self._rel_shift(BD)
+        BD = self._rel_shift(BD, mem_offset)
 
         # the attention is the sum of content-based and position-based attention
         e = (AC + BD) / self.scale  # `[B, qlen, mlen+qlen, H]`
@@ -218,3 +240,69 @@ class RelativeMultiheadAttentionMechanism(nn.Module):
         aw = aw.permute(0, 3, 1, 2)  # `[B, H, qlen, mlen+qlen]`
 
         return cv, aw
+
+    def forward_block(self, query, kv_cache, pos_embs, mask=None, u_bias=None, v_bias=None):
+        """Self-attention for a new block over ring buffers of projected keys and values.
+
+        Args:
+            query (FloatTensor): `[B, qlen, qdim]` (new positions only, also used as key/value)
+            kv_cache (dict): ring buffers of projected keys/values (see `update_kv_ring_buffer`)
+            pos_embs (LongTensor): `[mlen+qlen, 1, d_model]`
+            mask (ByteTensor): `[B, qlen, qlen]` over new positions.
+                All cached positions are visible from new positions.
+            u_bias (nn.Parameter): `[H, d_k]`
+            v_bias (nn.Parameter): `[H, d_k]`
+        Returns:
+            cv (FloatTensor): `[B, qlen, vdim]`
+            aw (FloatTensor): `[B, H, qlen, mlen+qlen]`
+            kv_cache (dict): updated cache
+
+        """
+        bs, qlen = query.size()[:2]
+        mlen = kv_cache['len']
+        # NOTE: the oldest cached position is the `mem_offset`-th entry after the buffers are full
+        mem_offset = kv_cache['offset']
+
+        k = self.w_key(query).view(bs, -1, self.n_heads, self.d_k)  # `[B, qlen, H, d_k]`
+        v = self.w_value(query).view(bs, -1, self.n_heads, self.d_k)  # `[B, qlen, H, d_k]`
+        q = self.w_query(query).view(bs, -1, self.n_heads, self.d_k)  # `[B, qlen, H, d_k]`
+        k_new, v_new = k.transpose(2, 1), v.transpose(2, 1)  # `[B, H, qlen, d_k]`
+        if mlen > 0:
+            k = torch.cat([kv_cache['key'][:, :, :mlen].transpose(2, 1), k], dim=1)  # `[B, mlen+qlen, H, d_k]`
+            v = torch.cat([kv_cache['value'][:, :, :mlen].transpose(2, 1), v], dim=1)  # `[B, mlen+qlen, H, d_k]`
+
+        if self.xl_like:
+            _pos_embs = self.w_pos(pos_embs)
+        else:
+            _pos_embs = self.w_value(pos_embs)  # NOTE: this is not w_value
+        _pos_embs = _pos_embs.view(-1, self.n_heads, self.d_k)  # `[mlen+qlen, H, d_k]`
+
+        # content-based attention term: (a) + (c)
+        if u_bias is not None:
+            assert self.xl_like
+            AC = torch.einsum("bihd,bjhd->bijh", (q + u_bias[None, None], k))  # `[B, qlen, mlen+qlen, H]`
+        else:
+            AC = torch.einsum("bihd,bjhd->bijh", (q, k))  # `[B, qlen, mlen+qlen, H]`
+
+        # position-based attention term: (b) + (d)
+        if v_bias is not None:
+            assert self.xl_like
+            BD = torch.einsum("bihd,jhd->bijh", (q + v_bias[None, None], _pos_embs))  # `[B, qlen, mlen+qlen, H]`
+        else:
+            BD = torch.einsum("bihd,jhd->bijh", (q, _pos_embs))  # `[B, qlen, mlen+qlen, H]`
+        BD = self._rel_shift(BD, mem_offset)
+
+        e = (AC + BD) / self.scale  # `[B, qlen, mlen+qlen, H]`
+        if mask is not None:
+            NEG_INF = float(np.finfo(torch.tensor(0, dtype=e.dtype).numpy().dtype).min)
+            e[:, :, mlen:] = e[:, :, mlen:].masked_fill(mask.unsqueeze(3) == 0, NEG_INF)
+        aw = torch.softmax(e, dim=2)
+        aw = self.dropout_attn(aw)  # `[B, qlen, mlen+qlen, H]`
+
+        cv = torch.einsum("bijh,bjhd->bihd", (aw, v))  # `[B, qlen, H, d_k]`
+        cv = cv.contiguous().view(bs, -1, self.n_heads * self.d_k)  # `[B, qlen, H * d_k]`
+        cv = self.w_out(cv)
+        aw = aw.permute(0, 3, 1, 2)  # `[B, H, qlen, mlen+qlen]`
+
+        kv_cache = update_kv_ring_buffer(kv_cache, k_new, v_new)
+        return cv, aw, kv_cache
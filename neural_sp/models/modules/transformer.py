@@ -137,6 +137,10 @@ class TransformerDecoderBlock(nn.Module):
                                    dropout=dropout_att,
                                    param_init=param_init)
 
+        # NOTE: self-attention weights are only used for visualization, and the fused
+        # kernel is used otherwise (see neural_sp.trainers.attention_capture)
+        self.need_weights = False
+
         self.reset_visualization()
 
     @property
@@ -173,7 +177,7 @@ class TransformerDecoderBlock(nn.Module):
     def forward(self, ys, yy_mask, xs=None, xy_mask=None, cache=None,
                 xy_aws_prev=None,
                 mode='hard', eps_wait=-1, lmout=None,
-                pos_embs=None, memory=None, u_bias=None, v_bias=None):
+                pos_embs=None, memory=None, u_bias=None, v_bias=None, mem_offset=0):
         """Transformer decoder forward pass.
 
         Args:
@@ -190,6 +194,7 @@ class TransformerDecoderBlock(nn.Module):
             memory (FloatTensor): `[B, L_prev, d_model]`
             u_bias (FloatTensor): global parameter for TransformerXL
             v_bias (FloatTensor): global parameter for TransformerXL
+            mem_offset (int): position of the oldest state in memory (ring buffer) for TransformerXL
         Returns:
             out (FloatTensor): `[B, L, d_model]`
 
@@ -222,18 +227,27 @@ class TransformerDecoderBlock(nn.Module):
 
         # self-attention
         if self.memory_transformer:
-            out, self._yy_aws = self.self_attn(cat, ys_q, pos_embs, yy_mask, u_bias, v_bias)  # k/q/m
+            out, self._yy_aws = self.self_attn(cat, ys_q, pos_embs, yy_mask, u_bias, v_bias,
+                                               mem_offset=mem_offset)  # k/q/m
         else:
-            out, self._yy_aws = self.self_attn(ys, ys, ys_q, mask=yy_mask)[:2]  # k/v/q
+            out, self._yy_aws = self.self_attn(ys, ys, ys_q, mask=yy_mask,
+                                               need_weights=self.need_weights)[:2]  # k/v/q
         out = self.dropout(out) + residual
 
         # attention over encoder stacks
         if self.src_tgt_attention:
             residual = out
             out = self.norm2(out)
-            out, self._xy_aws, attn_state = self.src_attn(
-                xs, xs, out, mask=xy_mask,  # k/v/q
-                aw_prev=xy_aws_prev, mode=mode, eps_wait=eps_wait)
+            if 'mocha' in self.atype:
+                # NOTE: attention weights are necessary for quantity loss
+                out, self._xy_aws, attn_state = self.src_attn(
+                    xs, xs, out, mask=xy_mask,  # k/v/q
+                    aw_prev=xy_aws_prev, mode=mode, eps_wait=eps_wait)
+            else:
+                # NOTE: attention weights are necessary for alignments in decoding
+                out, self._xy_aws, attn_state = self.src_attn(
+                    xs, xs, out, mask=xy_mask,  # k/v/q
+                    need_weights=self.need_weights or not self.training)
             out = self.dropout(out) + residual
 
             if attn_state.get('beta', None) is not None:
@@ -249,7 +263,8 @@ class TransformerDecoderBlock(nn.Module):
 
             # attention over LM outputs
             if 'attention' in self.lm_fusion:
-                out, self._yy_aws_lm, _ = self.lm_attn(lmout, lmout, out, mask=yy_mask)  # k/v/q
+                out, self._yy_aws_lm, _ = self.lm_attn(lmout, lmout, out, mask=yy_mask,
+                                                       need_weights=self.need_weights)  # k/v/q
 
             gate = torch.sigmoid(self.linear_lm_gate(torch.cat([out, lmout], dim=-1)))
             gated_lmout = gate * lmout
@@ -267,6 +282,38 @@ class TransformerDecoderBlock(nn.Module):
 
         return out
 
+    def forward_incremental(self, ys, kv_cache=None, yy_mask=None):
+        """Transformer decoder forward pass for new positions only.
+
+        This is used for incremental decoding of decoder-only models (e.g., TransformerLM).
+
+        Args:
+            ys (FloatTensor): `[B, L, d_model]`
+            kv_cache (dict): projected keys/values of previous positions
+            yy_mask (ByteTensor): `[B, L, L_hist + L]`. This can be None for a single query.
+        Returns:
+            out (FloatTensor): `[B, L, d_model]`
+            kv_cache (dict): updated projected keys/values
+
+        """
+        assert not self.src_tgt_attention and not self.memory_transformer and not self.lm_fusion
+        self.reset_visualization()
+
+        residual = ys
+        ys = self.norm1(ys)  # pre-norm
+
+        # self-attention
+        out, self._yy_aws, kv_cache = self.self_attn.forward_incremental(ys, ys, kv_cache, yy_mask)
+        out = self.dropout(out) + residual
+
+        # position-wise feed-forward
+        residual = out
+        out = self.norm3(out)
+        out = self.feed_forward(out)
+        out = self.dropout(out) + residual
+
+        return out, kv_cache
+
 
 class SyncBidirTransformerDecoderBlock(nn.Module):
     """A single layer of the synchronous bidirectional Transformer decoder.
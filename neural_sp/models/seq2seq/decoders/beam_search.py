@@ -7,7 +7,10 @@ import logging
 import numpy as np
 import torch
 
+from neural_sp.models.lm.rnnlm import RNNLM
+from neural_sp.models.lm.transformerlm import TransformerLM
 from neural_sp.models.torch_utils import (
+    make_pad_mask,
     np2tensor,
     pad_list,
     tensor2np,
@@ -114,30 +117,155 @@ class BeamSearch(object):
 
     @staticmethod
     def lm_rescoring(hyps, lm, lm_weight, reverse=False, length_norm=False, tag=''):
+        """Rescore n-best hypotheses of a single utterance with an external LM.
+
+        Args:
+            hyps (List[dict]): n-best hypotheses
+            lm (LMBase): second-pass LM
+            lm_weight (float): weight of the second-pass LM score
+            reverse (bool): score reversed token sequences (for backward LMs)
+            length_norm (bool): normalize LM scores by length
+            tag (str): suffix of the key to store LM scores
+        Returns:
+            hyps (List[dict]): n-best hypotheses (not sorted)
+
+        """
         if lm is None:
             return hyps
-        for i in range(len(hyps)):
-            ys = hyps[i]['hyp']  # include <sos>
-            if reverse:
-                ys = ys[::-1]
-
-            ys = [np2tensor(np.fromiter(ys, dtype=np.int64), lm.device)]
-            ys_in = pad_list([y[:-1] for y in ys], -1)  # `[1, L-1]`
-            ys_out = pad_list([y[1:] for y in ys], -1)  # `[1, L-1]`
-
-            if ys_in.size(1) > 0:
-                _, _, scores_lm = lm.predict(ys_in, None)
-                score_lm = sum([scores_lm[0, t, ys_out[0, t]] for t in range(ys_out.size(1))])
-                if length_norm:
-                    score_lm /= ys_out.size(1)  # normalize by length
-            else:
-                score_lm = 0
+        return BeamSearch.lm_rescoring_batch([hyps], lm, lm_weight, reverse,
+                                             length_norm, tag)[0]
+
+    @staticmethod
+    def lm_rescoring_batch(nbest_hyps, lm, lm_weight, reverse=False, length_norm=False, tag=''):
+        """Rescore n-best hypotheses of multiple utterances in a single LM forward pass.
 
-            hyps[i]['score'] += score_lm * lm_weight
-            hyps[i]['score_lm_' + tag] = score_lm
+        Identical token sequences are scored only once. For LMs carrying a
+        recurrent state (RNNLM), the prefix shared by all hypotheses is
+        encoded once and its state is broadcast to the remaining suffixes.
+
+        Args:
+            nbest_hyps (List[List[dict]]): length `B`, n-best hypotheses of each utterance
+            lm (LMBase): second-pass LM
+            lm_weight (float): weight of the second-pass LM score
+            reverse (bool): score reversed token sequences (for backward LMs)
+            length_norm (bool): normalize LM scores by length
+            tag (str): suffix of the key to store LM scores
+        Returns:
+            nbest_hyps (List[List[dict]]): length `B`, n-best hypotheses (not sorted)
+
+        """
+        if lm is None:
+            return nbest_hyps
+
+        # Deduplicate token sequences across hypotheses and utterances
+        seq2idx = {}
+        for hyps in nbest_hyps:
+            for hyp in hyps:
+                ys = tuple(hyp['hyp'])  # include <sos>
+                if reverse:
+                    ys = ys[::-1]
+                if ys not in seq2idx:
+                    seq2idx[ys] = len(seq2idx)
+
+        seqs = list(seq2idx.keys())
+        scores_lm = BeamSearch._score_sequences(seqs, lm, length_norm)
+
+        for hyps in nbest_hyps:
+            for hyp in hyps:
+                ys = tuple(hyp['hyp'])
+                if reverse:
+                    ys = ys[::-1]
+                score_lm = scores_lm[seq2idx[ys]]
+                hyp['score'] += score_lm * lm_weight
+                hyp['score_lm_' + tag] = score_lm
 
         # DO NOT sort here !!!
-        return hyps
+        return nbest_hyps
+
+    @staticmethod
+    def _score_sequences(seqs, lm, length_norm=False):
+        """Compute sequence-level LM log-probabilities in batch-mode.
+
+        Args:
+            seqs (List[tuple]): token sequences including <sos>
+            lm (LMBase): LM
+            length_norm (bool): normalize LM scores by length
+        Returns:
+            scores_lm (List[float]): LM scores of each sequence
+
+        """
+        ylens = [len(ys) - 1 for ys in seqs]
+        if max(ylens) <= 0:
+            return [0.] * len(seqs)
+
+        ys = pad_list([np2tensor(np.fromiter(ys, dtype=np.int64), lm.device)
+                       for ys in seqs], lm.pad)
+        ys_in, ys_out = ys[:, :-1], ys[:, 1:]  # `[N, L-1]`
+        mask = make_pad_mask(torch.tensor(ylens, dtype=torch.int64, device=ys.device).clamp(min=0))
+
+        # Encode the prefix shared by all sequences only once (recurrent LMs and
+        # TransformerLM with projected keys/values of previous tokens)
+        n_shared = 0
+        lmstate = None
+        token_scores = []
+        if len(seqs) > 1 and isinstance(lm, (RNNLM, TransformerLM)):
+            n_shared = min(min(ylens), BeamSearch._common_prefix_length(seqs))
+        if n_shared > 0 and n_shared < ys_in.size(1):
+            _, lmstate, scores_lm = lm.predict(ys_in[:1, :n_shared], None)
+            scores_lm = scores_lm.expand(ys_in.size(0), -1, -1)
+            token_scores.append(torch.gather(scores_lm, 2, ys_out[:, :n_shared].unsqueeze(2)).squeeze(2))
+            lmstate = BeamSearch._expand_lmstate(lmstate, ys_in.size(0))
+        else:
+            n_shared = 0
+
+        _, _, scores_lm = lm.predict(ys_in[:, n_shared:], lmstate)
+        token_scores.append(torch.gather(scores_lm, 2, ys_out[:, n_shared:].unsqueeze(2)).squeeze(2))
+        token_scores = torch.cat(token_scores, dim=1).masked_fill_(~mask, 0)  # `[N, L-1]`
+
+        scores_lm = token_scores.sum(1)
+        if length_norm:
+            scores_lm /= mask.sum(1).clamp(min=1)  # normalize by length
+        return scores_lm.tolist()
+
+    @staticmethod
+    def _expand_lmstate(lmstate, n):
+        """Expand LM states of a single sequence over the batch dimension.
+
+        Args:
+            lmstate:
+                - RNNLM => (dict):
+                    hxs (FloatTensor): `[n_layers, 1, n_units]`
+                    cxs (FloatTensor): `[n_layers, 1, n_units]`
+                - TransformerLM => (List): length `n_layers`, each of which contains a dict of
+                    projected keys/values of previous tokens (`[1, H, capacity, d_k]`)
+            n (int): number of sequences
+        Returns:
+            lmstate: states for `n` sequences
+
+        """
+        if isinstance(lmstate, dict):
+            return {k: v.expand(-1, n, -1).contiguous() for k, v in lmstate.items()}
+        # NOTE: copy only valid positions since key/value buffers are updated in-place
+        new_lmstate = []
+        for state in lmstate:
+            if 'ys' in state:
+                # convolutional positional encoding
+                new_lmstate.append({'ys': state['ys'].expand(n, -1).contiguous()})
+                continue
+            new_lmstate.append({'key': state['key'][:, :, :state['len']].expand(n, -1, -1, -1).contiguous(),
+                                'value': state['value'][:, :, :state['len']].expand(n, -1, -1, -1).contiguous(),
+                                'len': state['len']})
+        return new_lmstate
+
+    @staticmethod
+    def _common_prefix_length(seqs):
+        """Compute the length of the longest common prefix over sequences."""
+        n = 0
+        for tokens in zip(*seqs):
+            if any(t != tokens[0] for t in tokens[1:]):
+                break
+            n += 1
+        return n
 
     @staticmethod
     def verify_lm_eval_mode(lm, lm_weight, cache_emb=True):
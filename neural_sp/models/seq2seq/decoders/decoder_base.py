@@ -10,8 +10,6 @@ import shutil
 
 from neural_sp.models.base import ModelBase
 
-import matplotlib
-matplotlib.use('Agg')
 
 logger = logging.getLogger(__name__)
 
@@ -69,6 +67,8 @@ class DecoderBase(ModelBase):
         if len(getattr(self, 'aws_dict', {}).keys()) == 0:
             return
 
+        import matplotlib
+        matplotlib.use('Agg')
         from matplotlib import pyplot as plt
         from matplotlib.ticker import MaxNLocator
 
@@ -119,6 +119,8 @@ class DecoderBase(ModelBase):
         if len(self.ctc.prob_dict.keys()) == 0:
             return
 
+        import matplotlib
+        matplotlib.use('Agg')
         from matplotlib import pyplot as plt
 
         # Clean directory
@@ -128,10 +128,6 @@ class TransformerDecoder(DecoderBase):
         self.lmstate_final = None
         self.embed_cache = None
 
-        # for attention plot
-        self.aws_dict = {}
-        self.data_dict = {}
-
         # for MMA
         self.attn_type = attn_type
         self.quantity_loss_weight = mma_quantity_loss_weight
@@ -389,10 +385,6 @@ class TransformerDecoder(DecoderBase):
 
         # Append <sos> and <eos>
         ys_in, ys_out, ylens = append_sos_eos(ys, self.eos, self.eos, self.pad, self.device, self.bwd)
-        if not self.training:
-            self.data_dict['elens'] = tensor2np(elens)
-            self.data_dict['ylens'] = tensor2np(ylens)
-            self.data_dict['ys'] = tensor2np(ys_out)
 
         # Create target self-attention mask
         bs, ymax = ys_in.size()[:2]
@@ -430,12 +422,8 @@ class TransformerDecoder(DecoderBase):
                 xy_aws_masked = xy_aws.masked_fill_(attn_mask.expand_as(xy_aws) == 0, 0)
                 # NOTE: attention padding is quite effective for quantity loss
                 xy_aws_layers.append(xy_aws_masked.clone())
-            if not self.training:
-                self.aws_dict['yy_aws_layer%d' % lth] = tensor2np(layer.yy_aws)
-                self.aws_dict['xy_aws_layer%d' % lth] = tensor2np(layer.xy_aws)
-                self.aws_dict['xy_aws_beta_layer%d' % lth] = tensor2np(layer.xy_aws_beta)
-                self.aws_dict['xy_aws_p_choose%d' % lth] = tensor2np(layer.xy_aws_p_choose)
-                self.aws_dict['yy_aws_lm_layer%d' % lth] = tensor2np(layer.yy_aws_lm)
+            # NOTE: attention weights are captured by hooks for visualization
+            # (see neural_sp.trainers.attention_capture)
         logits = self.output(self.norm_out(out))
 
         # Compute XE loss (+ label smoothing)
@@ -82,6 +82,10 @@ class ConformerEncoderBlock_v2(nn.Module):
         self.dropout_layer = dropout_layer  # probability to skip
         logger.info('Stochastic depth prob: %.3f' % dropout_layer)
 
+        # NOTE: attention weights are only used for visualization, and the fused
+        # kernel is used otherwise (see neural_sp.trainers.attention_capture)
+        self.need_weights = False
+
         self.reset_visualization()
 
     @property
@@ -101,6 +105,8 @@ class ConformerEncoderBlock_v2(nn.Module):
             cache (dict):
                 input_san: `[B, n_cache, d_model]`
                 input_conv: `[B, n_cache, d_model]`
+                conv: `[B, d_model, kernel_size - 1]` (causal convolution)
+                kv (dict): ring buffers of projected keys/values for block processing
             pos_embs (LongTensor): not used
             rel_bias (tuple):
                 u_bias (FloatTensor): not used
@@ -110,6 +116,8 @@ class ConformerEncoderBlock_v2(nn.Module):
             new_cache (dict):
                 input_san: `[B, n_cache+T, d_model]`
                 input_conv: `[B, n_cache+T, d_model]`
+                conv: `[B, d_model, kernel_size - 1]` (causal convolution)
+                kv (dict): updated ring buffers for block processing
 
         """
         self.reset_visualization()
@@ -139,14 +147,18 @@ class ConformerEncoderBlock_v2(nn.Module):
         residual = xs  # `[B, qlen, d_model]`
         xs = self.norm2(xs)  # pre-norm
 
-        # cache for convolution
-        if cache is not None:
-            xs = torch.cat([cache['input_conv'], xs], dim=1)
-            xs = xs[:, -(self.conv_context + qlen - 1):]  # restrict to kernel size
-        new_cache['input_conv'] = xs
-
-        xs = self.conv(xs)
-        if cache is not None:
+        if self.conv.causal:
+            # cache for convolution (only the last `kernel_size - 1` inputs of depthwise conv)
+            xs, new_cache['conv'] = self.conv.forward_incremental(
+                xs, cache.get('conv') if cache is not None else None)
+        else:
+            # cache for convolution
+            if cache is not None and 'input_conv' in cache:
+                xs = torch.cat([cache['input_conv'], xs], dim=1)
+                xs = xs[:, -(self.conv_context + qlen - 1):]  # restrict to kernel size
+            new_cache['input_conv'] = xs
+
+            xs = self.conv(xs)
             xs = xs[:, -qlen:]
 
         xs = self.dropout(xs) + residual
@@ -157,18 +169,23 @@ class ConformerEncoderBlock_v2(nn.Module):
         residual = xs  # `[B, qlen, d_model]`
         xs = self.norm3(xs)  # pre-norm
 
-        # cache for self-attention
-        if cache is not None:
-            xs = torch.cat([cache['input_san'], xs], dim=1)
-        new_cache['input_san'] = xs
-
-        xs_kv = xs
-        if cache is not None:
-            xs = xs[:, -qlen:]
-            residual = residual[:, -qlen:]
-            xx_mask = xx_mask[:, -qlen:]
-
-        xs, self._xx_aws = self.self_attn(xs_kv, xs_kv, xs, mask=xx_mask)[:2]  # k/v/q
+        if cache is not None and 'kv' in cache:
+            # block processing with projected keys/values of previous blocks
+            xs, self._xx_aws, new_cache['kv'] = self.self_attn.forward_block(xs, cache['kv'], xx_mask)
+        else:
+            # cache for self-attention
+            if cache is not None:
+                xs = torch.cat([cache['input_san'], xs], dim=1)
+            new_cache['input_san'] = xs
+
+            xs_kv = xs
+            if cache is not None:
+                xs = xs[:, -qlen:]
+                residual = residual[:, -qlen:]
+                xx_mask = xx_mask[:, -qlen:]
+
+            xs, self._xx_aws = self.self_attn(xs_kv, xs_kv, xs, mask=xx_mask,
+                                              need_weights=self.need_weights)[:2]  # k/v/q
         xs = self.dropout(xs) + residual
 
         ##################################################
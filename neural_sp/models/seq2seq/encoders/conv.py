@@ -4,10 +4,10 @@
 """CNN encoder."""
 
 import logging
-import math
 import numpy as np
 import torch
 import torch.nn as nn
+import torch.nn.functional as F
 
 from neural_sp.models.modules.initialization import init_with_lecun_normal
 from neural_sp.models.seq2seq.encoders.encoder_base import EncoderBase
@@ -194,6 +194,42 @@ class ConvEncoder(EncoderBase):
 
         return xs, xlens
 
+    def forward_incremental(self, xs, cache=None, is_last=False):
+        """Forward pass for streaming inference.
+
+        Each CNN/pooling layer keeps input frames needed for its next outputs, so that
+        only new frames are fed and outputs are identical to those of the whole input.
+        Outputs are emitted once their right context arrives.
+
+        Args:
+            xs (FloatTensor): `[B, T, F]`
+            cache (List[dict]): caches of CNN blocks. None at the beginning of the stream.
+            is_last (bool): end of the stream, where the rest frames are flushed
+        Returns:
+            xs (FloatTensor): `[B, T', F']`
+            new_cache (List[dict]): updated caches of CNN blocks
+
+        """
+        B, T, F = xs.size()
+        C_i = self.in_channel
+        if not self.is_1dconv:
+            xs = xs.view(B, T, C_i, F // C_i).contiguous().transpose(2, 1)  # `[B, C_i, T, F // C_i]`
+
+        new_cache = []
+        for lth, block in enumerate(self.layers):
+            xs, block_cache = block.forward_incremental(
+                xs, cache[lth] if cache is not None else {}, is_last)
+            new_cache.append(block_cache)
+        if not self.is_1dconv:
+            B, C_o, T, F = xs.size()
+            xs = xs.transpose(2, 1).contiguous().view(B, T, C_o * F)  # `[B, T', C_o * F']`
+
+        # Bridge layer
+        if self.bridge is not None:
+            xs = self.bridge(xs)
+
+        return xs, new_cache
+
 
 class Conv1dBlock(EncoderBase):
     """1d-CNN block."""
@@ -285,6 +321,47 @@ class Conv1dBlock(EncoderBase):
 
         return xs, xlens
 
+    def forward_incremental(self, xs, cache, is_last=False):
+        """Forward pass for streaming inference.
+
+        Args:
+            xs (FloatTensor): `[B, T, F]`
+            cache (dict): buffered inputs of each layer
+            is_last (bool): end of the stream
+        Returns:
+            xs (FloatTensor): `[B, T', F']`
+            new_cache (dict): updated buffered inputs of each layer
+
+        """
+        new_cache = {}
+        residual = torch.cat([cache['residual'], xs], dim=1) if 'residual' in cache else xs
+
+        xs, new_cache['conv1'] = conv_incremental(
+            self.conv1, xs.transpose(2, 1), cache.get('conv1'), is_last)
+        xs = xs.transpose(2, 1)
+        if self.norm1 is not None:
+            xs = self.norm1(xs)
+        xs = torch.relu(xs)
+        xs = self.dropout(xs)
+
+        xs, new_cache['conv2'] = conv_incremental(
+            self.conv2, xs.transpose(2, 1), cache.get('conv2'), is_last)
+        xs = xs.transpose(2, 1)
+        if self.norm2 is not None:
+            xs = self.norm2(xs)
+        if self.residual and residual.size(2) == xs.size(2) and preserve_length(self.conv1, self.conv2):
+            xs += residual[:, :xs.size(1)]
+            new_cache['residual'] = residual[:, xs.size(1):]
+        xs = torch.relu(xs)
+        xs = self.dropout(xs)
+
+        if self.pool is not None:
+            xs, new_cache['pool'] = pool_incremental(
+                self.pool, xs.transpose(2, 1), cache.get('pool'), is_last)
+            xs = xs.transpose(2, 1)
+
+        return xs, new_cache
+
 
 class Conv2dBlock(EncoderBase):
     """2d-CNN block."""
@@ -395,6 +472,42 @@ class Conv2dBlock(EncoderBase):
 
         return xs, xlens
 
+    def forward_incremental(self, xs, cache, is_last=False):
+        """Forward pass for streaming inference.
+
+        Args:
+            xs (FloatTensor): `[B, C_i, T, F]`
+            cache (dict): buffered inputs of each layer
+            is_last (bool): end of the stream
+        Returns:
+            xs (FloatTensor): `[B, C_o, T', F']`
+            new_cache (dict): updated buffered inputs of each layer
+
+        """
+        new_cache = {}
+        residual = torch.cat([cache['residual'], xs], dim=2) if 'residual' in cache else xs
+
+        xs, new_cache['conv1'] = conv_incremental(self.conv1, xs, cache.get('conv1'), is_last)
+        if self.norm1 is not None:
+            xs = self.norm1(xs)
+        xs = torch.relu(xs)
+        xs = self.dropout(xs)
+
+        xs, new_cache['conv2'] = conv_incremental(self.conv2, xs, cache.get('conv2'), is_last)
+        if self.norm2 is not None:
+            xs = self.norm2(xs)
+        if self.residual and residual.size()[:2] == xs.size()[:2] and \
+                residual.size(3) == xs.size(3) and preserve_length(self.conv1, self.conv2):
+            xs += residual[:, :, :xs.size(2)]
+            new_cache['residual'] = residual[:, :, xs.size(2):]
+        xs = torch.relu(xs)
+        xs = self.dropout(xs)
+
+        if self.pool is not None:
+            xs, new_cache['pool'] = pool_incremental(self.pool, xs, cache.get('pool'), is_last)
+
+        return xs, new_cache
+
 
 class LayerNorm2D(nn.Module):
     """Layer normalization for CNN outputs."""
@@ -420,6 +533,74 @@ class LayerNorm2D(nn.Module):
         return xs
 
 
+def conv_incremental(layer, xs, cache, is_last):
+    """Apply convolution to new frames along the time axis.
+
+    Frames are zero-padded at the beginning and the end of the stream as in offline
+    convolution, and input frames that are not consumed yet are kept in the cache.
+
+    Args:
+        layer (nn.Conv1d or nn.Conv2d): convolution, whose first spatial axis is time
+        xs (FloatTensor): `[B, C_i, T]` or `[B, C_i, T, F]`
+        cache (FloatTensor): `[B, C_i, T_cache]` or `[B, C_i, T_cache, F]`.
+            None at the beginning of the stream.
+        is_last (bool): end of the stream
+    Returns:
+        xs (FloatTensor): `[B, C_o, T']` or `[B, C_o, T', F']`
+        cache (FloatTensor): `[B, C_i, T_cache']` or `[B, C_i, T_cache', F]`
+
+    """
+    kernel_size, stride, padding = layer.kernel_size[0], layer.stride[0], layer.padding[0]
+    zero_pad = xs.new_zeros(xs.size()[:2] + (padding,) + xs.size()[3:])
+    xs = torch.cat([zero_pad if cache is None else cache, xs], dim=2)
+    if is_last:
+        xs = torch.cat([xs, zero_pad], dim=2)
+
+    n_out = max(0, (xs.size(2) - kernel_size) // stride + 1)
+    xs_in = xs[:, :, :(n_out - 1) * stride + kernel_size]
+    if n_out == 0:
+        xs_in = xs.new_zeros(xs.size()[:2] + (kernel_size,) + xs.size()[3:])
+    if isinstance(layer, nn.Conv2d):
+        xs_out = F.conv2d(xs_in, layer.weight, layer.bias, layer.stride,
+                          (0, layer.padding[1]), layer.dilation, layer.groups)
+    else:
+        xs_out = F.conv1d(xs_in, layer.weight, layer.bias, layer.stride,
+                          0, layer.dilation, layer.groups)
+    return xs_out[:, :, :n_out], xs[:, :, n_out * stride:]
+
+
+def pool_incremental(layer, xs, cache, is_last):
+    """Apply max pooling to new frames along the time axis.
+
+    Args:
+        layer (nn.MaxPool1d or nn.MaxPool2d): pooling without padding, whose first spatial axis is time
+        xs (FloatTensor): `[B, C, T]` or `[B, C, T, F]`
+        cache (FloatTensor): `[B, C, T_cache]` or `[B, C, T_cache, F]`.
+            None at the beginning of the stream.
+        is_last (bool): end of the stream, where the last incomplete window is pooled
+    Returns:
+        xs (FloatTensor): `[B, C, T']` or `[B, C, T', F']`
+        cache (FloatTensor): `[B, C, T_cache']` or `[B, C, T_cache', F]`
+
+    """
+    kernel_size = layer.kernel_size if isinstance(layer, nn.MaxPool1d) else layer.kernel_size[0]
+    if cache is not None:
+        xs = torch.cat([cache, xs], dim=2)
+    n_out = xs.size(2) // kernel_size
+    if is_last and xs.size(2) % kernel_size > 0:
+        n_out += 1  # ceil_mode
+    xs_in = xs[:, :, :n_out * kernel_size]
+    if n_out == 0:
+        xs_in = xs.new_zeros(xs.size()[:2] + (kernel_size,) + xs.size()[3:])
+    return layer(xs_in)[:, :, :n_out], xs[:, :, n_out * kernel_size:]
+
+
+def preserve_length(*layers):
+    """Return True if convolutions preserve the number of frames."""
+    return all([layer.stride[0] == 1 and layer.kernel_size[0] == 2 * layer.padding[0] + 1
+                for layer in layers])
+
+
 def update_lens_1d(seq_lens, layer):
     """Update lengths (frequency or time).
 
@@ -434,18 +615,15 @@ def update_lens_1d(seq_lens, layer):
         return seq_lens
     assert isinstance(seq_lens, torch.IntTensor)
     assert type(layer) in [nn.Conv1d, nn.MaxPool1d, nn.AvgPool1d]
-    seq_lens = [_update_1d(seq_len, layer) for seq_len in seq_lens]
-    seq_lens = torch.IntTensor(seq_lens)
-    return seq_lens
+    return _update_1d(seq_lens, layer)
 
 
-def _update_1d(seq_len, layer):
+def _update_1d(seq_lens, layer):
+    # NOTE: computed with tensor operations to be traceable
     if type(layer) == nn.MaxPool1d and layer.ceil_mode:
-        return math.ceil(
-            (seq_len + 1 + 2 * layer.padding - (layer.kernel_size - 1) - 1) // layer.stride + 1)
+        return (seq_lens + 1 + 2 * layer.padding - (layer.kernel_size - 1) - 1) // layer.stride + 1
     else:
-        return math.floor(
-            (seq_len + 2 * layer.padding[0] - (layer.kernel_size[0] - 1) - 1) // layer.stride[0] + 1)
+        return (seq_lens + 2 * layer.padding[0] - (layer.kernel_size[0] - 1) - 1) // layer.stride[0] + 1
 
 
 def update_lens_2d(seq_lens, layer, dim=0):
@@ -463,18 +641,15 @@ def update_lens_2d(seq_lens, layer, dim=0):
         return seq_lens
     assert isinstance(seq_lens, torch.IntTensor)
     assert type(layer) in [nn.Conv2d, nn.MaxPool2d]
-    seq_lens = [_update_2d(seq_len, layer, dim) for seq_len in seq_lens]
-    seq_lens = torch.IntTensor(seq_lens)
-    return seq_lens
+    return _update_2d(seq_lens, layer, dim)
 
 
-def _update_2d(seq_len, layer, dim):
+def _update_2d(seq_lens, layer, dim):
+    # NOTE: computed with tensor operations to be traceable
     if type(layer) == nn.MaxPool2d and layer.ceil_mode:
-        return math.ceil(
-            (seq_len + 1 + 2 * layer.padding[dim] - (layer.kernel_size[dim] - 1) - 1) // layer.stride[dim] + 1)
+        return (seq_lens + 1 + 2 * layer.padding[dim] - (layer.kernel_size[dim] - 1) - 1) // layer.stride[dim] + 1
     else:
-        return math.floor(
-            (seq_len + 2 * layer.padding[dim] - (layer.kernel_size[dim] - 1) - 1) // layer.stride[dim] + 1)
+        return (seq_lens + 2 * layer.padding[dim] - (layer.kernel_size[dim] - 1) - 1) // layer.stride[dim] + 1
 
 
 def parse_cnn_config(channels, kernel_sizes, strides, poolings):
@@ -31,6 +31,11 @@ random.seed(1)
 
 logger = logging.getLogger(__name__)
 
+# NOTE: stacking windows of all chunks along the batch dimension is faster than
+# the chunk-by-chunk loop only for small mini-batches
+# (see test/benchmark/benchmark_lc_blstm.py)
+LC_BATCHED_MAX_BATCH_SIZE = 4
+
 
 class RNNEncoder(EncoderBase):
     """RNN encoder.
@@ -290,12 +295,8 @@ class RNNEncoder(EncoderBase):
                  'ys_sub1': {'xs': None, 'xlens': None},
                  'ys_sub2': {'xs': None, 'xlens': None}}
 
-        # Sort by lengths in the descending order for pack_padded_sequence
-        perm_ids_unsort = None
         if not self.lc_bidir:
-            xlens, perm_ids = torch.IntTensor(xlens).sort(0, descending=True)
-            xs = xs[perm_ids]
-            _, perm_ids_unsort = perm_ids.sort()
+            xlens = torch.IntTensor(xlens)
 
         # Dropout for inputs-hidden connection
         xs = self.dropout_in(xs)
@@ -339,7 +340,8 @@ class RNNEncoder(EncoderBase):
                 return eouts
         else:
             for lth in range(self.n_layers):
-                self.rnn[lth].flatten_parameters()  # for multi-GPUs
+                if xs.is_cuda:
+                    self.rnn[lth].flatten_parameters()  # for multi-GPUs
                 xs, state = self.padding(xs, xlens, self.rnn[lth],
                                          prev_state=self.hx_fwd[lth],
                                          streaming=streaming)
@@ -348,12 +350,12 @@ class RNNEncoder(EncoderBase):
 
                 # Pick up outputs in the sub task before the projection layer
                 if lth == self.n_layers_sub1 - 1:
-                    xs_sub1, xlens_sub1 = self.sub_module(xs, xlens, perm_ids_unsort, 'sub1')
+                    xs_sub1, xlens_sub1 = self.sub_module(xs, xlens, 'sub1')
                     if task == 'ys_sub1':
                         eouts[task]['xs'], eouts[task]['xlens'] = xs_sub1, xlens_sub1
                         return eouts
                 if lth == self.n_layers_sub2 - 1:
-                    xs_sub2, xlens_sub2 = self.sub_module(xs, xlens, perm_ids_unsort, 'sub2')
+                    xs_sub2, xlens_sub2 = self.sub_module(xs, xlens, 'sub2')
                     if task == 'ys_sub2':
                         eouts[task]['xs'], eouts[task]['xlens'] = xs_sub2, xlens_sub2
                         return eouts
@@ -372,9 +374,6 @@ class RNNEncoder(EncoderBase):
         xs = xs[:, :xlens.max()]
 
         if task in ['all', 'ys']:
-            if perm_ids_unsort is not None:
-                xs = xs[perm_ids_unsort]
-                xlens = xlens[perm_ids_unsort]
             eouts['ys']['xs'], eouts['ys']['xlens'] = xs, xlens
         if self.n_layers_sub1 >= 1 and task == 'all':
             eouts['ys_sub1']['xs'], eouts['ys_sub1']['xlens'] = xs_sub1, xlens_sub1
@@ -399,8 +398,9 @@ class RNNEncoder(EncoderBase):
         """
         xs_sub1, xlens_sub1 = None, None
         for lth in range(self.n_layers):
-            self.rnn[lth].flatten_parameters()  # for multi-GPUs
-            self.rnn_bwd[lth].flatten_parameters()  # for multi-GPUs
+            if xs.is_cuda:
+                self.rnn[lth].flatten_parameters()  # for multi-GPUs
+                self.rnn_bwd[lth].flatten_parameters()  # for multi-GPUs
             xs_bwd = torch.flip(self.rnn_bwd[lth](torch.flip(xs, dims=[1]))[0], dims=[1])
             xs_fwd, self.hx_fwd[lth] = self.rnn[lth](xs, hx=self.hx_fwd[lth])
             if self.bidir_sum:
@@ -411,7 +411,7 @@ class RNNEncoder(EncoderBase):
 
             # Pick up outputs in the sub task before the projection layer
             if lth == self.n_layers_sub1 - 1:
-                xs_sub1, xlens_sub1 = self.sub_module(xs, xlens, None, 'sub1')
+                xs_sub1, xlens_sub1 = self.sub_module(xs, xlens, 'sub1')
                 if task == 'ys_sub1':
                     return None, None, xs_sub1, xlens_sub1
 
@@ -428,6 +428,9 @@ class RNNEncoder(EncoderBase):
                                     task='all'):
         """Streaming encoding for the latency-controlled bidirectional encoder.
 
+        Small mini-batches are encoded with windows of all chunks stacked along
+        the batch dimension, and larger ones are encoded chunk by chunk.
+
         Args:
             xs (FloatTensor): `[B, T, n_units]`
             xlens (IntTensor): `[B]`
@@ -441,6 +444,26 @@ class RNNEncoder(EncoderBase):
             xs_sub1 (FloatTensor): `[B, T, n_units]`
             xlens (IntTensor): `[B]`
 
+        """
+        if xs.size(0) <= LC_BATCHED_MAX_BATCH_SIZE:
+            return self._forward_latency_controlled_batched(xs, xlens, N_c, N_r, streaming)
+        return self._forward_latency_controlled_loop(xs, xlens, N_c, N_r, streaming)
+
+    def _forward_latency_controlled_loop(self, xs, xlens, N_c, N_r, streaming):
+        """Encode chunk by chunk for the latency-controlled bidirectional encoder.
+
+        Args:
+            xs (FloatTensor): `[B, T, n_units]`
+            xlens (IntTensor): `[B]`
+            N_c (int):
+            N_r (int):
+            streaming (bool):
+        Returns:
+            xs (FloatTensor): `[B, T, n_units]`
+            xlens (IntTensor): `[B]`
+            xs_sub1 (FloatTensor): `[B, T, n_units]`
+            xlens (IntTensor): `[B]`
+
         """
         bs, xmax, _ = xs.size()
         n_chunks = math.ceil(xmax / N_c)
@@ -456,8 +479,9 @@ class RNNEncoder(EncoderBase):
             _N_c = N_c
 
             for lth in range(self.n_layers):
-                self.rnn[lth].flatten_parameters()  # for multi-GPUs
-                self.rnn_bwd[lth].flatten_parameters()  # for multi-GPUs
+                if xs.is_cuda:
+                    self.rnn[lth].flatten_parameters()  # for multi-GPUs
+                    self.rnn_bwd[lth].flatten_parameters()  # for multi-GPUs
                 # bwd
                 xs_chunk_bwd = torch.flip(self.rnn_bwd[lth](
                     torch.flip(xs_chunk, dims=[1]))[0], dims=[1])  # `[B, _N_c+_N_r, n_units]`
@@ -503,25 +527,176 @@ class RNNEncoder(EncoderBase):
         xs = torch.cat(xs_chunks, dim=1)
         if self.n_layers_sub1 > 0:
             xs_sub1 = torch.cat(xs_chunks_sub1, dim=1)
-            xs_sub1, xlens_sub1 = self.sub_module(xs_sub1, xlens_sub1, None, 'sub1')
+            xs_sub1, xlens_sub1 = self.sub_module(xs_sub1, xlens_sub1, 'sub1')
         else:
             xs_sub1 = None
 
         return xs, xlens, xs_sub1, xlens_sub1
 
-    def sub_module(self, xs, xlens, perm_ids_unsort, module='sub1'):
+    def _forward_latency_controlled_batched(self, xs, xlens, N_c, N_r, streaming):
+        """Encode windows of the current and right frames in all chunks at once.
+
+        The backward LSTM and the forward LSTM over the right frames operate on
+        windows stacked along the batch dimension, and only the forward LSTM over
+        the current frames runs through the utterance carrying states.
+
+        Args:
+            xs (FloatTensor): `[B, T, n_units]`
+            xlens (IntTensor): `[B]`
+            N_c (int):
+            N_r (int):
+            streaming (bool):
+        Returns:
+            xs (FloatTensor): `[B, T, n_units]`
+            xlens (IntTensor): `[B]`
+            xs_sub1 (FloatTensor): `[B, T, n_units]`
+            xlens (IntTensor): `[B]`
+
+        """
+        bs, xmax, idim = xs.size()
+        n_chunks = math.ceil(xmax / N_c)
+
+        if streaming:
+            xlens = torch.IntTensor(bs).fill_(min(xmax, N_c))
+            n_chunks = 1
+        xlens_sub1 = xlens.clone() if self.n_layers_sub1 > 0 else None
+
+        # Windows of all but the last chunks have the same length,
+        # and they are stacked along the batch dimension
+        n_full = min(n_chunks, max(0, (xmax - (N_c + N_r)) // N_c + 1))
+        xs_full = None
+        if n_full > 0:
+            xs_full = xs[:, :N_c * (n_full - 1) + N_c + N_r].unfold(1, N_c + N_r, N_c)
+            xs_full = xs_full.transpose(3, 2).reshape(bs * n_full, N_c + N_r, idim)
+            # `[B * n_full, N_c+N_r, idim]`
+        xs_tails = [xs[:, t:t + (N_c + N_r)] for t in range(N_c * n_full, N_c * n_chunks, N_c)]
+
+        _N_c = N_c
+        xs_sub1 = None
+        for lth in range(self.n_layers):
+            if xs.is_cuda:
+                self.rnn[lth].flatten_parameters()  # for multi-GPUs
+                self.rnn_bwd[lth].flatten_parameters()  # for multi-GPUs
+            windows = ([xs_full] if n_full > 0 else []) + xs_tails
+            # bwd
+            xs_bwd = [torch.flip(self.rnn_bwd[lth](torch.flip(xs_w, dims=[1]))[0], dims=[1])
+                      for xs_w in windows]  # `[B (* n_full), _N_c+_N_r, n_units]`
+
+            # fwd (current frames)
+            n_right = n_full + sum([xs_w.size(1) > _N_c for xs_w in xs_tails])
+            xs_center = self._gather_center(xs_full, xs_tails, _N_c, n_full)
+            xs_center_fwd, self.hx_fwd[lth], hx_right = _lstm_with_chunk_states(
+                self.rnn[lth], xs_center, self.hx_fwd[lth], _N_c, n_right)
+
+            # fwd (right frames)
+            xs_fwd = []
+            t = 0
+            for chunk_idx, xs_w in enumerate(windows):
+                n = n_full if (chunk_idx == 0 and n_full > 0) else 1
+                k = t // _N_c  # chunk index
+                _xs_center_fwd = xs_center_fwd[:, t:t + n * _N_c]
+                _xs_center_fwd = _xs_center_fwd.reshape(bs * n, -1, _xs_center_fwd.size(2))
+                t += n * min(_N_c, xs_w.size(1))
+                if xs_w.size(1) <= _N_c:
+                    # last chunk
+                    xs_fwd.append(_xs_center_fwd)
+                    continue
+                h, c = [state[:, k:k + n].reshape(1, bs * n, -1) for state in hx_right]
+                xs_right_fwd, _ = self.rnn[lth](xs_w[:, _N_c:], hx=(h, c))
+                xs_fwd.append(torch.cat([_xs_center_fwd, xs_right_fwd], dim=1))  # `[B (* n_full), _N_c+_N_r, n_units]`
+                # NOTE: xs_right_fwd is used for xs_bwd in the next layer
+            if self.bidir_sum:
+                windows = [xs_w_fwd + xs_w_bwd for xs_w_fwd, xs_w_bwd in zip(xs_fwd, xs_bwd)]
+            else:
+                windows = [torch.cat([xs_w_fwd, xs_w_bwd], dim=-1) for xs_w_fwd, xs_w_bwd in zip(xs_fwd, xs_bwd)]
+            windows = [self.dropout(xs_w) for xs_w in windows]
+
+            # Pick up outputs in the sub task before the projection layer
+            if lth == self.n_layers_sub1 - 1:
+                xs_sub1 = self._gather_center(windows[0] if n_full > 0 else None,
+                                              windows[int(n_full > 0):], _N_c, n_full)
+                xlens_sub1 = xlens.clone()
+
+            # Projection layer
+            if self.proj is not None and lth != self.n_layers - 1:
+                windows = [torch.relu(self.proj[lth](xs_w)) for xs_w in windows]
+            # Subsampling layer
+            if self.subsample is not None:
+                xlens_prev = xlens
+                for i in range(len(windows)):
+                    windows[i], xlens = self.subsample[lth](windows[i], xlens_prev)
+                _N_c = _N_c // self.subsample[lth].factor
+
+            if n_full > 0:
+                xs_full, xs_tails = windows[0], windows[1:]
+            else:
+                xs_tails = windows
+
+        xs = self._gather_center(xs_full, xs_tails, _N_c, n_full)
+        if self.n_layers_sub1 > 0:
+            xs_sub1, xlens_sub1 = self.sub_module(xs_sub1, xlens_sub1, 'sub1')
+
+        return xs, xlens, xs_sub1, xlens_sub1
+
+    @staticmethod
+    def _gather_center(xs_full, xs_tails, N_c, n_full):
+        """Concatenate current frames in all windows.
+
+        Args:
+            xs_full (FloatTensor): `[B * n_full, N_c+N_r, n_units]`
+            xs_tails (list): A list of `[B, <= N_c+N_r, n_units]`
+            N_c (int): number of current frames
+            n_full (int): number of windows in xs_full
+        Returns:
+            xs (FloatTensor): `[B, T, n_units]`
+
+        """
+        xs = [xs_w[:, :N_c] for xs_w in xs_tails]
+        if n_full > 0:
+            xs_full = xs_full[:, :N_c]
+            xs = [xs_full.reshape(-1, n_full * N_c, xs_full.size(2))] + xs
+        return torch.cat(xs, dim=1)
+
+    def sub_module(self, xs, xlens, module='sub1'):
         if self.task_specific_layer:
             xs_sub = self.dropout(torch.relu(getattr(self, 'layer_' + module)(xs)))
         else:
             xs_sub = xs.clone()
         if getattr(self, 'bridge_' + module) is not None:
             xs_sub = getattr(self, 'bridge_' + module)(xs_sub)
-        if perm_ids_unsort is not None:
-            xs_sub = xs_sub[perm_ids_unsort]
-            xlens_sub = xlens[perm_ids_unsort]
-        else:
-            xlens_sub = xlens.clone()
-        return xs_sub, xlens_sub
+        return xs_sub, xlens.clone()
+
+
+def _lstm_with_chunk_states(rnn, xs, hx, chunk_size, n_chunks):
+    """Run a unidirectional LSTM over the whole sequence carrying states across chunks,
+       and keep hidden states at the end of the first `n_chunks` chunks.
+
+    Args:
+        rnn (nn.LSTM): single-layer unidirectional LSTM (batch_first)
+        xs (FloatTensor): `[B, T, idim]`
+        hx (tuple): hidden and cell states at the beginning, each `[1, B, n_units]`
+        chunk_size (int): number of frames per chunk
+        n_chunks (int): number of chunks to keep states for
+    Returns:
+        xs (FloatTensor): `[B, T, n_units]`
+        hx (tuple): hidden and cell states at the end, each `[1, B, n_units]`
+        hx_chunks (tuple): hidden and cell states at the end of each chunk,
+            each `[B, n_chunks, n_units]`
+
+    """
+    # NOTE: nn.LSTM does not return intermediate cell states
+    xs_out, hx_chunks = [], []
+    for t in range(0, xs.size(1), chunk_size):
+        xs_chunk, hx = rnn(xs[:, t:t + chunk_size], hx=hx)
+        xs_out.append(xs_chunk)
+        if len(hx_chunks) < n_chunks:
+            hx_chunks.append(hx)
+    if n_chunks > 0:
+        hx_chunks = tuple([torch.cat([state[i] for state in hx_chunks], dim=0).transpose(1, 0)
+                           for i in range(2)])
+    else:
+        hx_chunks = None
+    return torch.cat(xs_out, dim=1), hx, hx_chunks
 
 
 class Padding(nn.Module):
@@ -533,8 +708,12 @@ class Padding(nn.Module):
 
     def forward(self, xs, xlens, rnn, prev_state=None, streaming=False):
         if not streaming and xlens is not None:
-            xs = pack_padded_sequence(xs, xlens.tolist(), batch_first=True)
+            xs = pack_padded_sequence(xs, xlens, batch_first=True, enforce_sorted=False)
+            # NOTE: states are kept in the descending order of lengths as in sorted packing
+            if prev_state is not None:
+                prev_state = permute_state(prev_state, xs.unsorted_indices)
             xs, state = rnn(xs, hx=prev_state)
+            state = permute_state(state, xs.sorted_indices)
             xs = pad_packed_sequence(xs, batch_first=True)[0]
         else:
             xs, state = rnn(xs, hx=prev_state)
@@ -546,6 +725,21 @@ class Padding(nn.Module):
         return xs, state
 
 
+def permute_state(state, perm_ids):
+    """Permute RNN states along the batch dimension.
+
+    Args:
+        state (FloatTensor or tuple): `[n_layers * n_dirs, B, n_units]`
+        perm_ids (LongTensor): `[B]`
+    Returns:
+        state (FloatTensor or tuple): `[n_layers * n_dirs, B, n_units]`
+
+    """
+    if isinstance(state, tuple):
+        return tuple(s[:, perm_ids] for s in state)
+    return state[:, perm_ids]
+
+
 class NiN(nn.Module):
     """Network in network."""
 
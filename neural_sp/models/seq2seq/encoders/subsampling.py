@@ -3,7 +3,6 @@
 
 """Subsampling layers."""
 
-import math
 import torch
 import torch.nn as nn
 
@@ -47,8 +46,7 @@ class ConcatSubsampler(nn.Module):
         if batch_first:
             xs = xs.transpose(1, 0)
 
-        xlens = [max(1, i.item() // self.factor) for i in xlens]
-        xlens = torch.IntTensor(xlens)
+        xlens = torch.clamp(xlens // self.factor, min=1)
         return xs, xlens
 
 
@@ -121,8 +119,7 @@ class DropSubsampler(nn.Module):
         else:
             xs = xs[::self.factor]
 
-        xlens = [max(1, math.ceil(i.item() / self.factor)) for i in xlens]
-        xlens = torch.IntTensor(xlens)
+        xlens = torch.clamp((xlens + self.factor - 1) // self.factor, min=1)  # ceil
         return xs, xlens
 
 
@@ -167,8 +164,7 @@ class AddSubsampler(nn.Module):
 
         xs = xs_odd + xs_even
 
-        xlens = [max(1, math.ceil(i.item() / self.factor)) for i in xlens]
-        xlens = torch.IntTensor(xlens)
+        xlens = torch.clamp((xlens + self.factor - 1) // self.factor, min=1)  # ceil
         return xs, xlens
 
 
@@ -11,6 +11,7 @@ import random
 import torch
 import torch.nn as nn
 
+from neural_sp.models.modules.multihead_attention import init_kv_ring_buffer
 from neural_sp.models.modules.positional_embedding import (
     PositionalEncoding,
     XLPositionalEmbedding
@@ -27,10 +28,7 @@ from neural_sp.models.seq2seq.encoders.subsampling import (
 )
 from neural_sp.models.seq2seq.encoders.transformer_block import TransformerEncoderBlock
 from neural_sp.models.seq2seq.encoders.utils import chunkwise
-from neural_sp.models.torch_utils import (
-    make_pad_mask,
-    tensor2np
-)
+from neural_sp.models.torch_utils import make_pad_mask
 
 random.seed(1)
 
@@ -165,10 +163,6 @@ class TransformerEncoder(EncoderBase):
         self.bridge_sub1 = None
         self.bridge_sub2 = None
 
-        # for attention plot
-        self.aws_dict = {}
-        self.data_dict = {}
-
         # Setting for frontend CNNs
         self.conv = frontend_conv
         if self.conv is not None:
@@ -416,6 +410,146 @@ class TransformerEncoder(EncoderBase):
         else:
             return 10000 // self.conv_factor
 
+    def init_block_state(self, n_left=None):
+        """Initialize the state for block processing in streaming inference.
+
+        Args:
+            n_left (int): left-context budget (number of frames after frontend CNN)
+                kept in the first layer. This is divided by intermediate subsampling factors
+                in upper layers. Default is the left chunk size for the chunkwise encoder.
+        Returns:
+            state (dict):
+                layers (List[dict]): caches per layer
+                    kv (dict): ring buffers of projected keys/values
+                    conv (FloatTensor): inputs of causal depthwise convolution in Conformer
+                conv (List[dict]): caches of frontend CNN in the unidirectional encoder
+                offset (int): number of encoded frames after frontend CNN
+                buffer (FloatTensor): input frames waiting for a whole chunk or subsampling window
+
+        """
+        if not (self.unidir or self.streaming_type == 'mask'):
+            raise NotImplementedError('Block processing is supported for unidirectional or mask-based chunkwise encoders.')
+        if self.unidir and self.conv is not None and np.prod(self.subsample_factors) > 1:
+            raise NotImplementedError('Block processing with frontend CNN does not support subsampling in encoder layers.')
+        if sum(self.lookaheads) > 0:
+            raise NotImplementedError('Block processing does not support lookahead frames.')
+        if self.pos_enc is not None and '1dconv' in self.pe_type:
+            raise NotImplementedError(self.pe_type)
+        if self.subsample_layers is not None and isinstance(self.subsample_layers[0], Conv1dSubsampler):
+            raise NotImplementedError('Block processing does not support conv1d subsampling across blocks.')
+
+        if n_left is None:
+            n_left = self.N_l // self.conv_factor if self.lc_bidir else self._total_chunk_size_left()
+        layers = []
+        for lth in range(self.n_layers):
+            layers.append({'kv': init_kv_ring_buffer(n_left)})
+            n_left //= self.subsample_factors[lth]
+        return {'layers': layers, 'conv': None, 'offset': 0, 'buffer': None}
+
+    def forward_block(self, xs, state, is_last=False):
+        """Encode a new block for streaming inference.
+
+        Projected keys/values of previous blocks are cached in each layer up to a fixed
+        left-context budget, so that computation and memory per block are constant.
+        This is equivalent to `forward(streaming=True)` while previous blocks fit in the budget.
+        In the unidirectional encoder, frontend CNN keeps the left context of each layer
+        and emits frames once their right context arrives.
+        Blocks can have any length. Input frames are buffered until a whole chunk
+        (chunkwise encoder) or a whole window of intermediate subsampling layers
+        (unidirectional encoder) is available, so that outputs match offline encoding.
+
+        Args:
+            xs (FloatTensor): `[B, T_block, input_dim]`
+            state (dict): see `init_block_state`
+            is_last (bool): end of the stream, where buffered frames are flushed
+        Returns:
+            xs (FloatTensor): `[B, T_block', d_model]`
+            state (dict): updated state
+
+        """
+        if state['buffer'] is not None:
+            xs = torch.cat([state['buffer'], xs], dim=1)
+        unit = self.N_c if self.lc_bidir else int(np.prod(self.subsample_factors))
+        n_frames = xs.size(1) if is_last else xs.size(1) // unit * unit
+        xs, buffer = xs[:, :n_frames], xs[:, n_frames:]
+        state = dict(state, buffer=buffer if buffer.size(1) > 0 else None)
+
+        if self.lc_bidir:
+            blocks = [xs[:, t:t + unit] for t in range(0, n_frames, unit)]
+        else:
+            # NOTE: frontend CNN flushes buffered frames at the end of the stream
+            blocks = [xs] if n_frames > 0 or (is_last and self.conv is not None) else []
+        xs_out = []
+        for i, xs_i in enumerate(blocks):
+            xs_i, state = self._forward_block(xs_i, state, is_last=is_last and i == len(blocks) - 1)
+            xs_out.append(xs_i)
+        if len(xs_out) == 0:
+            return xs.new_zeros(xs.size(0), 0, self.output_dim), state
+        return torch.cat(xs_out, dim=1), state
+
+    def _forward_block(self, xs, state, is_last):
+        """Encode a chunk (chunkwise encoder) or frames (unidirectional encoder) in a block.
+
+        Args:
+            xs (FloatTensor): `[B, T_block, input_dim]`
+            state (dict): see `init_block_state`
+            is_last (bool): end of the stream, where frames buffered in frontend CNN are flushed
+        Returns:
+            xs (FloatTensor): `[B, T_block', d_model]`
+            state (dict): updated state
+
+        """
+        bs, xmax = xs.size()[:2]
+        xlens = torch.IntTensor([xmax] * bs)
+
+        conv_cache = None
+        if self.conv is None:
+            xs = self.embed(xs)
+        elif self.unidir:
+            xs, conv_cache = self.conv.forward_incremental(xs, state['conv'], is_last)
+            xlens = torch.IntTensor([xs.size(1)] * bs)
+            if xs.size(1) == 0:
+                return xs.new_zeros(bs, 0, self.output_dim), dict(state, conv=conv_cache)
+        else:
+            # NOTE: CNN consumes inputs in the current block only in the chunkwise encoder,
+            # where the last block is zero-padded to a whole chunk as in offline encoding
+            if xmax < self.N_c:
+                xs = torch.cat([xs, xs.new_zeros(bs, self.N_c - xmax, xs.size(2))], dim=1)
+            xs, xlens = self.conv(xs, xlens)
+            xs = xs[:, :xlens.max()]
+
+        # positional encoding
+        if self.pos_enc is not None:
+            xs = self.pos_enc(xs, scale=True, offset=state['offset'])
+        else:
+            xs = xs * self.scale
+        offset = state['offset'] + xs.size(1)
+
+        new_layers = []
+        for lth, layer in enumerate(self.layers):
+            cache = state['layers'][lth]
+            xx_mask = None
+            if self.unidir:
+                xx_mask = causal(make_san_mask(xs, xlens), 0)  # `[B, T_block, T_block]`
+            rel_pos_embs = None
+            if self.pos_emb is not None:
+                _, rel_pos_embs = self.pos_emb(xs, n_cache=cache['kv']['len'])
+
+            xs, new_cache = layer(xs, xx_mask, cache=cache,
+                                  pos_embs=rel_pos_embs, rel_bias=(self.u_bias, self.v_bias))
+            new_layers.append(new_cache)
+
+            if lth < len(self.layers) - 1 and self.subsample_factors[lth] > 1:
+                xs, xlens = self.subsample_layers[lth](xs, xlens)
+
+        xs = self.norm_out(xs)
+
+        # Bridge layer
+        if self.bridge is not None:
+            xs = self.bridge(xs)
+
+        return xs, dict(state, layers=new_layers, conv=conv_cache, offset=offset)
+
     def forward(self, xs, xlens, task, streaming=False,
                 lookback=False, lookahead=False):
         """Forward pass.
@@ -512,22 +646,8 @@ class TransformerEncoder(EncoderBase):
                                   pos_embs=rel_pos_embs, rel_bias=(self.u_bias, self.v_bias))
                 if self.streaming_type == 'mask':
                     new_cache[lth] = cache
-                if not self.training and not streaming:
-                    if self.streaming_type == 'reshape':
-                        n_heads = layer.xx_aws.size(1)
-                        xx_aws = layer.xx_aws[:, :, N_l:N_l + N_c, N_l:N_l + N_c]
-                        xx_aws = xx_aws.view(bs, n_chunks, n_heads, N_c, N_c)
-                        emax = xlens.max().item()
-                        xx_aws_center = xx_aws.new_zeros(bs, n_heads, emax, emax)
-                        for chunk_idx in range(n_chunks):
-                            offset = chunk_idx * N_c
-                            emax_chunk = xx_aws_center[:, :, offset:offset + N_c].size(2)
-                            xx_aws_chunk = xx_aws[:, chunk_idx, :, :emax_chunk, :emax_chunk]
-                            xx_aws_center[:, :, offset:offset + N_c, offset:offset + N_c] = xx_aws_chunk
-                        self.aws_dict['xx_aws_layer%d' % lth] = tensor2np(xx_aws_center)
-                    elif self.streaming_type == 'mask':
-                        self.aws_dict['xx_aws_layer%d' % lth] = tensor2np(layer.xx_aws)
-                    self.data_dict['elens%d' % lth] = tensor2np(xlens)
+                # NOTE: attention weights are captured by hooks for visualization
+                # (see neural_sp.trainers.attention_capture)
 
                 if lth < len(self.layers) - 1:
                     if self.subsample_factors[lth] > 1:
@@ -561,9 +681,6 @@ class TransformerEncoder(EncoderBase):
                 xs, cache = layer(xs, xx_mask, cache=self.cache[lth],
                                   pos_embs=rel_pos_embs, rel_bias=(self.u_bias, self.v_bias))
                 new_cache[lth] = cache
-                if not self.training and not streaming:
-                    self.aws_dict['xx_aws_layer%d' % lth] = tensor2np(layer.xx_aws)
-                    self.data_dict['elens%d' % lth] = tensor2np(xlens)
 
                 # Pick up outputs in the sub task before the projection layer
                 if lth == self.n_layers_sub1 - 1:
@@ -619,8 +736,6 @@ class TransformerEncoder(EncoderBase):
     def sub_module(self, xs, xx_mask, lth, pos_embs=None, module='sub1'):
         if self.task_specific_layer:
             xs_sub, cache = getattr(self, 'layer_' + module)(xs, xx_mask, pos_embs=pos_embs)
-            if not self.training:
-                self.aws_dict['xx_aws_%s_layer%d' % (module, lth)] = tensor2np(getattr(self, 'layer_' + module).xx_aws)
         else:
             xs_sub = xs.clone()
         if getattr(self, 'bridge_' + module) is not None:
@@ -67,6 +67,10 @@ class TransformerEncoderBlock(nn.Module):
         self.dropout_layer = dropout_layer  # probability to skip
         logger.info('Stochastic depth prob: %.3f' % dropout_layer)
 
+        # NOTE: attention weights are only used for visualization, and the fused
+        # kernel is used otherwise (see neural_sp.trainers.attention_capture)
+        self.need_weights = False
+
         self.reset_visualization()
 
     @property
@@ -85,6 +89,7 @@ class TransformerEncoderBlock(nn.Module):
             xx_mask (ByteTensor): `[B, T (query), T (key)]`
             cache (dict):
                 input_san: `[B, n_cache, d_model]`
+                kv (dict): ring buffers of projected keys/values for block processing
             pos_embs (LongTensor): `[T (query), 1, d_model]`
             rel_bias (tuple):
                 u_bias (FloatTensor): global parameter for relative positional encoding
@@ -93,6 +98,7 @@ class TransformerEncoderBlock(nn.Module):
             xs (FloatTensor): `[B, T (query), d_model]`
             new_cache (dict):
                 input_san: `[B, n_cache+T, d_model]`
+                kv (dict): updated ring buffers for block processing
 
         """
         self.reset_visualization()
@@ -113,22 +119,33 @@ class TransformerEncoderBlock(nn.Module):
         residual = xs  # `[B, qlen, d_model]`
         xs = self.norm1(xs)  # pre-norm
 
-        # cache
-        if cache is not None:
-            xs = torch.cat([cache['input_san'], xs], dim=1)
-        new_cache['input_san'] = xs
-
-        xs_kv = xs
-        if cache is not None:
-            xs = xs[:, -qlen:]
-            residual = residual[:, -qlen:]  # `[B, qlen, d_model]`
-            xx_mask = xx_mask[:, -qlen:]
-
-        if self.rel_attn:
-            xs, self._xx_aws = self.self_attn(xs_kv, xs, pos_embs, xx_mask, u_bias, v_bias)  # k/q/m
+        if cache is not None and 'kv' in cache:
+            # block processing with projected keys/values of previous blocks
+            if self.rel_attn:
+                xs, self._xx_aws, new_cache['kv'] = self.self_attn.forward_block(
+                    xs, cache['kv'], pos_embs, xx_mask, u_bias, v_bias)
+            else:
+                xs, self._xx_aws, new_cache['kv'] = self.self_attn.forward_block(
+                    xs, cache['kv'], xx_mask)
+            xs = self.dropout(xs) + residual
         else:
-            xs, self._xx_aws = self.self_attn(xs_kv, xs_kv, xs, mask=xx_mask)[:2]  # k/v/q
-        xs = self.dropout(xs) + residual
+            # cache
+            if cache is not None:
+                xs = torch.cat([cache['input_san'], xs], dim=1)
+            new_cache['input_san'] = xs
+
+            xs_kv = xs
+            if cache is not None:
+                xs = xs[:, -qlen:]
+                residual = residual[:, -qlen:]  # `[B, qlen, d_model]`
+                xx_mask = xx_mask[:, -qlen:]
+
+            if self.rel_attn:
+                xs, self._xx_aws = self.self_attn(xs_kv, xs, pos_embs, xx_mask, u_bias, v_bias)  # k/q/m
+            else:
+                xs, self._xx_aws = self.self_attn(xs_kv, xs_kv, xs, mask=xx_mask,
+                                                  need_weights=self.need_weights)[:2]  # k/v/q
+            xs = self.dropout(xs) + residual
 
         ##################################################
         # position-wise feed-forward
@@ -0,0 +1,268 @@
+# Copyright 2021 Kyoto University (Hirofumi Inaguma)
+#  Apache 2.0  (http://www.apache.org/licenses/LICENSE-2.0)
+
+"""Export Transformer/Conformer encoders and greedy decoders to TorchScript.
+
+Encoder and decoder networks are traced with torch.jit.trace, and the control flow
+of greedy decoding (stopping condition and label collapsing) is compiled with
+torch.jit.script. The exported modules take and return tensors only, and can be
+serialized with torch.jit.save and run without Python (e.g., LibTorch).
+
+"""
+
+import logging
+import math
+from typing import Tuple
+import warnings
+
+import torch
+import torch.nn as nn
+
+from neural_sp.models.seq2seq.decoders.transformer import TransformerDecoder
+from neural_sp.models.seq2seq.encoders.transformer import TransformerEncoder
+
+logger = logging.getLogger(__name__)
+
+
+class EncoderExportWrapper(nn.Module):
+    """Tensor-in/tensor-out wrapper of the encoder in Speech2Text.
+
+    Args:
+        model (Speech2Text): ASR model
+        task (str): ys/ys_sub1/ys_sub2
+
+    """
+
+    def __init__(self, model, task='ys'):
+
+        super(EncoderExportWrapper, self).__init__()
+
+        if not isinstance(model.enc, TransformerEncoder):
+            raise NotImplementedError('Only Transformer/Conformer encoders are supported.')
+        if model.enc.lc_bidir:
+            raise NotImplementedError('Chunkwise streaming encoders are not supported.')
+
+        self.ssn = model.ssn
+        self.enc = model.enc
+        self.task = task
+
+    def forward(self, xs, xlens):
+        """Forward pass.
+
+        Args:
+            xs (FloatTensor): `[B, T, input_dim]` (after frame stacking and splicing)
+            xlens (IntTensor): `[B]`
+        Returns:
+            eouts (FloatTensor): `[B, T', enc_n_units]`
+            elens (IntTensor): `[B]`
+
+        """
+        if self.ssn is not None:
+            xs = self.ssn(xs, xlens)
+        eout_dict = self.enc(xs, xlens, self.task)
+        return eout_dict[self.task]['xs'], eout_dict[self.task]['xlens']
+
+
+class CTCGreedyDecoder(nn.Module):
+    """Scriptable CTC greedy decoder (best path decoding).
+
+    Args:
+        ctc (CTC): CTC decoder
+
+    """
+
+    def __init__(self, ctc):
+
+        super(CTCGreedyDecoder, self).__init__()
+
+        self.output = ctc.output
+        self.blank = ctc.blank
+
+    def forward(self, eouts, elens) -> Tuple[torch.Tensor, torch.Tensor]:
+        """Forward pass.
+
+        Args:
+            eouts (FloatTensor): `[B, T, enc_n_units]`
+            elens (IntTensor): `[B]`
+        Returns:
+            hyps (LongTensor): `[B, L]`, padded with -1
+            hyp_lens (LongTensor): `[B]`
+
+        """
+        best_paths = self.output(eouts).argmax(-1)  # `[B, T]`
+        bs, xmax = best_paths.size()
+        mask = torch.arange(xmax, device=eouts.device).unsqueeze(0) < elens.to(eouts.device).unsqueeze(1)
+
+        # Step 1. Collapse repeated labels
+        prev = torch.cat([best_paths.new_full((bs, 1), -1), best_paths[:, :-1]], dim=1)
+        keep = (best_paths != prev) & mask
+        # Step 2. Remove all blank labels
+        keep = keep & (best_paths != self.blank)
+
+        hyp_lens = keep.sum(1)
+        # move labels to the left, and the others to the dummy last column
+        positions = torch.where(keep, keep.long().cumsum(1) - 1,
+                                torch.full_like(best_paths, xmax))
+        hyps = best_paths.new_full((bs, xmax + 1), -1)
+        hyps.scatter_(1, positions, best_paths.masked_fill(~keep, -1))
+        return hyps[:, :int(hyp_lens.max())], hyp_lens
+
+
+class TransformerDecoderStep(nn.Module):
+    """One step of the Transformer decoder with cached layer outputs.
+
+    Args:
+        dec (TransformerDecoder): Transformer decoder
+
+    """
+
+    def __init__(self, dec):
+
+        super(TransformerDecoderStep, self).__init__()
+
+        self.dec = dec
+
+    def forward(self, ys, eouts, cache):
+        """Forward pass.
+
+        Args:
+            ys (LongTensor): `[B, L]`
+            eouts (FloatTensor): `[B, T, enc_n_units]`
+            cache (FloatTensor): `[n_layers, B, L - 1, d_model]`
+        Returns:
+            logits (FloatTensor): `[B, vocab]`
+            new_cache (FloatTensor): `[n_layers, B, L, d_model]`
+
+        """
+        bs, ymax = ys.size()
+        causal_mask = eouts.new_ones(ymax, ymax, dtype=torch.uint8)
+        causal_mask = torch.tril(causal_mask).unsqueeze(0).repeat([bs, 1, 1])
+
+        out = self.dec.pos_enc(self.dec.embed_token_id(ys), scale=True)
+        new_cache = []
+        for lth, layer in enumerate(self.dec.layers):
+            # NOTE: only the last position is computed with a non-empty cache
+            out = layer(out, causal_mask, eouts, None, cache=cache[lth])
+            new_cache.append(out)
+        logits = self.dec.output(self.dec.norm_out(out))[:, -1]
+        return logits, torch.stack(new_cache, dim=0)
+
+
+class TransformerGreedyDecoder(nn.Module):
+    """Scriptable attention-based greedy decoder.
+
+    Args:
+        step (ScriptModule): traced TransformerDecoderStep
+        eos (int): index for <eos> (shared with <sos>)
+        n_layers (int): number of decoder layers
+        d_model (int): dimension of decoder layers
+        max_len_ratio (float): maximum sequence length of tokens
+
+    """
+
+    def __init__(self, step, eos, n_layers, d_model, max_len_ratio=1.):
+
+        super(TransformerGreedyDecoder, self).__init__()
+
+        self.step = step
+        self.eos = eos
+        self.n_layers = n_layers
+        self.d_model = d_model
+        self.max_len_ratio = float(max_len_ratio)
+
+    def forward(self, eouts) -> Tuple[torch.Tensor, torch.Tensor]:
+        """Forward pass.
+
+        Args:
+            eouts (FloatTensor): `[B, T, enc_n_units]`
+        Returns:
+            hyps (LongTensor): `[B, L]`, including <eos>
+            ylens (IntTensor): `[B]`, including <eos>
+
+        """
+        bs, xmax = eouts.size(0), eouts.size(1)
+        ys = torch.full((bs, 1), self.eos, dtype=torch.int64, device=eouts.device)
+        cache = eouts.new_zeros(self.n_layers, bs, 0, self.d_model)
+        ylens = torch.zeros(bs, dtype=torch.int32, device=eouts.device)
+        eos_flags = torch.zeros(bs, dtype=torch.bool, device=eouts.device)
+        ymax = int(math.ceil(xmax * self.max_len_ratio))
+        for _ in range(ymax):
+            logits, cache = self.step(ys, eouts, cache)
+            y = logits.argmax(-1)  # `[B]`
+            ys = torch.cat([ys, y.unsqueeze(1)], dim=1)
+
+            # Count lengths of hypotheses
+            ylens += (~eos_flags).int()  # include <eos>
+            eos_flags = eos_flags | (y == self.eos)
+
+            # Break if <eos> is outputed in all mini-batch
+            if bool(eos_flags.all()):
+                break
+
+        return ys[:, 1:], ylens
+
+
+def export_encoder(model, xs, xlens, task='ys'):
+    """Trace the encoder of Speech2Text.
+
+    Args:
+        model (Speech2Text): ASR model in the evaluation mode
+        xs (FloatTensor): example inputs. `[B, T, input_dim]`
+        xlens (IntTensor): `[B]`
+        task (str): ys/ys_sub1/ys_sub2
+    Returns:
+        ScriptModule: (xs, xlens) -> (eouts, elens)
+
+    """
+    assert not model.training
+    wrapper = EncoderExportWrapper(model, task)
+    with torch.no_grad(), warnings.catch_warnings():
+        # NOTE: attention weights for visualization are converted to numpy arrays
+        warnings.simplefilter('ignore', torch.jit.TracerWarning)
+        traced = torch.jit.trace(wrapper, (xs, xlens.clone()), check_trace=False)
+    logger.info('Exported the %s encoder' % model.enc_type)
+    return traced
+
+
+def export_ctc_greedy(model, task='ys'):
+    """Script CTC greedy decoding of Speech2Text.
+
+    Args:
+        model (Speech2Text): ASR model
+        task (str): ys/ys_sub1/ys_sub2
+    Returns:
+        ScriptModule: (eouts, elens) -> (hyps, hyp_lens)
+
+    """
+    dir = 'fwd' if task == 'ys' else 'fwd_' + task.split('_')[1]
+    ctc = getattr(model, 'dec_' + dir).ctc
+    if ctc is None:
+        raise ValueError('CTC is not trained for %s.' % task)
+    return torch.jit.script(CTCGreedyDecoder(ctc))
+
+
+def export_transformer_greedy(model, eouts, max_len_ratio=1.):
+    """Export attention-based greedy decoding of Speech2Text.
+
+    Args:
+        model (Speech2Text): ASR model in the evaluation mode
+        eouts (FloatTensor): example encoder outputs. `[B, T, enc_n_units]`
+        max_len_ratio (float): maximum sequence length of tokens
+    Returns:
+        ScriptModule: eouts -> (hyps, ylens)
+
+    """
+    assert not model.training
+    dec = model.dec_fwd
+    if not isinstance(dec, TransformerDecoder) or dec.attn_type != 'scaled_dot':
+        raise NotImplementedError('Only Transformer decoders with scaled_dot attention are supported.')
+
+    # trace with a non-empty cache so that both inputs have dynamic lengths
+    bs = eouts.size(0)
+    ys = eouts.new_zeros((bs, 2), dtype=torch.int64).fill_(dec.eos)
+    cache = eouts.new_zeros(dec.n_layers, bs, 1, dec.d_model)
+    with torch.no_grad(), warnings.catch_warnings():
+        warnings.simplefilter('ignore', torch.jit.TracerWarning)
+        step = torch.jit.trace(TransformerDecoderStep(dec), (ys, eouts, cache), check_trace=False)
+    return torch.jit.script(TransformerGreedyDecoder(step, dec.eos, dec.n_layers, dec.d_model,
+                                                     max_len_ratio))
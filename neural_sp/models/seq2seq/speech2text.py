@@ -94,6 +94,7 @@ class Speech2Text(ModelBase):
 
         # for discourse-aware model
         self.utt_id_prev = None
+        self.reset_encoder_cache()
 
         # Feature extraction
         self.input_noise_std = args.input_noise_std
@@ -264,6 +265,7 @@ class Speech2Text(ModelBase):
                 loss, observation = self._forward(batch, task)
         else:
             self.train()
+            self.reset_encoder_cache()  # parameters will be updated
             loss, observation = self._forward(batch, task, teacher, teacher_lm)
 
         return loss, observation
@@ -430,6 +432,41 @@ class Speech2Text(ModelBase):
 
         return eout_dict
 
+    def reset_encoder_cache(self):
+        """Reset the encoder output cache used in the inference stage."""
+        self.eout_cache_key = None
+        self.eout_cache = {}
+
+    def encode_cached(self, xs, task, utt_ids=None):
+        """Encode acoustic features, reusing encoder outputs of the same utterances.
+
+        Encoder outputs for all tasks are computed in a single forward pass and
+        kept until different utterances are fed. Decoding multiple tasks of the
+        same utterances (e.g., the main task and sub1 CTC) runs the encoder only once.
+
+        Args:
+            xs (List): length `[B]`, which contains arrays of size `[T, input_dim]`
+            task (str): ys*/ys_sub1*/ys_sub2*
+            utt_ids (List): utterance id list. Caching is disabled if None.
+        Returns:
+            eout_dict (dict):
+
+        """
+        if utt_ids is None:
+            return self.encode(xs, task)
+
+        key = (tuple(utt_ids), tuple([len(x) for x in xs]))
+        if key != self.eout_cache_key:
+            self.reset_encoder_cache()
+            self.eout_cache_key = key
+        if self.eout_cache.get(task, {}).get('xs') is None:
+            eout_dict = self.encode(xs, 'all')
+            self.eout_cache.update({k: v for k, v in eout_dict.items() if v['xs'] is not None})
+            if task not in self.eout_cache:
+                # NOTE: the encoder does not compute this task in the 'all' mode
+                self.eout_cache[task] = self.encode(xs, task)[task]
+        return self.eout_cache
+
     def get_ctc_probs(self, xs, task='ys', temperature=1, topk=None):
         """Get CTC top-K probabilities.
 
@@ -492,15 +529,18 @@ class Speech2Text(ModelBase):
         return tensor2np(trigger_points)
 
     def plot_attention(self):
-        """Plot attention weights during training."""
-        # encoder
-        self.enc._plot_attention(mkdir_join(self.save_path, 'enc_att_weights'))
-        # decoder
-        self.dec_fwd._plot_attention(mkdir_join(self.save_path, 'dec_att_weights'))
-        if getattr(self, 'dec_fwd_sub1', None) is not None:
-            self.dec_fwd_sub1._plot_attention(mkdir_join(self.save_path, 'dec_att_weights_sub1'))
-        if getattr(self, 'dec_fwd_sub2', None) is not None:
-            self.dec_fwd_sub2._plot_attention(mkdir_join(self.save_path, 'dec_att_weights_sub2'))
+        """Plot attention weights of RNN decoders during training.
+
+        NOTE: attention weights in Transformer encoders and decoders are
+        captured by hooks and plotted by `AttentionPlotter` instead
+        (see neural_sp.trainers.attention_capture).
+
+        """
+        for sub in ['', '_sub1', '_sub2']:
+            dec = getattr(self, 'dec_fwd' + sub, None)
+            if dec is None or len(getattr(dec, 'aws_dict', {})) == 0:
+                continue
+            dec._plot_attention(mkdir_join(self.save_path, 'dec_att_weights' + sub))
 
     def plot_ctc(self):
         """Plot CTC posteriors during training."""
@@ -525,6 +565,8 @@ class Speech2Text(ModelBase):
         assert self.input_type == 'speech'
         assert self.fwd_weight > 0
         assert len(xs) == 1  # batch size
+        if self._block_processing_available():
+            return self._encode_streaming_block(xs, params, task)
         streaming = Streaming(xs[0], params, self.enc)
 
         self.enc.reset_cache()
@@ -547,6 +589,48 @@ class Speech2Text(ModelBase):
 
         return eout, elens
 
+    def _block_processing_available(self):
+        """Check if the encoder can encode new blocks with constant computation per block."""
+        if not hasattr(self.enc, 'forward_block') or self.ssn is not None:
+            return False
+        try:
+            self.enc.init_block_state()
+        except NotImplementedError:
+            return False
+        return True
+
+    def _encode_streaming_block(self, xs, params, task='ys'):
+        """Simulate streaming encoding with block processing in the encoder.
+        Only new input frames are fed to the encoder block by block, and contexts
+        of previous blocks (including frontend CNN) are cached in the encoder state.
+        Args:
+            xs (List): length `[1]`, which contains Tensor of size `[T, input_dim]`
+            params (dict): hyper-parameters for decoding
+            task (str): task to evaluate
+        Returns:
+            eout (FloatTensor): `[1, T, idim]`
+            elens (IntTensor): `[1]`
+
+        """
+        x = xs[0]
+        if self.n_stacks > 1:
+            x = stack_frame(x, self.n_stacks, self.n_skips)
+        if self.n_splices > 1:
+            x = splice(x, self.n_splices, self.n_stacks)
+        x = np2tensor(x, self.device).float().unsqueeze(0)
+
+        block_size = self.enc.N_c if self.enc.N_c > 0 else params.get('recog_block_sync_size')
+        state = self.enc.init_block_state()
+        eout_blocks = []
+        for t in range(0, x.size(1), block_size):
+            eout_block, state = self.enc.forward_block(x[:, t:t + block_size], state,
+                                                       is_last=t + block_size >= x.size(1))
+            eout_blocks.append(eout_block)
+        eout = torch.cat(eout_blocks, dim=1)
+        elens = torch.IntTensor([eout.size(1)])
+
+        return eout, elens
+
     @torch.no_grad()
     def decode_streaming(self, xs, params, idx2token, exclude_eos=False,
                          speaker=None, task='ys'):
@@ -748,6 +832,10 @@ class Speech2Text(ModelBase):
         # Encode input features
         if params['recog_streaming_encoding']:
             eouts, elens = self.encode_streaming(xs, params, task)
+        elif params.get('recog_cache_encoder_outputs'):
+            eout_dict = self.encode_cached(xs, task, utt_ids)
+            eouts = eout_dict[task]['xs']
+            elens = eout_dict[task]['xlens']
         else:
             eout_dict = self.encode(xs, task)
             eouts = eout_dict[task]['xs']
@@ -812,7 +900,10 @@ class Speech2Text(ModelBase):
                 ensmbl_eouts, ensmbl_elens, ensmbl_decs = [], [], []
                 if len(ensemble_models) > 0:
                     for i_e, model in enumerate(ensemble_models):
-                        enc_outs_e = model.encode(xs, task)
+                        if params.get('recog_cache_encoder_outputs'):
+                            enc_outs_e = model.encode_cached(xs, task, utt_ids)
+                        else:
+                            enc_outs_e = model.encode(xs, task)
                         ensmbl_eouts += [enc_outs_e[task]['xs']]
                         ensmbl_elens += [enc_outs_e[task]['xlens']]
                         ensmbl_decs += [getattr(model, 'dec_' + dir)]
@@ -143,3 +143,25 @@ def compute_accuracy(logits, ys_ref, pad):
     denominator = torch.sum(mask)
     acc = float(numerator) * 100 / float(denominator)
     return acc
+
+
+def quantize_model(model):
+    """Apply dynamic int8 quantization to linear and recurrent layers for CPU inference.
+
+    Weights are quantized ahead of time and activations are quantized on the fly,
+    so that no calibration data is required. Layers are replaced in-place.
+
+    Args:
+        model (torch.nn.Module): model on CPU
+    Returns:
+        model (torch.nn.Module): quantized model
+
+    """
+    if hasattr(torch, 'ao'):
+        from torch.ao.quantization import quantize_dynamic
+    else:
+        from torch.quantization import quantize_dynamic
+    return quantize_dynamic(model,
+                            {torch.nn.Linear, torch.nn.LSTM, torch.nn.LSTMCell,
+                             torch.nn.GRU, torch.nn.GRUCell},
+                            dtype=torch.qint8, inplace=True)
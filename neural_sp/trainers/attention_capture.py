@@ -0,0 +1,208 @@
+# Copyright 2021 Kyoto University (Hirofumi Inaguma)
+#  Apache 2.0  (http://www.apache.org/licenses/LICENSE-2.0)
+
+"""Memory-bounded capture of attention weights for plotting during training."""
+
+import atexit
+import functools
+import logging
+import math
+import queue
+import threading
+import torch
+import torch.nn.functional as F
+
+logger = logging.getLogger(__name__)
+
+# attention weights exposed by Transformer/Conformer blocks for visualization
+AW_NAMES = ['xx_aws', 'yy_aws', 'xy_aws', 'xy_aws_beta', 'xy_aws_p_choose', 'yy_aws_lm']
+
+
+def parse_ids(ids):
+    """Parse indices separated by "_" (e.g., "0_3_5"). Empty string for all.
+
+    Args:
+        ids (str or List[int]): indices
+    Returns:
+        ids (List[int]): indices. None for all.
+
+    """
+    if isinstance(ids, str):
+        ids = [int(i) for i in ids.split('_') if i != '']
+    return list(ids) if ids else None
+
+
+def downsample(aw, max_len):
+    """Downsample attention weights by average pooling.
+
+    Args:
+        aw (FloatTensor): `[B, H, qlen, klen]`
+        max_len (int): maximum length of each axis after downsampling
+    Returns:
+        aw (FloatTensor): `[B, H, ceil(qlen / stride_q), ceil(klen / stride_k)]`
+
+    """
+    stride_q = max(1, math.ceil(aw.size(2) / max_len))
+    stride_k = max(1, math.ceil(aw.size(3) / max_len))
+    if stride_q == 1 and stride_k == 1:
+        return aw
+    return F.avg_pool2d(aw.float(), (stride_q, stride_k), ceil_mode=True)
+
+
+class AttentionCapture(object):
+    """Capture attention weights of selected layers with forward hooks.
+
+    Only selected utterances and heads are kept. They are downsampled on the
+    device and then copied to CPU memory as float16, so that the memory does
+    not grow quadratically with the input length. Nothing is captured unless
+    enabled. While enabled, blocks that otherwise use the fused attention
+    kernel are requested to compute attention weights.
+
+    Args:
+        layers (str or List[int]): indices of layers. Empty for all layers.
+        heads (str or List[int]): indices of heads. Empty for all heads.
+        utt_ids (str or List[int]): indices of utterances in a mini-batch
+        max_len (int): maximum length of each axis of attention maps
+
+    """
+
+    def __init__(self, layers='', heads='', utt_ids='0', max_len=256):
+
+        self.layers = parse_ids(layers)
+        self.heads = parse_ids(heads)
+        self.utt_ids = parse_ids(utt_ids) or [0]
+        self.max_len = max_len
+        self.enabled = False
+        self.aws_dict = {}
+        self.handles = []
+        self.modules = []
+        self._need_weights_prev = []
+
+    def attach(self, model):
+        """Register forward hooks to blocks exposing attention weights.
+
+        Args:
+            model (nn.Module): model
+        Returns:
+            self
+
+        """
+        for name, module in model.named_modules():
+            if not hasattr(module, 'reset_visualization'):
+                continue
+            lth = name.split('.')[-1]
+            if self.layers is not None and not (lth.isdigit() and int(lth) in self.layers):
+                continue
+            self.handles.append(module.register_forward_hook(functools.partial(self._hook, name)))
+            self.modules.append(module)
+        logger.info('Capture attention weights in %d blocks' % len(self.handles))
+        return self
+
+    def detach(self):
+        """Remove all hooks."""
+        for h in self.handles:
+            h.remove()
+        self.handles = []
+        self.modules = []
+
+    def __call__(self, enabled=True):
+        self.enabled = enabled
+        self._need_weights_prev = []
+        if enabled:
+            for module in self.modules:
+                if hasattr(module, 'need_weights'):
+                    self._need_weights_prev.append((module, module.need_weights))
+                    module.need_weights = True
+        return self
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.enabled = False
+        for module, need_weights in self._need_weights_prev:
+            module.need_weights = need_weights
+        self._need_weights_prev = []
+
+    def pop(self):
+        """Return captured attention weights and clear them.
+
+        Returns:
+            aws_dict (dict): `[n_utts, n_heads, qlen', klen']` (np.ndarray, float16) per block and type
+
+        """
+        aws_dict, self.aws_dict = self.aws_dict, {}
+        return aws_dict
+
+    def _hook(self, name, module, inputs, outputs):
+        if not self.enabled:
+            return
+        with torch.no_grad():
+            for k in AW_NAMES:
+                aw = getattr(module, k, None)
+                if not isinstance(aw, torch.Tensor) or aw.dim() != 4:
+                    continue
+                bs, n_heads = aw.size()[:2]
+                utt_ids = [b for b in self.utt_ids if -bs <= b < bs]
+                heads = [h for h in (self.heads or range(n_heads)) if -n_heads <= h < n_heads]
+                if len(utt_ids) == 0 or len(heads) == 0:
+                    continue
+                aw = aw.detach()[utt_ids][:, heads]
+                aw = downsample(aw, self.max_len)
+                self.aws_dict[name + '.' + k] = aw.to('cpu', torch.float16).numpy()
+
+
+class AttentionPlotter(object):
+    """Render attention weights on a background thread.
+
+    At most one set of attention weights waits to be rendered. New requests
+    are dropped while the previous one is still being rendered, so that
+    training never waits for plotting.
+
+    Args:
+        n_cols (int): number of columns in each figure
+
+    """
+
+    def __init__(self, n_cols=2):
+
+        self.n_cols = n_cols
+        self.queue = queue.Queue(maxsize=1)
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+        atexit.register(self.wait)
+
+    def _run(self):
+        from neural_sp.bin.plot_utils import plot_attention_maps
+        while True:
+            aws_dict, save_path = self.queue.get()
+            try:
+                plot_attention_maps(aws_dict, save_path, self.n_cols)
+            except Exception as e:
+                logger.warning("Failed to plot attention weights in %s: %s" % (save_path, e))
+            finally:
+                del aws_dict
+                self.queue.task_done()
+
+    def put(self, aws_dict, save_path):
+        """Enqueue attention weights to be rendered.
+
+        Args:
+            aws_dict (dict): attention weights (see `AttentionCapture.pop`)
+            save_path (str): directory to save figures
+        Returns:
+            bool: False if dropped
+
+        """
+        if len(aws_dict) == 0:
+            return False
+        try:
+            self.queue.put_nowait((aws_dict, save_path))
+        except queue.Full:
+            logger.info('Skip plotting attention weights because the previous ones are being rendered.')
+            return False
+        return True
+
+    def wait(self):
+        """Block until all enqueued attention weights are rendered."""
+        self.queue.join()
@@ -0,0 +1,102 @@
+# Copyright 2021 Kyoto University (Hirofumi Inaguma)
+#  Apache 2.0  (http://www.apache.org/licenses/LICENSE-2.0)
+
+"""Background checkpoint writer."""
+
+import atexit
+import logging
+import os
+import queue
+import threading
+import torch
+
+logger = logging.getLogger(__name__)
+
+
+def snapshot(obj):
+    """Copy all tensors in a (nested) state dict to CPU memory.
+
+    Args:
+        obj: state dict, or any nested structure of dict/list/tuple
+    Returns:
+        obj: the same structure whose tensors are detached copies on CPU
+
+    """
+    if isinstance(obj, torch.Tensor):
+        return obj.detach().to('cpu', copy=True)
+    elif isinstance(obj, dict):
+        return obj.__class__((k, snapshot(v)) for k, v in obj.items())
+    elif isinstance(obj, (list, tuple)):
+        return obj.__class__(snapshot(v) for v in obj)
+    return obj
+
+
+def save_atomic(checkpoint, path):
+    """Save a checkpoint to a temporary file and rename it to the destination.
+
+    Args:
+        checkpoint (dict): checkpoint to save
+        path (str): path to the checkpoint
+
+    """
+    path_tmp = os.path.join(os.path.dirname(path), '.' + os.path.basename(path) + '.tmp')
+    torch.save(checkpoint, path_tmp)
+    os.replace(path_tmp, path)
+
+
+class CheckpointWriter(object):
+    """Serialize checkpoints on a background thread.
+
+    Checkpoints are written one by one, and at most `max_queue_size` checkpoints
+    wait to be written. `put` blocks when the queue is full, so that snapshots
+    of state dicts do not pile up in CPU memory.
+
+    Args:
+        max_queue_size (int): maximum number of checkpoints waiting to be written
+
+    """
+
+    def __init__(self, max_queue_size=1):
+
+        self.queue = queue.Queue(maxsize=max_queue_size)
+        self.error = None
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+        atexit.register(self.wait)
+
+    def _run(self):
+        while True:
+            checkpoint, path, callback = self.queue.get()
+            try:
+                save_atomic(checkpoint, path)
+                logger.info("=> Saved checkpoint: %s" % path)
+                if callback is not None:
+                    callback()
+            except Exception as e:
+                logger.error("Failed to save checkpoint %s: %s" % (path, e))
+                self.error = e
+            finally:
+                del checkpoint
+                self.queue.task_done()
+
+    def put(self, checkpoint, path, callback=None):
+        """Enqueue a checkpoint to be written.
+
+        Args:
+            checkpoint (dict): checkpoint, which must not share tensors with the model
+            path (str): path to the checkpoint
+            callback (callable): called after the checkpoint is written
+
+        """
+        self._raise_error()
+        self.queue.put((checkpoint, path, callback))
+
+    def wait(self):
+        """Block until all enqueued checkpoints are written."""
+        self.queue.join()
+        self._raise_error()
+
+    def _raise_error(self):
+        if self.error is not None:
+            error, self.error = self.error, None
+            raise error
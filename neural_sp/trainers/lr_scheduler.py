@@ -4,11 +4,17 @@
 """Learning rate scheduler."""
 
 from distutils.version import LooseVersion
+from functools import partial
 from glob import glob
 import logging
 import os
 import torch
 
+from neural_sp.trainers.checkpoint_writer import (
+    CheckpointWriter,
+    save_atomic,
+    snapshot
+)
 from neural_sp.trainers.optimizer import set_optimizer
 
 logger = logging.getLogger(__name__)
@@ -41,6 +47,7 @@ class LRScheduler(object):
         factor (float): factor of learning rate for Transformer
         noam (bool): learning rate scheduling for Transformer
         save_checkpoints_topk (int): save top-k checkpoints
+        save_checkpoints_async (bool): serialize checkpoints on a background thread
 
     """
 
@@ -48,7 +55,8 @@ class LRScheduler(object):
                  decay_type, decay_start_epoch, decay_rate,
                  decay_patient_n_epochs=0, early_stop_patient_n_epochs=-1, lower_better=True,
                  warmup_start_lr=0, warmup_n_steps=0, peak_lr=1e6,
-                 model_size=0, factor=1, noam=False, save_checkpoints_topk=1):
+                 model_size=0, factor=1, noam=False, save_checkpoints_topk=1,
+                 save_checkpoints_async=False):
 
         self.optimizer = optimizer
         self.noam = noam
@@ -83,6 +91,9 @@ class LRScheduler(object):
         assert save_checkpoints_topk >= 1
         self.topk_list = []
 
+        # for checkpoint
+        self._checkpoint_writer = CheckpointWriter() if save_checkpoints_async else None
+
     @property
     def n_steps(self):
         return self._step
@@ -204,15 +215,6 @@ class LRScheduler(object):
             epoch_detail = self.n_epochs
         model_path = os.path.join(save_path, 'model.epoch-' + str(epoch_detail))
 
-        # Remove old checkpoints
-        if remove_old:
-            for path in glob(os.path.join(save_path, 'model.epoch-*')):
-                if 'model.epoch-avg' in path:
-                    continue
-                epoch = int(path.split('-')[-1])
-                if epoch not in [ep for (ep, v) in self.topk_list]:
-                    os.remove(path)
-
         # Save parameters, optimizer, step index etc.
         checkpoint = {
             "model_state_dict": model.module.state_dict(),
@@ -220,9 +222,44 @@ class LRScheduler(object):
         }
         if amp is not None:
             checkpoint['amp_state_dict'] = amp.state_dict()
-        torch.save(checkpoint, model_path)
 
-        logger.info("=> Saved checkpoint (epoch:%s): %s" % (str(epoch_detail), model_path))
+        # Remove old checkpoints after the new one is written
+        callback = None
+        if remove_old:
+            topk_epochs = [ep for (ep, v) in self.topk_list]
+            callback = partial(self._remove_old_checkpoints, save_path, topk_epochs, model_path)
+
+        if self._checkpoint_writer is not None:
+            # copy tensors to CPU memory here because training goes on during serialization
+            self._checkpoint_writer.put(snapshot(checkpoint), model_path, callback)
+            logger.info("=> Saving checkpoint (epoch:%s) in background: %s" % (str(epoch_detail), model_path))
+        else:
+            save_atomic(checkpoint, model_path)
+            if callback is not None:
+                callback()
+            logger.info("=> Saved checkpoint (epoch:%s): %s" % (str(epoch_detail), model_path))
+
+    def wait_checkpoint(self):
+        """Block until all checkpoints are written."""
+        if self._checkpoint_writer is not None:
+            self._checkpoint_writer.wait()
+
+    @staticmethod
+    def _remove_old_checkpoints(save_path, topk_epochs, model_path):
+        """Remove checkpoints worse than the top-k ones.
+
+        Args:
+            save_path (str): path to the directory to save a model
+            topk_epochs (List): epochs of the top-k checkpoints
+            model_path (str): path to the checkpoint just written, which is always kept
+
+        """
+        for path in glob(os.path.join(save_path, 'model.epoch-*')):
+            if 'model.epoch-avg' in path or path == model_path:
+                continue
+            epoch = int(path.split('-')[-1])
+            if epoch not in topk_epochs:
+                os.remove(path)
 
     def get_state_dict(self):
         """Return state of scheduler as a :class:`dict`.
@@ -231,7 +268,7 @@ class LRScheduler(object):
         is not the optimizer.
 
         """
-        dict = {k: v for k, v in self.__dict__.items() if k not in ['optimizer']}
+        dict = {k: v for k, v in self.__dict__.items() if k not in ['optimizer', '_checkpoint_writer']}
         dict['optimizer_state_dict'] = self.optimizer.state_dict()
         return dict
 
@@ -243,7 +280,7 @@ class LRScheduler(object):
                 from a call to :meth:`state_dict`.
 
         """
-        self.__dict__.update({k: v for k, v in state_dict.items() if k != 'optimizer_state_dict'})
+        self.__dict__.update({k: v for k, v in state_dict.items() if k not in ['optimizer_state_dict', '_checkpoint_writer']})
         self.optimizer.load_state_dict(state_dict['optimizer_state_dict'])
 
     def cuda(self, device_id):
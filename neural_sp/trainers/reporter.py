@@ -7,15 +7,11 @@ import csv
 import glob
 import os
 import numpy as np
-from matplotlib import pyplot as plt
 import logging
-import matplotlib
-from tensorboardX import SummaryWriter
-import wandb
 
-matplotlib.use('Agg')
+# NOTE: matplotlib, tensorboardX and wandb are imported on first use
+# because they take seconds to import
 
-plt.style.use('ggplot')
 grey = '#878f99'
 blue = '#4682B4'
 orange = '#D2691E'
@@ -24,6 +20,14 @@ green = '#82b74b'
 logger = logging.getLogger(__name__)
 
 
+def _import_pyplot():
+    import matplotlib
+    matplotlib.use('Agg')
+    from matplotlib import pyplot as plt
+    plt.style.use('ggplot')
+    return plt
+
+
 class Reporter(object):
     """Report loss, accuracy etc. during training."""
 
@@ -33,6 +37,7 @@ class Reporter(object):
 
         # tensorboard
         if use_tensorboard and rank == 0:
+            from tensorboardX import SummaryWriter
             self.tf_writer = SummaryWriter(args.save_path)
         else:
             self.tf_writer = None
@@ -40,6 +45,7 @@ class Reporter(object):
         # wandb
         self.use_wandb = args.use_wandb and rank == 0
         if self.use_wandb:
+            import wandb
             if args.resume and getattr(args, 'wandb_id', None) is not None:
                 id = args.wandb_id
             else:
@@ -117,6 +123,7 @@ class Reporter(object):
     def _log_wandb(self):
         """Add scalar values to wandb."""
         if self.use_wandb:
+            import wandb
             wandb.log({'epoch': self._epoch}, step=self._step, commit=True)
 
     def add_scalar(self, key, value, is_eval=False):
@@ -124,6 +131,7 @@ class Reporter(object):
         if self.tf_writer is not None and value is not None:
             self.tf_writer.add_scalar(key, value, self._step)
         if self.use_wandb and value is not None:
+            import wandb
             wandb.log({key: value}, step=self._step, commit=False)
 
     def add_tensorboard_histogram(self, key, value):
@@ -171,6 +179,7 @@ class Reporter(object):
         # register
         self.obsv_eval.append(metric)
 
+        plt = _import_pyplot()
         plt.clf()
         upper = 0.1
         plt.plot(self.epochs, self.obsv_eval, orange,
@@ -193,6 +202,7 @@ class Reporter(object):
 
         # linestyles = ['solid', 'dashed', 'dotted', 'dashdotdotted']
         linestyles = ['-', '--', '-.', ':', ':', ':', ':', ':', ':', ':', ':', ':']
+        plt = _import_pyplot()
         for metric in self.obsv_train.keys():
             plt.clf()
             upper = 0.1
@@ -0,0 +1,99 @@
+#! /usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""Benchmark integrate-and-fire in CIF."""
+
+import argparse
+import time
+import torch
+
+from neural_sp.models.modules.cif import integrate_and_fire
+
+
+def integrate_and_fire_loop(eouts, elens, alpha_norm, ylens, ymax, beta):
+    """Previous implementation, which loops over frames and utterances."""
+    bs, xmax, enc_dim = eouts.size()
+    cv = eouts.new_zeros(bs, ymax + 1, enc_dim)
+    aws = eouts.new_zeros(bs, ymax + 1, xmax)
+    n_tokens = torch.zeros(bs, dtype=torch.int64)
+    state = eouts.new_zeros(bs, enc_dim)
+    alpha_accum = eouts.new_zeros(bs)
+    for j in range(xmax):
+        alpha_accum_prev = alpha_accum
+        alpha_accum += alpha_norm[:, j]
+
+        if (alpha_accum >= beta).sum() == 0:
+            state += alpha_norm[:, j, None] * eouts[:, j]
+            aws[:, n_tokens, j] += alpha_norm[:, j]
+        else:
+            for b in range(bs):
+                if j > elens[b] - 1:
+                    continue
+                if n_tokens[b].item() >= ylens[b]:
+                    continue
+                if alpha_accum[b] < beta:
+                    state[b] += alpha_norm[b, j, None] * eouts[b, j]
+                    aws[b, n_tokens[b], j] += alpha_norm[b, j]
+                else:
+                    ak1 = 1 - alpha_accum_prev[b]
+                    ak2 = alpha_norm[b, j] - ak1
+                    cv[b, n_tokens[b]] = state[b] + ak1 * eouts[b, j]
+                    aws[b, n_tokens[b], j] += ak1
+                    n_tokens[b] += 1
+                    state[b] = ak2 * eouts[b, j]
+                    alpha_accum[b] = ak2
+                    aws[b, n_tokens[b], j] += ak2
+    return cv[:, :ymax], aws[:, :ymax]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--batch_size', type=int, default=32)
+    parser.add_argument('--enc_dim', type=int, default=256)
+    parser.add_argument('--max_len', type=int, default=1000)
+    parser.add_argument('--token_rate', type=float, default=0.2,
+                        help='number of tokens per frame')
+    parser.add_argument('--n_threads', type=int, default=1)
+    parser.add_argument('--n_repeats', type=int, default=3)
+    parser.add_argument('--device', type=str, default='cpu')
+    args = parser.parse_args()
+
+    torch.set_num_threads(args.n_threads)
+    torch.manual_seed(1)
+    bs, xmax = args.batch_size, args.max_len
+    eouts = torch.randn(bs, xmax, args.enc_dim, device=args.device)
+    elens = torch.randint(xmax // 2, xmax + 1, (bs,))
+    elens[0] = xmax
+    ylens = (elens.float() * args.token_rate).long()
+    ymax = int(ylens.max())
+    alpha = torch.rand(bs, xmax, device=args.device)
+    alpha = alpha.masked_fill(torch.arange(xmax).unsqueeze(0) >= elens.unsqueeze(1), 0)
+    alpha_norm = alpha / alpha.sum(1, keepdim=True) * ylens.float().unsqueeze(1)
+
+    print('B=%d, T=%d, enc_dim=%d, L=%d' % (bs, xmax, args.enc_dim, ymax))
+    print('loop (ms) | vectorized (ms)')
+    print('%9.1f | %15.1f' % (
+        measure(lambda: integrate_and_fire_loop(eouts, elens, alpha_norm, ylens, ymax, 1.0),
+                args.n_repeats, args.device) * 1000,
+        measure(lambda: integrate_and_fire(eouts, alpha_norm, 1.0, elens.to(args.device),
+                                           ylens.to(args.device), ymax),
+                args.n_repeats, args.device) * 1000))
+
+
+def measure(fn, n_repeats, device):
+    """Return the median elapsed time of `fn` in seconds."""
+    fn()  # warm up
+    elapsed = []
+    for _ in range(n_repeats):
+        if device != 'cpu':
+            torch.cuda.synchronize()
+        tic = time.time()
+        fn()
+        if device != 'cpu':
+            torch.cuda.synchronize()
+        elapsed.append(time.time() - tic)
+    return sorted(elapsed)[n_repeats // 2]
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,136 @@
+#! /usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""Benchmark word-level edit distance against the previous pure Python implementation."""
+
+import argparse
+import numpy as np
+import time
+
+from neural_sp.evaluators.edit_distance import compute_wer
+
+
+def compute_wer_legacy(ref, hyp, normalize=False):
+    """Compute Word Error Rate with the previous pure Python implementation.
+
+        [Reference]
+            https://martin-thoma.com/word-error-rate-calculation/
+    Args:
+        ref (list): words in the reference transcript
+        hyp (list): words in the predicted transcript
+        normalize (bool, optional): if True, divide by the length of ref
+    Returns:
+        wer (float): Word Error Rate between ref and hyp
+        n_sub (int): the number of substitution
+        n_ins (int): the number of insertion
+        n_del (int): the number of deletion
+
+    """
+    # Initialisation
+    d = np.zeros((len(ref) + 1) * (len(hyp) + 1), dtype=np.uint16)
+    d = d.reshape((len(ref) + 1, len(hyp) + 1))
+    for i in range(len(ref) + 1):
+        for j in range(len(hyp) + 1):
+            if i == 0:
+                d[0][j] = j
+            elif j == 0:
+                d[i][0] = i
+
+    # Computation
+    for i in range(1, len(ref) + 1):
+        for j in range(1, len(hyp) + 1):
+            if ref[i - 1] == hyp[j - 1]:
+                d[i][j] = d[i - 1][j - 1]
+            else:
+                sub_tmp = d[i - 1][j - 1] + 1
+                ins_tmp = d[i][j - 1] + 1
+                del_tmp = d[i - 1][j] + 1
+                d[i][j] = min(sub_tmp, ins_tmp, del_tmp)
+
+    wer = d[len(ref)][len(hyp)]
+
+    # Find out the manipulation steps
+    x = len(ref)
+    y = len(hyp)
+    error_list = []
+    while True:
+        if x == 0 and y == 0:
+            break
+        else:
+            if x > 0 and y > 0:
+                if d[x][y] == d[x - 1][y - 1] and ref[x - 1] == hyp[y - 1]:
+                    error_list.append("C")
+                    x = x - 1
+                    y = y - 1
+                elif d[x][y] == d[x][y - 1] + 1:
+                    error_list.append("I")
+                    y = y - 1
+                elif d[x][y] == d[x - 1][y - 1] + 1:
+                    error_list.append("S")
+                    x = x - 1
+                    y = y - 1
+                else:
+                    error_list.append("D")
+                    x = x - 1
+            elif x == 0 and y > 0:
+                if d[x][y] == d[x][y - 1] + 1:
+                    error_list.append("I")
+                    y = y - 1
+                else:
+                    error_list.append("D")
+                    x = x - 1
+            elif y == 0 and x > 0:
+                error_list.append("D")
+                x = x - 1
+            else:
+                raise ValueError
+
+    n_sub = error_list.count("S")
+    n_ins = error_list.count("I")
+    n_del = error_list.count("D")
+    n_cor = error_list.count("C")
+
+    assert wer == (n_sub + n_ins + n_del)
+    assert n_cor == (len(ref) - n_sub - n_del)
+
+    if normalize:
+        wer /= len(ref)
+
+    return wer * 100, n_sub * 100, n_ins * 100, n_del * 100
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--vocab', type=int, default=1000)
+    parser.add_argument('--error_rate', type=float, default=0.2)
+    parser.add_argument('--lengths', type=int, nargs='+', default=[10, 100, 1000, 3000])
+    args = parser.parse_args()
+
+    np.random.seed(1)
+    print('length | legacy (ms) | vectorized (ms) | identical')
+    for length in args.lengths:
+        ref = np.random.randint(0, args.vocab, length)
+        hyp = ref.copy()
+        n_errors = int(length * args.error_rate)
+        hyp[np.random.choice(length, n_errors, replace=False)] = np.random.randint(0, args.vocab, n_errors)
+        hyp = np.delete(hyp, np.random.choice(length, n_errors // 2, replace=False))
+        ref, hyp = [str(w) for w in ref], [str(w) for w in hyp]
+
+        tic = time.time()
+        with np.errstate(over='ignore'):
+            out_legacy = compute_wer_legacy(ref, hyp)
+        elapsed_legacy = time.time() - tic
+
+        tic = time.time()
+        out = compute_wer(ref, hyp)
+        elapsed = time.time() - tic
+
+        identical = str(tuple(int(v) for v in out) == tuple(int(v) for v in out_legacy))
+        if max(out) > np.iinfo(np.uint16).max:
+            # NOTE: the legacy implementation returns uint16 values multiplied by 100
+            identical += ' (legacy overflows uint16)'
+        print('%6d | %11.1f | %15.1f | %s' % (length, elapsed_legacy * 1000, elapsed * 1000, identical))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,114 @@
+#! /usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""Benchmark training and inference time of a latency-controlled BLSTM encoder."""
+
+import argparse
+import time
+import torch
+
+from neural_sp.models.seq2seq.encoders.rnn import RNNEncoder
+
+
+def make_args(input_dim, n_units, n_layers, N_c, N_r):
+    args = dict(
+        input_dim=input_dim,
+        enc_type='blstm',
+        n_units=n_units,
+        n_projs=0,
+        last_proj_dim=0,
+        n_layers=n_layers,
+        n_layers_sub1=0,
+        n_layers_sub2=0,
+        dropout_in=0.1,
+        dropout=0.1,
+        subsample='_'.join(['1'] * n_layers),
+        subsample_type='drop',
+        n_stacks=1,
+        n_splices=1,
+        frontend_conv=None,
+        bidir_sum_fwd_bwd=False,
+        task_specific_layer=False,
+        param_init=0.1,
+        chunk_size_current=str(N_c),
+        chunk_size_right=str(N_r),
+        cnn_lookahead=True,
+        rsp_prob=0,
+    )
+    return args
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--batch_sizes', type=str, default="1_4_8_16")
+    parser.add_argument('--input_dim', type=int, default=80)
+    parser.add_argument('--n_units', type=int, default=128)
+    parser.add_argument('--n_layers', type=int, default=4)
+    parser.add_argument('--max_len', type=int, default=800)
+    parser.add_argument('--chunk_size_current', type=int, default=40)
+    parser.add_argument('--chunk_size_right', type=int, default=40)
+    parser.add_argument('--n_threads', type=int, default=1)
+    parser.add_argument('--n_repeats', type=int, default=5)
+    parser.add_argument('--device', type=str, default='cpu')
+    args = parser.parse_args()
+
+    torch.set_num_threads(args.n_threads)
+    torch.manual_seed(1)
+    N_c, N_r = args.chunk_size_current, args.chunk_size_right
+    enc_lc = RNNEncoder(**make_args(args.input_dim, args.n_units, args.n_layers, N_c, N_r))
+    enc_lc = enc_lc.to(args.device)
+    enc_full = RNNEncoder(**make_args(args.input_dim, args.n_units, args.n_layers, 0, 0))
+    enc_full = enc_full.to(args.device)
+
+    print('%d-layer BLSTM, %d units, T=%d, N_c=%d, N_r=%d' % (
+        args.n_layers, args.n_units, args.max_len, N_c, N_r))
+    print('mode  |   B | LC loop (ms) | LC batched (ms) | LC encoder (ms) | BLSTM (ms)')
+    for mode in ['train', 'eval']:
+        for bs in map(int, args.batch_sizes.split('_')):
+            xs = torch.randn(bs, args.max_len, args.input_dim, device=args.device)
+            xlens = torch.IntTensor([args.max_len] * bs)
+
+            def step(enc, fn):
+                enc.train(mode == 'train')
+                enc.reset_cache()
+                if mode == 'train':
+                    enc.zero_grad()
+                    fn()[0].sum().backward()
+                else:
+                    with torch.no_grad():
+                        fn()
+
+            elapsed = measure_interleaved([
+                lambda: step(enc_lc, lambda: enc_lc._forward_latency_controlled_loop(xs, xlens, N_c, N_r, False)),
+                lambda: step(enc_lc, lambda: enc_lc._forward_latency_controlled_batched(xs, xlens, N_c, N_r, False)),
+                lambda: step(enc_lc, lambda: enc_lc._forward_latency_controlled(xs, xlens, N_c, N_r, False)),
+                lambda: step(enc_full, lambda: [enc_full(xs, xlens, task='all')['ys']['xs']])],
+                args.n_repeats, args.device)
+            print('%-5s | %3d | %12.1f | %15.1f | %15.1f | %10.1f' % (
+                (mode, bs) + tuple([t * 1000 for t in elapsed])))
+
+
+def measure_interleaved(fns, n_repeats, device):
+    """Return the median elapsed time of each function in seconds.
+
+    Functions are run in turn in every repetition, so that they are affected
+    equally by fluctuations of the machine load.
+
+    """
+    for fn in fns:
+        fn()  # warm up
+    elapsed = [[] for _ in fns]
+    for _ in range(n_repeats):
+        for i, fn in enumerate(fns):
+            if device != 'cpu':
+                torch.cuda.synchronize()
+            tic = time.time()
+            fn()
+            if device != 'cpu':
+                torch.cuda.synchronize()
+            elapsed[i].append(time.time() - tic)
+    return [sorted(e)[n_repeats // 2] for e in elapsed]
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,119 @@
+#! /usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""Benchmark greedy CTC evaluation with length-sorted mini-batches on a synthetic set."""
+
+import argparse
+import numpy as np
+import pandas as pd
+import time
+import torch
+
+from neural_sp.datasets.utils import (
+    length_sorted_bucketing,
+    sort_bucketing
+)
+from neural_sp.models.seq2seq.encoders.transformer import TransformerEncoder
+from neural_sp.models.torch_utils import (
+    np2tensor,
+    pad_list
+)
+
+
+def make_args(input_dim, d_model, n_layers):
+    args = dict(
+        input_dim=input_dim,
+        enc_type='transformer',
+        n_heads=4,
+        n_layers=n_layers,
+        n_layers_sub1=0,
+        n_layers_sub2=0,
+        d_model=d_model,
+        d_ff=d_model * 4,
+        ffn_bottleneck_dim=0,
+        ffn_activation='relu',
+        pe_type='add',
+        layer_norm_eps=1e-12,
+        last_proj_dim=0,
+        dropout_in=0.1,
+        dropout=0.1,
+        dropout_att=0.1,
+        dropout_layer=0.0,
+        subsample="1_1_1_1",
+        subsample_type='max_pool',
+        n_stacks=1,
+        n_splices=1,
+        frontend_conv=None,
+        task_specific_layer=False,
+        param_init='xavier_uniform',
+        clamp_len=-1,
+        lookahead="0",
+        chunk_size_left="0",
+        chunk_size_current="0",
+        chunk_size_right="0",
+        streaming_type='mask',
+    )
+    return args
+
+
+def decode(enc, output, feats, indices_buckets):
+    """Greedy CTC decoding. Return hypotheses in the original order, elapsed time, and padded frames."""
+    hyps = [None] * len(feats)
+    n_padded_frames = 0
+    tic = time.time()
+    for indices in indices_buckets:
+        xs = [feats[i] for i in indices]
+        xlens = torch.IntTensor([len(x) for x in xs])
+        xs = pad_list([np2tensor(x) for x in xs], 0.)
+        n_padded_frames += xs.size(0) * xs.size(1)
+        eouts = enc(xs, xlens, task='all')['ys']
+        best_paths = output(eouts['xs']).argmax(-1)
+        for b, i in enumerate(indices):
+            hyps[i] = torch.unique_consecutive(best_paths[b, :eouts['xlens'][b]]).tolist()
+    return hyps, time.time() - tic, n_padded_frames
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--n_utts', type=int, default=100)
+    parser.add_argument('--batch_size', type=int, default=8,
+                        help='number of utterances per mini-batch in the native order')
+    parser.add_argument('--input_dim', type=int, default=80)
+    parser.add_argument('--d_model', type=int, default=256)
+    parser.add_argument('--n_layers', type=int, default=6)
+    parser.add_argument('--vocab', type=int, default=500)
+    parser.add_argument('--n_threads', type=int, default=1)
+    args = parser.parse_args()
+
+    torch.set_num_threads(args.n_threads)
+    torch.manual_seed(1)
+    np.random.seed(1)
+
+    # log-normal length distribution like read speech (10ms frames)
+    xlens = np.clip(np.random.lognormal(np.log(500), 0.5, args.n_utts), 50, 2000).astype(np.int64)
+    feats = [np.random.randn(xlen, args.input_dim).astype(np.float32) for xlen in xlens]
+    df = pd.DataFrame({'xlen': xlens, 'ylen': np.ones_like(xlens)})
+
+    enc = TransformerEncoder(**make_args(args.input_dim, args.d_model, args.n_layers))
+    output = torch.nn.Linear(args.d_model, args.vocab)
+    enc.eval()
+
+    # the same number of frames per mini-batch on average
+    max_n_frames = int(args.batch_size * xlens.mean())
+    buckets_native = sort_bucketing(df, args.batch_size, 'seq', False)
+    buckets_sorted = length_sorted_bucketing(df, max_n_frames)
+
+    print('%d utterances, %d frames' % (args.n_utts, xlens.sum()))
+    print('order  | #batches | padded frames | elapsed (sec)')
+    with torch.no_grad():
+        hyps_native, elapsed, n_padded = decode(enc, output, feats, buckets_native)
+        print('native | %8d | %13d | %13.2f' % (len(buckets_native), n_padded, elapsed))
+        hyps_sorted, elapsed_sorted, n_padded = decode(enc, output, feats, buckets_sorted)
+        print('sorted | %8d | %13d | %13.2f' % (len(buckets_sorted), n_padded, elapsed_sorted))
+    print('speedup: %.2fx' % (elapsed / elapsed_sorted))
+    n_diff = sum([h1 != h2 for h1, h2 in zip(hyps_native, hyps_sorted)])
+    print('hypotheses differing in the original order: %d' % n_diff)
+
+
+if __name__ == '__main__':
+    main()
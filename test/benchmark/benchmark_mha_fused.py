@@ -0,0 +1,101 @@
+#! /usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""Benchmark multi-head self-attention with and without the fused kernel.
+
+The second table measures inference of a Transformer encoder, whose blocks use
+the fused kernel unless attention weights are captured for visualization.
+"""
+
+import argparse
+import time
+import torch
+
+from neural_sp.models.modules.multihead_attention import MultiheadAttentionMechanism
+from neural_sp.models.seq2seq.encoders.transformer import TransformerEncoder
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--batch_size', type=int, default=4)
+    parser.add_argument('--d_model', type=int, default=256)
+    parser.add_argument('--n_heads', type=int, default=4)
+    parser.add_argument('--max_len', type=int, default=1000)
+    parser.add_argument('--n_layers', type=int, default=6)
+    parser.add_argument('--n_threads', type=int, default=1)
+    parser.add_argument('--n_repeats', type=int, default=5)
+    parser.add_argument('--device', type=str, default='cpu')
+    args = parser.parse_args()
+
+    torch.set_num_threads(args.n_threads)
+    torch.manual_seed(1)
+    attention = MultiheadAttentionMechanism(kdim=args.d_model, qdim=args.d_model, adim=args.d_model,
+                                            odim=args.d_model, n_heads=args.n_heads, dropout=0.1)
+    attention = attention.to(args.device)
+
+    bs, xmax = args.batch_size, args.max_len
+    xs = torch.randn(bs, xmax, args.d_model, device=args.device)
+    xlens = torch.linspace(xmax // 2, xmax, bs).long().to(args.device)
+    xx_mask = (torch.arange(xmax, device=args.device).unsqueeze(0) < xlens.unsqueeze(1))
+    xx_mask = xx_mask.unsqueeze(1).repeat([1, xmax, 1]).byte()  # `[B, T (query), T (key)]`
+
+    def train_step(need_weights):
+        attention.train()
+        attention.zero_grad()
+        attention(xs, xs, xs, mask=xx_mask, need_weights=need_weights)[0].sum().backward()
+
+    def eval_step(need_weights):
+        attention.eval()
+        with torch.no_grad():
+            attention(xs, xs, xs, mask=xx_mask, need_weights=need_weights)
+
+    print('B=%d, T=%d, d_model=%d, H=%d' % (bs, xmax, args.d_model, args.n_heads))
+    print('need_weights | train step (ms) | inference (ms)')
+    for need_weights in [True, False]:
+        print('%12s | %15.1f | %14.1f' % (
+            need_weights,
+            measure(lambda: train_step(need_weights), args.n_repeats, args.device) * 1000,
+            measure(lambda: eval_step(need_weights), args.n_repeats, args.device) * 1000))
+
+    enc = TransformerEncoder(
+        input_dim=args.d_model, enc_type='transformer', n_heads=args.n_heads, n_layers=args.n_layers,
+        n_layers_sub1=0, n_layers_sub2=0, d_model=args.d_model, d_ff=args.d_model * 4,
+        ffn_bottleneck_dim=0, ffn_activation='relu', pe_type='add', layer_norm_eps=1e-12,
+        last_proj_dim=0, dropout_in=0.1, dropout=0.1, dropout_att=0.1, dropout_layer=0.,
+        subsample="1" + "_1" * (args.n_layers - 1), subsample_type='max_pool', n_stacks=1,
+        n_splices=1, frontend_conv=None, task_specific_layer=False, param_init='xavier_uniform',
+        clamp_len=-1, lookahead="0", chunk_size_left="0", chunk_size_current="0",
+        chunk_size_right="0", streaming_type='mask')
+    enc = enc.to(args.device)
+    enc.eval()
+
+    def encode(need_weights):
+        for layer in enc.layers:
+            layer.need_weights = need_weights
+        with torch.no_grad():
+            enc(xs, xlens.int(), task='all')
+
+    print('%d-layer Transformer encoder' % args.n_layers)
+    print('need_weights | inference (ms)')
+    for need_weights in [True, False]:
+        print('%12s | %14.1f' % (need_weights,
+                                 measure(lambda: encode(need_weights), args.n_repeats, args.device) * 1000))
+
+
+def measure(fn, n_repeats, device):
+    """Return the median elapsed time of `fn` in seconds."""
+    fn()  # warm up
+    elapsed = []
+    for _ in range(n_repeats):
+        if device != 'cpu':
+            torch.cuda.synchronize()
+        tic = time.time()
+        fn()
+        if device != 'cpu':
+            torch.cuda.synchronize()
+        elapsed.append(time.time() - tic)
+    return sorted(elapsed)[n_repeats // 2]
+
+
+if __name__ == '__main__':
+    main()
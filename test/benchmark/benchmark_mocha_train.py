@@ -0,0 +1,125 @@
+#! /usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""Benchmark time and activation memory of MoChA/MMA at training time."""
+
+import argparse
+import time
+import torch
+import torch.nn.functional as F
+
+from neural_sp.models.modules.mocha.hma_train import (
+    parallel_monotonic_attention,
+    safe_cumprod
+)
+from neural_sp.models.modules.mocha.mocha_train import soft_chunkwise_attention
+
+
+def parallel_monotonic_attention_loop(e_ma, aw_prev, eps):
+    """Previous implementation, which builds the autograd graph at every output step."""
+    p_choose = torch.sigmoid(e_ma)
+    cumprod_1mp_choose = safe_cumprod(1 - p_choose, eps=eps)
+    alpha = []
+    for i in range(e_ma.size(2)):
+        denom = torch.clamp(cumprod_1mp_choose[:, :, i:i + 1], min=eps, max=1.0)
+        aw_prev = p_choose[:, :, i:i + 1] * cumprod_1mp_choose[:, :, i:i + 1] * \
+            torch.cumsum(aw_prev / denom, dim=-1)
+        alpha.append(aw_prev)
+    return torch.cat(alpha, dim=2), p_choose
+
+
+def moving_sum_conv(x, back, forward):
+    """Previous implementation as a padded 1D convolution with ones."""
+    bs, n_heads_mono, n_heads_chunk, qlen, klen = x.size()
+    x_padded = F.pad(x.reshape(-1, klen), pad=[back, forward]).unsqueeze(1)
+    x_sum = F.conv1d(x_padded, x.new_ones(1, 1, back + forward + 1))
+    return x_sum.squeeze(1).view(bs, n_heads_mono, n_heads_chunk, qlen, -1)
+
+
+def soft_chunkwise_attention_conv(alpha, u, chunk_size, H_ca):
+    """Previous implementation, which repeats alpha over CA heads."""
+    bs, H_ma, qlen, klen = alpha.size()
+    alpha = alpha.unsqueeze(2).repeat([1, 1, H_ca, 1, 1])
+    u = u.view(bs, H_ma, H_ca, qlen, klen)
+    softmax_exp = torch.clamp(torch.exp(u - u.max(dim=-1, keepdim=True)[0]), min=1e-5)
+    if chunk_size == -1:
+        denom = torch.cumsum(softmax_exp, dim=-1)
+        beta = softmax_exp * moving_sum_conv(alpha / denom, 0, klen - 1)
+    else:
+        denom = moving_sum_conv(softmax_exp, chunk_size - 1, 0)
+        beta = softmax_exp * moving_sum_conv(alpha / denom, 0, chunk_size - 1)
+    return beta.view(bs, -1, qlen, klen)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--batch_size', type=int, default=8)
+    parser.add_argument('--n_heads_mono', type=int, default=4)
+    parser.add_argument('--n_heads_chunk', type=int, default=4)
+    parser.add_argument('--chunk_size', type=int, default=16)
+    parser.add_argument('--qlen', type=int, default=100)
+    parser.add_argument('--klen', type=int, default=500)
+    parser.add_argument('--n_threads', type=int, default=1)
+    parser.add_argument('--n_repeats', type=int, default=3)
+    parser.add_argument('--device', type=str, default='cpu')
+    args = parser.parse_args()
+
+    torch.set_num_threads(args.n_threads)
+    torch.manual_seed(1)
+    bs, H_ma, H_ca = args.batch_size, args.n_heads_mono, args.n_heads_chunk
+    qlen, klen = args.qlen, args.klen
+    e_ma = torch.randn(bs, H_ma, qlen, klen, device=args.device, requires_grad=True)
+    e_ca = torch.randn(bs, H_ma * H_ca, qlen, klen, device=args.device, requires_grad=True)
+    aw_prev = e_ma.new_zeros(bs, H_ma, 1, klen)
+    aw_prev[:, :, :, 0] = 1
+
+    def step_loop():
+        alpha = parallel_monotonic_attention_loop(e_ma, aw_prev, 1e-6)[0]
+        return soft_chunkwise_attention_conv(alpha, e_ca, args.chunk_size, H_ca)
+
+    def step():
+        alpha = parallel_monotonic_attention(e_ma, aw_prev, None, 1e-6, 0., False, False, 0, 0.)[0]
+        return soft_chunkwise_attention(alpha, e_ca.clone(), None, args.chunk_size, H_ca, 1.0, False)
+
+    print('B=%d, H_ma=%d, H_ca=%d, w=%d, qlen=%d, klen=%d' % (
+        bs, H_ma, H_ca, args.chunk_size, qlen, klen))
+    print('implementation | train step (ms) | saved activations (MB)')
+    for name, fn in [('previous', step_loop), ('current', step)]:
+        def train_step():
+            e_ma.grad, e_ca.grad = None, None
+            fn().sum().backward()
+        print('%14s | %15.1f | %22.1f' % (name, measure(train_step, args.n_repeats, args.device) * 1000,
+                                          saved_activations(fn) / 1024 ** 2))
+
+
+def saved_activations(fn):
+    """Return the total size of tensors saved for backward in bytes."""
+    storages = {}
+
+    def pack(x):
+        storages[x.untyped_storage().data_ptr()] = x.untyped_storage().nbytes()
+        return x
+
+    with torch.autograd.graph.saved_tensors_hooks(pack, lambda x: x):
+        out = fn()
+    del out
+    return sum(storages.values())
+
+
+def measure(fn, n_repeats, device):
+    """Return the median elapsed time of `fn` in seconds."""
+    fn()  # warm up
+    elapsed = []
+    for _ in range(n_repeats):
+        if device != 'cpu':
+            torch.cuda.synchronize()
+        tic = time.time()
+        fn()
+        if device != 'cpu':
+            torch.cuda.synchronize()
+        elapsed.append(time.time() - tic)
+    return sorted(elapsed)[n_repeats // 2]
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,86 @@
+#! /usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""Benchmark the relative-position shift in RelativeMultiheadAttentionMechanism."""
+
+import argparse
+import time
+import torch
+
+from neural_sp.models.modules.relative_multihead_attention import RelativeMultiheadAttentionMechanism
+
+
+def rel_shift_masked(xs, clamp_len=-1):
+    """Previous implementation, which builds indices with boolean masks in every call."""
+    bs, qlen, klen, n_heads = xs.size()
+    xs = xs.permute(0, 3, 2, 1)  # `[B, H, klen, qlen]`
+
+    idx = torch.arange(klen, device=xs.device)
+    k_idx, q_idx = idx.unsqueeze(0), idx.unsqueeze(1)
+    rel_pos_idx = torch.abs(k_idx - q_idx)
+    if klen != qlen:
+        rel_pos_idx = rel_pos_idx[:, :qlen]
+        mask = xs.new_ones(qlen, klen, dtype=torch.bool)
+        mask = torch.tril(mask, diagonal=0).transpose(1, 0)
+        rel_pos_idx[mask] *= -1
+        rel_pos_idx = klen - qlen - rel_pos_idx
+        rel_pos_idx[rel_pos_idx < 0] *= -1
+    if clamp_len > 0:
+        rel_pos_idx.clamp_(max=clamp_len)
+    x_shift = torch.gather(xs, dim=2, index=rel_pos_idx.expand_as(xs))
+    return x_shift.permute(0, 3, 2, 1)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--batch_size', type=int, default=8)
+    parser.add_argument('--n_heads', type=int, default=4)
+    parser.add_argument('--qlen', type=int, default=64)
+    parser.add_argument('--mlen', type=int, default=64)
+    parser.add_argument('--n_layers', type=int, default=12)
+    parser.add_argument('--n_threads', type=int, default=1)
+    parser.add_argument('--n_repeats', type=int, default=20)
+    parser.add_argument('--device', type=str, default='cpu')
+    args = parser.parse_args()
+
+    torch.set_num_threads(args.n_threads)
+    torch.manual_seed(1)
+    attention = RelativeMultiheadAttentionMechanism(kdim=256, qdim=256, adim=256, odim=256,
+                                                    n_heads=args.n_heads, dropout=0.)
+    xs = torch.randn(args.batch_size, args.qlen, args.mlen + args.qlen, args.n_heads,
+                     device=args.device)
+    assert torch.equal(attention._rel_shift(xs), rel_shift_masked(xs))
+
+    # one call per layer, as in a forward pass of the encoder
+    def step_masked():
+        for _ in range(args.n_layers):
+            rel_shift_masked(xs)
+
+    def step_cached():
+        for _ in range(args.n_layers):
+            attention._rel_shift(xs)
+
+    print('B=%d, H=%d, qlen=%d, mlen=%d, %d layers' % (
+        args.batch_size, args.n_heads, args.qlen, args.mlen, args.n_layers))
+    print('masked (ms) | cached (ms)')
+    print('%11.2f | %11.2f' % (measure(step_masked, args.n_repeats, args.device) * 1000,
+                               measure(step_cached, args.n_repeats, args.device) * 1000))
+
+
+def measure(fn, n_repeats, device):
+    """Return the median elapsed time of `fn` in seconds."""
+    fn()  # warm up
+    elapsed = []
+    for _ in range(n_repeats):
+        if device != 'cpu':
+            torch.cuda.synchronize()
+        tic = time.time()
+        fn()
+        if device != 'cpu':
+            torch.cuda.synchronize()
+        elapsed.append(time.time() - tic)
+    return sorted(elapsed)[n_repeats // 2]
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,102 @@
+#! /usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""Benchmark training and inference time of a BLSTM encoder with subsampling."""
+
+import argparse
+import time
+import torch
+
+from neural_sp.models.seq2seq.encoders.rnn import RNNEncoder
+from neural_sp.models.torch_utils import pad_list
+
+
+def make_args(input_dim, n_units, n_layers, subsample, subsample_type, n_projs):
+    args = dict(
+        input_dim=input_dim,
+        enc_type='blstm',
+        n_units=n_units,
+        n_projs=n_projs,
+        last_proj_dim=0,
+        n_layers=n_layers,
+        n_layers_sub1=0,
+        n_layers_sub2=0,
+        dropout_in=0.1,
+        dropout=0.1,
+        subsample=subsample,
+        subsample_type=subsample_type,
+        n_stacks=1,
+        n_splices=1,
+        frontend_conv=None,
+        bidir_sum_fwd_bwd=False,
+        task_specific_layer=False,
+        param_init=0.1,
+        chunk_size_current="0",
+        chunk_size_right="0",
+        cnn_lookahead=True,
+        rsp_prob=0,
+    )
+    return args
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--batch_size', type=int, default=8)
+    parser.add_argument('--input_dim', type=int, default=80)
+    parser.add_argument('--n_units', type=int, default=128)
+    parser.add_argument('--n_projs', type=int, default=0)
+    parser.add_argument('--n_layers', type=int, default=5)
+    parser.add_argument('--subsample', type=str, default="1_2_2_1_1")
+    parser.add_argument('--subsample_type', type=str, default='max_pool')
+    parser.add_argument('--min_len', type=int, default=100)
+    parser.add_argument('--max_len', type=int, default=400)
+    parser.add_argument('--n_threads', type=int, default=1)
+    parser.add_argument('--n_repeats', type=int, default=3)
+    parser.add_argument('--device', type=str, default='cpu')
+    args = parser.parse_args()
+
+    torch.set_num_threads(args.n_threads)
+    torch.manual_seed(1)
+    enc = RNNEncoder(**make_args(args.input_dim, args.n_units, args.n_layers,
+                                 args.subsample, args.subsample_type, args.n_projs))
+    enc = enc.to(args.device)
+
+    # utterances in random order of lengths
+    xlens = torch.randint(args.min_len, args.max_len + 1, (args.batch_size,)).int()
+    xs = pad_list([torch.randn(xlen, args.input_dim) for xlen in xlens.tolist()], 0.).to(args.device)
+
+    def train_step():
+        enc.train()
+        enc.zero_grad()
+        enc(xs, xlens, task='all')['ys']['xs'].sum().backward()
+
+    def eval_step():
+        enc.eval()
+        with torch.no_grad():
+            enc(xs, xlens, task='all')
+
+    print('%d-layer BLSTM, subsample: %s (%s), B=%d, T=[%d, %d]' % (
+        args.n_layers, args.subsample, args.subsample_type,
+        args.batch_size, args.min_len, args.max_len))
+    print('train step (ms) | inference (ms)')
+    print('%15.1f | %14.1f' % (measure(train_step, args.n_repeats, args.device) * 1000,
+                               measure(eval_step, args.n_repeats, args.device) * 1000))
+
+
+def measure(fn, n_repeats, device):
+    """Return the median elapsed time of `fn` in seconds."""
+    fn()  # warm up
+    elapsed = []
+    for _ in range(n_repeats):
+        if device != 'cpu':
+            torch.cuda.synchronize()
+        tic = time.time()
+        fn()
+        if device != 'cpu':
+            torch.cuda.synchronize()
+        elapsed.append(time.time() - tic)
+    return sorted(elapsed)[n_repeats // 2]
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,80 @@
+#! /usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""Benchmark per-token latency of incremental TransformerLM decoding."""
+
+import argparse
+import time
+import torch
+
+from neural_sp.models.lm.transformerlm import TransformerLM
+
+
+def make_args(vocab):
+    args = dict(
+        lm_type='transformer',
+        transformer_n_heads=8,
+        n_layers=12,
+        transformer_d_model=512,
+        transformer_d_ff=2048,
+        transformer_layer_norm_eps=1e-12,
+        transformer_ffn_activation='relu',
+        transformer_pe_type='add',
+        vocab=vocab,
+        dropout_in=0.1,
+        dropout_hidden=0.1,
+        dropout_att=0.1,
+        dropout_layer=0.0,
+        lsm_prob=0.0,
+        transformer_param_init='xavier_uniform',
+        mem_len=0,
+        recog_mem_len=0,
+        adaptive_softmax=False,
+        tie_embedding=False,
+    )
+    return argparse.Namespace(**args)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--batch_size', type=int, default=10)
+    parser.add_argument('--vocab', type=int, default=1000)
+    parser.add_argument('--max_len', type=int, default=512)
+    parser.add_argument('--n_threads', type=int, default=1)
+    parser.add_argument('--n_repeats', type=int, default=5)
+    args = parser.parse_args()
+
+    torch.set_num_threads(args.n_threads)
+    lm = TransformerLM(make_args(args.vocab))
+    lm.eval()
+    lm.cache_embedding('cpu')
+
+    ys = torch.randint(4, args.vocab, (args.batch_size, args.max_len))
+    checkpoints = [16, 64, 128, 256, 512, 1024, 2048]
+    checkpoints = [t for t in checkpoints if t <= args.max_len]
+
+    print('prefix | full recompute (ms/token) | incremental (ms/token)')
+    with torch.no_grad():
+        state = None
+        for t in range(args.max_len):
+            if t + 1 in checkpoints:
+                elapsed_full = measure(lambda: lm.decode(ys[:, :t + 1]), args.n_repeats)
+                # NOTE: rewriting the same position in the key/value buffers is harmless
+                elapsed_inc = measure(lambda: lm.decode(ys[:, t:t + 1], state, incremental=True),
+                                      args.n_repeats)
+                print('%6d | %25.2f | %22.2f' % (t + 1, elapsed_full * 1000, elapsed_inc * 1000))
+            _, _, state = lm.decode(ys[:, t:t + 1], state, incremental=True)
+
+
+def measure(fn, n_repeats):
+    """Return the median elapsed time of `fn` in seconds."""
+    elapsed = []
+    for _ in range(n_repeats):
+        tic = time.time()
+        fn()
+        elapsed.append(time.time() - tic)
+    return sorted(elapsed)[n_repeats // 2]
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,69 @@
+#! /usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""Test for checkpoint averaging."""
+
+import os
+import pytest
+import torch
+import torch.nn as nn
+
+from neural_sp.bin.eval_utils import (
+    average_checkpoints,
+    save_averaged_checkpoint
+)
+
+
+def make_model():
+    return nn.Sequential(nn.Linear(4, 8), nn.BatchNorm1d(8), nn.Linear(8, 2))
+
+
+def save_checkpoints(save_dir, n_epochs):
+    state_dicts = {}
+    for ep in range(1, n_epochs + 1):
+        model = make_model()
+        model(torch.randn(3, 4))  # update num_batches_tracked in BatchNorm
+        optimizer = torch.optim.Adam(model.parameters())
+        model(torch.randn(3, 4)).sum().backward()
+        optimizer.step()
+        torch.save({'model_state_dict': model.state_dict(),
+                    'optimizer_state_dict': optimizer.state_dict()},
+                   os.path.join(save_dir, 'model.epoch-%d' % ep))
+        state_dicts[ep] = model.state_dict()
+    return state_dicts
+
+
+@pytest.mark.parametrize("n_average", [2, 3, 10])
+def test_average_checkpoints(tmpdir, n_average):
+    save_dir = str(tmpdir)
+    state_dicts = save_checkpoints(save_dir, n_epochs=5)
+
+    model = make_model()
+    average_checkpoints(model, os.path.join(save_dir, 'model.epoch-4'), n_average)
+
+    epochs = [ep for ep in range(4, max(0, 4 - n_average), -1)]
+    for k, v in model.state_dict().items():
+        if v.is_floating_point():
+            v_ref = sum([state_dicts[ep][k] for ep in epochs]) / len(epochs)
+            assert torch.allclose(v, v_ref, atol=1e-6)
+        else:
+            assert torch.equal(v, state_dicts[4][k])
+
+    # the averaged checkpoint is reused
+    checkpoint_avg_path = os.path.join(save_dir, 'model-avg%d' % n_average)
+    mtime = os.path.getmtime(checkpoint_avg_path)
+    assert save_averaged_checkpoint(os.path.join(save_dir, 'model.epoch-4'), n_average) == checkpoint_avg_path
+    assert os.path.getmtime(checkpoint_avg_path) == mtime
+
+    # a different set of checkpoints is averaged again
+    model_avg = make_model()
+    average_checkpoints(model_avg, os.path.join(save_dir, 'model.epoch-5'), n_average)
+    epochs = [ep for ep in range(5, max(0, 5 - n_average), -1)]
+    k = '0.weight'
+    v_ref = sum([state_dicts[ep][k] for ep in epochs]) / len(epochs)
+    assert torch.allclose(model_avg.state_dict()[k], v_ref, atol=1e-6)
+
+    # load the averaged checkpoint directly
+    model_avg_direct = make_model()
+    average_checkpoints(model_avg_direct, checkpoint_avg_path, n_average)
+    assert torch.equal(model_avg_direct.state_dict()[k], model_avg.state_dict()[k])
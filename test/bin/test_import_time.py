@@ -0,0 +1,43 @@
+#! /usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""Test that entry points do not import slow optional modules at startup."""
+
+import os
+import pytest
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# imported on first use only
+SLOW_MODULES = ['matplotlib', 'seaborn', 'nltk', 'tensorboardX', 'wandb', 'pandas']
+
+
+def import_times(module):
+    """Return cumulative import time [us] of every module imported by `module`."""
+    env = dict(os.environ)
+    env['PYTHONPATH'] = ROOT + os.pathsep + env.get('PYTHONPATH', '')
+    out = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import ' + module],
+                         stderr=subprocess.PIPE, env=env, check=True,
+                         universal_newlines=True).stderr
+    times = {}
+    for line in out.split('\n'):
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        times[name.strip()] = int(cumulative)
+    return times
+
+
+@pytest.mark.parametrize("module", [
+    'neural_sp.bin.asr.eval',
+    'neural_sp.bin.asr.train',
+    'neural_sp.bin.lm.eval',
+    'neural_sp.bin.lm.train',
+])
+def test_import_time(module):
+    times = import_times(module)
+    assert module in times
+    for name in SLOW_MODULES:
+        assert name not in times, '%s imports %s at startup' % (module, name)
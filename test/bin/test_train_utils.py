@@ -0,0 +1,84 @@
+#! /usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""Test for inference checkpoints."""
+
+from omegaconf import OmegaConf
+import os
+import pytest
+import shutil
+import torch
+import torch.nn as nn
+
+from neural_sp.bin.eval_utils import (
+    average_checkpoints,
+    is_inference_checkpoint
+)
+from neural_sp.bin.train_utils import (
+    load_checkpoint,
+    load_model_config,
+    save_inference_checkpoint
+)
+
+
+def make_model():
+    return nn.Sequential(nn.Linear(4, 8), nn.BatchNorm1d(8), nn.Linear(8, 2))
+
+
+def save_experiment(save_dir):
+    dict_path = os.path.join(save_dir, 'dict.txt')
+    with open(dict_path, 'w') as f:
+        f.write('<unk> 1\na 2\nb 3\n')
+    OmegaConf.save(OmegaConf.create({'dict': dict_path, 'wp_model': False, 'unit': 'char'}),
+                   os.path.join(save_dir, 'conf.yml'))
+
+    model = make_model()
+    model(torch.randn(3, 4))  # update num_batches_tracked in BatchNorm
+    optimizer = torch.optim.Adam(model.parameters())
+    model(torch.randn(3, 4)).sum().backward()
+    optimizer.step()
+    checkpoint_path = os.path.join(save_dir, 'model.epoch-1')
+    torch.save({'model_state_dict': model.state_dict(),
+                'optimizer_state_dict': optimizer.state_dict()}, checkpoint_path)
+    return model, checkpoint_path
+
+
+@pytest.mark.parametrize("dtype", ['float16', 'bfloat16', 'float32'])
+def test_inference_checkpoint(tmpdir, dtype):
+    exp_dir = str(tmpdir.mkdir('exp'))
+    model, checkpoint_path = save_experiment(exp_dir)
+    assert not is_inference_checkpoint(checkpoint_path)
+
+    # export to a different directory
+    serve_dir = str(tmpdir.mkdir('serve'))
+    inference_path = os.path.join(serve_dir, 'model.inference')
+    save_inference_checkpoint(checkpoint_path, inference_path, dtype=dtype)
+    assert is_inference_checkpoint(inference_path)
+    assert os.listdir(serve_dir) == ['model.inference']
+
+    checkpoint = torch.load(inference_path)
+    assert 'optimizer_state_dict' not in checkpoint
+    for k, v in checkpoint['model_state_dict'].items():
+        if v.is_floating_point():
+            assert v.dtype == getattr(torch, dtype)
+        else:
+            assert v.dtype == torch.int64  # num_batches_tracked
+
+    # configuration and dictionary are restored without the experiment directory
+    shutil.rmtree(exp_dir)
+    config = load_model_config(inference_path)
+    assert config.unit == 'char'
+    assert config.dict == os.path.join(serve_dir, 'dict.txt')
+    with open(config.dict) as f:
+        assert f.read() == '<unk> 1\na 2\nb 3\n'
+
+    # parameters are cast back to the dtype of the model
+    atol = {'float16': 1e-3, 'bfloat16': 1e-2, 'float32': 0}[dtype]
+    model_new = make_model()
+    load_checkpoint(inference_path, model_new)
+    model_avg = make_model()
+    average_checkpoints(model_avg, inference_path, n_average=10)  # no averaging
+    for k, v in model.state_dict().items():
+        for m in [model_new, model_avg]:
+            assert m.state_dict()[k].dtype == v.dtype
+            assert torch.allclose(m.state_dict()[k], v, atol=atol, rtol=0)
@@ -0,0 +1,35 @@
+#! /usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""Test for bucketing utterances."""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from neural_sp.datasets.utils import length_sorted_bucketing
+
+
+@pytest.mark.parametrize("max_n_frames", [1, 500, 2000, 10000])
+def test_length_sorted_bucketing(max_n_frames):
+    np.random.seed(0)
+    xlens = np.random.randint(50, 1000, size=200)
+    xlens[10] = xlens[20]  # ties are kept in the original order
+    df = pd.DataFrame({'xlen': xlens})
+
+    indices_buckets = length_sorted_bucketing(df, max_n_frames)
+
+    # every utterance is included exactly once
+    indices = sum(indices_buckets, [])
+    assert sorted(indices) == list(range(len(df)))
+
+    # sorted by input length in the descending order (stable)
+    assert indices == list(np.argsort(-xlens, kind='mergesort'))
+
+    for indices in indices_buckets:
+        # the number of frames including padding fits the budget
+        if len(indices) > 1:
+            assert xlens[indices].max() * len(indices) <= max_n_frames
+        # the next utterance does not fit the budget any more
+        else:
+            assert xlens[indices[0]] * 2 > max_n_frames or indices == indices_buckets[-1]
@@ -0,0 +1,134 @@
+#! /usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""Test for beam search utilities."""
+
+import argparse
+import importlib
+import numpy as np
+import pytest
+import torch
+
+from neural_sp.models.seq2seq.decoders.beam_search import BeamSearch
+
+
+VOCAB = 10
+
+
+def make_lm(lm_type):
+    if lm_type == 'lstm':
+        args = dict(
+            n_units=16,
+            n_projs=0,
+            n_layers=2,
+            residual=False,
+            use_glu=False,
+            n_units_null_context=0,
+            emb_dim=16,
+            vocab=VOCAB,
+            dropout_in=0.1,
+            dropout_hidden=0.1,
+            lsm_prob=0.0,
+            param_init=0.1,
+            adaptive_softmax=False,
+            tie_embedding=False,
+        )
+        module = importlib.import_module('neural_sp.models.lm.rnnlm')
+        lm = module.RNNLM(argparse.Namespace(**args))
+    elif lm_type == 'transformer':
+        args = dict(
+            lm_type='transformer',
+            transformer_n_heads=4,
+            n_layers=2,
+            transformer_d_model=16,
+            transformer_d_ff=64,
+            transformer_layer_norm_eps=1e-12,
+            transformer_ffn_activation='relu',
+            transformer_pe_type='add',
+            vocab=VOCAB,
+            dropout_in=0.1,
+            dropout_hidden=0.1,
+            dropout_att=0.1,
+            dropout_layer=0.0,
+            lsm_prob=0.0,
+            transformer_param_init='xavier_uniform',
+            mem_len=0,
+            recog_mem_len=0,
+            adaptive_softmax=False,
+            tie_embedding=False,
+        )
+        module = importlib.import_module('neural_sp.models.lm.transformerlm')
+        lm = module.TransformerLM(argparse.Namespace(**args))
+    lm.eval()
+    return lm
+
+
+def score_reference(ys, lm, length_norm):
+    """Score a single sequence token by token."""
+    if len(ys) <= 1:
+        return 0.
+    ys = torch.from_numpy(np.array(ys, dtype=np.int64)).unsqueeze(0)
+    _, _, scores_lm = lm.predict(ys[:, :-1], None)
+    score_lm = sum([scores_lm[0, t, ys[0, t + 1]].item() for t in range(ys.size(1) - 1)])
+    if length_norm:
+        score_lm /= ys.size(1) - 1
+    return score_lm
+
+
+@pytest.mark.parametrize("lm_type", ['lstm', 'transformer'])
+@pytest.mark.parametrize("length_norm", [False, True])
+@pytest.mark.parametrize("reverse", [False, True])
+def test_lm_rescoring(lm_type, length_norm, reverse):
+    lm = make_lm(lm_type)
+
+    eos = 2
+    nbest_hyps = [
+        # shared prefix and duplicated hypotheses
+        [[eos, 4, 5, 6, eos], [eos, 4, 5, 7], [eos, 4, 5, 6, eos], [eos, 4]],
+        [[eos, 8, 9], [eos, 8, 9, 5, 5, 6, eos], [eos]],
+    ]
+    nbest_hyps = [[{'hyp': hyp, 'score': 0.} for hyp in hyps] for hyps in nbest_hyps]
+
+    with torch.no_grad():
+        nbest_hyps = BeamSearch.lm_rescoring_batch(nbest_hyps, lm, 0.5,
+                                                   reverse=reverse, length_norm=length_norm,
+                                                   tag='second')
+        for hyps in nbest_hyps:
+            for hyp in hyps:
+                ys = hyp['hyp'][::-1] if reverse else hyp['hyp']
+                score_ref = score_reference(ys, lm, length_norm)
+                assert np.allclose(hyp['score_lm_second'], score_ref, atol=1e-5)
+                assert np.allclose(hyp['score'], score_ref * 0.5, atol=1e-5)
+
+        # single utterance
+        hyps = [{'hyp': [eos, 4, 5, 6, eos], 'score': 0.}, {'hyp': [eos, 4, 5], 'score': 0.}]
+        hyps = BeamSearch.lm_rescoring(hyps, lm, 1.0, tag='second')
+        for hyp in hyps:
+            assert np.allclose(hyp['score_lm_second'], score_reference(hyp['hyp'], lm, False), atol=1e-5)
+
+
+@pytest.mark.parametrize("lm_type", ['lstm', 'transformer'])
+def test_score_sequences_shared_prefix(lm_type):
+    lm = make_lm(lm_type)
+
+    eos = 2
+    seqs = [(eos, 4, 5, 6, 7, eos), (eos, 4, 5, 6, 3), (eos, 4, 5, 6, 7, 8, 9, eos), (eos, 4, 5, 6)]
+
+    ylens = []
+    predict = lm.predict
+
+    def predict_hook(ys, *args, **kwargs):
+        ylens.append(ys.size())
+        return predict(ys, *args, **kwargs)
+
+    lm.predict = predict_hook
+    with torch.no_grad():
+        scores_lm = BeamSearch._score_sequences(seqs, lm)
+    # the shared prefix is encoded once, and then the rest of all sequences in batch
+    assert ylens == [(1, 3), (len(seqs), 4)]
+
+    # non-shared scoring
+    lm.predict = predict
+    with torch.no_grad():
+        for ys, score_lm in zip(seqs, scores_lm):
+            assert np.allclose(score_lm, score_reference(ys, lm, False), atol=1e-5)
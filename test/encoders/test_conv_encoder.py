@@ -157,3 +157,44 @@ def test_forward_1d(args):
         xs, xlens = enc(xs, xlens)
         assert xs.size(0) == bs
         assert xs.size(1) == xlens.max(), (xs.size(), xlens)
+
+
+@pytest.mark.parametrize(
+    "args, block_size",
+    [
+        (make_args_2d(), 1),
+        (make_args_2d(), 7),
+        (make_args_2d(poolings="(2,1)_(1,2)_(3,1)"), 5),
+        (make_args_2d(strides="(2,2)_(1,1)_(1,1)", poolings="(1,1)_(2,2)_(1,1)"), 3),
+        (make_args_2d(normalization='batch_norm'), 4),
+        (make_args_2d(normalization='layer_norm'), 4),
+        (make_args_2d(channels="1_1_1", residual=True), 4),
+        (make_args_2d(bottleneck_dim=8), 4),
+        (make_args_1d(), 1),
+        (make_args_1d(), 6),
+        (make_args_1d(poolings="3_1_2"), 5),
+        (make_args_1d(residual=False, strides="1_2_1"), 5),
+    ]
+)
+def test_forward_incremental(args, block_size):
+    bs = 2
+    xmaxs = [1, 10, 45]
+
+    module = importlib.import_module('neural_sp.models.seq2seq.encoders.conv')
+    enc = module.ConvEncoder(**args)
+    enc.eval()
+
+    for xmax in xmaxs:
+        xs = torch.randn(bs, xmax, args['input_dim'])
+        with torch.no_grad():
+            eouts_all, _ = enc(xs, torch.IntTensor([xmax] * bs))
+
+            cache = None
+            eouts = []
+            for t in range(0, xmax, block_size):
+                eout_block, cache = enc.forward_incremental(xs[:, t:t + block_size], cache,
+                                                            is_last=t + block_size >= xmax)
+                eouts.append(eout_block)
+            eouts = torch.cat(eouts, dim=1)
+        assert eouts.size() == eouts_all.size()
+        assert torch.allclose(eouts, eouts_all, atol=1e-5)
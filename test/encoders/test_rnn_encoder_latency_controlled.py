@@ -0,0 +1,167 @@
+#! /usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""Test for latency-controlled BLSTM encoder against chunk-by-chunk encoding."""
+
+import importlib
+import math
+import pytest
+import torch
+
+torch.manual_seed(0)
+
+
+def make_args(**kwargs):
+    args = dict(
+        input_dim=8,
+        enc_type='blstm',
+        n_units=16,
+        n_projs=0,
+        last_proj_dim=0,
+        n_layers=3,
+        n_layers_sub1=0,
+        n_layers_sub2=0,
+        dropout_in=0.1,
+        dropout=0.1,
+        subsample="1_1_1",
+        subsample_type='drop',
+        n_stacks=1,
+        n_splices=1,
+        frontend_conv=None,
+        bidir_sum_fwd_bwd=False,
+        task_specific_layer=False,
+        param_init=0.1,
+        chunk_size_current="8",
+        chunk_size_right="8",
+        cnn_lookahead=True,
+        rsp_prob=0,
+    )
+    args.update(kwargs)
+    return args
+
+
+def forward_latency_controlled_reference(enc, xs, xlens, N_c, N_r, streaming):
+    """Encode chunk by chunk, layer by layer (previous implementation)."""
+    bs, xmax, _ = xs.size()
+    n_chunks = math.ceil(xmax / N_c)
+    hx_fwd = [None] * enc.n_layers
+
+    if streaming:
+        xlens = torch.IntTensor(bs).fill_(min(xmax, N_c))
+    xlens_sub1 = xlens.clone() if enc.n_layers_sub1 > 0 else None
+
+    xs_chunks = []
+    xs_chunks_sub1 = []
+    for chunk_idx, t in enumerate(range(0, N_c * n_chunks, N_c)):
+        xs_chunk = xs[:, t:t + (N_c + N_r)]
+        _N_c = N_c
+
+        for lth in range(enc.n_layers):
+            # bwd
+            xs_chunk_bwd = torch.flip(enc.rnn_bwd[lth](
+                torch.flip(xs_chunk, dims=[1]))[0], dims=[1])
+            # fwd
+            if xs_chunk.size(1) <= _N_c:
+                # last chunk
+                xs_chunk_fwd, hx_fwd[lth] = enc.rnn[lth](xs_chunk, hx=hx_fwd[lth])
+            else:
+                xs_chunk_fwd1, hx_fwd[lth] = enc.rnn[lth](xs_chunk[:, :_N_c], hx=hx_fwd[lth])
+                xs_chunk_fwd2, _ = enc.rnn[lth](xs_chunk[:, _N_c:], hx=hx_fwd[lth])
+                xs_chunk_fwd = torch.cat([xs_chunk_fwd1, xs_chunk_fwd2], dim=1)
+            if enc.bidir_sum:
+                xs_chunk = xs_chunk_fwd + xs_chunk_bwd
+            else:
+                xs_chunk = torch.cat([xs_chunk_fwd, xs_chunk_bwd], dim=-1)
+            xs_chunk = enc.dropout(xs_chunk)
+
+            if lth == enc.n_layers_sub1 - 1:
+                xs_chunks_sub1.append(xs_chunk.clone()[:, :_N_c])
+                if chunk_idx == 0:
+                    xlens_sub1 = xlens.clone()
+
+            if enc.proj is not None and lth != enc.n_layers - 1:
+                xs_chunk = torch.relu(enc.proj[lth](xs_chunk))
+            if enc.subsample is not None:
+                xs_chunk, xlens_tmp = enc.subsample[lth](xs_chunk, xlens)
+                if chunk_idx == 0:
+                    xlens = xlens_tmp
+                _N_c = _N_c // enc.subsample[lth].factor
+
+        xs_chunks.append(xs_chunk[:, :_N_c])
+
+        if streaming:
+            break
+
+    xs = torch.cat(xs_chunks, dim=1)
+    if enc.n_layers_sub1 > 0:
+        xs_sub1 = torch.cat(xs_chunks_sub1, dim=1)
+        xs_sub1, xlens_sub1 = enc.sub_module(xs_sub1, xlens_sub1, 'sub1')
+    else:
+        xs_sub1 = None
+
+    return xs, xlens, xs_sub1, xlens_sub1, hx_fwd
+
+
+@pytest.mark.parametrize(
+    "args, xmax",
+    [
+        # all windows are full
+        ({}, 40),
+        # truncated windows at the end
+        ({}, 37),
+        ({}, 44),
+        # shorter than a single window
+        ({}, 12),
+        ({}, 5),
+        # N_r < N_c, N_r > N_c
+        ({'chunk_size_current': "8", 'chunk_size_right': "4"}, 43),
+        ({'chunk_size_current': "4", 'chunk_size_right': "8"}, 43),
+        # no right context
+        ({'chunk_size_current': "8", 'chunk_size_right': "0"}, 43),
+        # projection, sum of fwd and bwd
+        ({'n_projs': 8}, 43),
+        ({'bidir_sum_fwd_bwd': True}, 43),
+        # subsampling
+        ({'subsample': "1_2_1"}, 43),
+        ({'subsample': "2_2_1", 'subsample_type': 'max_pool'}, 46),
+        ({'subsample': "1_2_1", 'chunk_size_current': "8", 'chunk_size_right': "4"}, 43),
+        # sub task
+        ({'n_layers_sub1': 2}, 43),
+        ({'n_layers_sub1': 2, 'subsample': "2_1_1", 'task_specific_layer': True}, 43),
+        ({'n_layers_sub1': 1, 'subsample': "1_2_1", 'n_projs': 8}, 43),
+    ]
+)
+@pytest.mark.parametrize("bs", [3, 8])  # windows stacked along the batch dimension, chunk by chunk
+def test_forward_latency_controlled(args, xmax, bs):
+    args = make_args(**args)
+
+    module = importlib.import_module('neural_sp.models.seq2seq.encoders.rnn')
+    enc = module.RNNEncoder(**args)
+    enc.eval()
+
+    xs = torch.randn(bs, xmax, args['input_dim'])
+    xlens = torch.IntTensor([xmax - i for i in range(bs)])
+    N_c, N_r = enc.N_c, enc.N_r
+
+    with torch.no_grad():
+        for streaming in [False, True]:
+            xs_ref, xlens_ref, xs_sub1_ref, xlens_sub1_ref, hx_ref = \
+                forward_latency_controlled_reference(enc, xs, xlens, N_c, N_r, streaming)
+
+            enc.reset_cache()
+            xs_out, xlens_out, xs_sub1, xlens_sub1 = enc._forward_latency_controlled(
+                xs, xlens, N_c, N_r, streaming)
+
+            assert xs_out.size() == xs_ref.size()
+            assert torch.allclose(xs_out, xs_ref, atol=1e-6)
+            assert torch.equal(xlens_out, xlens_ref)
+            if enc.n_layers_sub1 > 0:
+                assert xs_sub1.size() == xs_sub1_ref.size()
+                assert torch.allclose(xs_sub1, xs_sub1_ref, atol=1e-6)
+                assert torch.equal(xlens_sub1, xlens_sub1_ref)
+            else:
+                assert xs_sub1 is None
+            # states carried over to the next block in streaming encoding
+            for lth in range(enc.n_layers):
+                for state, state_ref in zip(enc.hx_fwd[lth], hx_ref[lth]):
+                    assert torch.allclose(state, state_ref, atol=1e-6)
@@ -184,7 +184,6 @@ def test_forward(args, args_conv):
                 enc.eval()
                 with torch.no_grad():
                     enc_out_dict = enc(xs, xlens, task='all')
-                    # enc._plot_attention()  # too slow
 
             assert enc_out_dict['ys']['xs'].size(0) == bs
             assert enc_out_dict['ys']['xs'].size(1) == enc_out_dict['ys']['xlens'][0]
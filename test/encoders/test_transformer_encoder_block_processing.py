@@ -0,0 +1,195 @@
+#! /usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""Test for block processing with key/value caches in streaming Transformer/Conformer encoder."""
+
+import importlib
+import numpy as np
+import pytest
+import torch
+
+np.random.seed(0)
+torch.manual_seed(0)
+
+
+def make_args(**kwargs):
+    args = dict(
+        input_dim=80,
+        enc_type='uni_transformer',
+        n_heads=4,
+        n_layers=3,
+        n_layers_sub1=0,
+        n_layers_sub2=0,
+        d_model=8,
+        d_ff=16,
+        ffn_bottleneck_dim=0,
+        ffn_activation='relu',
+        pe_type='add',
+        layer_norm_eps=1e-12,
+        last_proj_dim=0,
+        dropout_in=0.1,
+        dropout=0.1,
+        dropout_att=0.1,
+        dropout_layer=0.1,
+        subsample="1_1_1",
+        subsample_type='max_pool',
+        n_stacks=1,
+        n_splices=1,
+        frontend_conv=None,
+        task_specific_layer=False,
+        param_init='xavier_uniform',
+        clamp_len=-1,
+        lookahead="0",
+        chunk_size_left="0",
+        chunk_size_current="0",
+        chunk_size_right="0",
+        streaming_type='mask',
+    )
+    if 'conformer' in kwargs['enc_type']:
+        args['kernel_size'] = 7
+        args['normalization'] = 'layer_norm'
+        args['ffn_activation'] = 'swish'
+        args['pe_type'] = 'relative'
+    args.update(kwargs)
+    return args
+
+
+def make_args_conv(**kwargs):
+    args = dict(
+        input_dim=80,
+        in_channel=1,
+        channels="32_32",
+        kernel_sizes="(3,3)_(3,3)",
+        strides="(1,1)_(1,1)",
+        poolings="(2,2)_(2,2)",
+        dropout=0.1,
+        normalization='',
+        residual=False,
+        bottleneck_dim=0,
+        param_init=0.1,
+    )
+    args.update(kwargs)
+    return args
+
+
+def build_encoder(args):
+    if 'conv' in args['enc_type']:
+        conv_module = importlib.import_module('neural_sp.models.seq2seq.encoders.conv')
+        args_conv = make_args_conv()
+        args_conv['bottleneck_dim'] = args['d_model']
+        args['frontend_conv'] = conv_module.ConvEncoder(**args_conv)
+    if 'conformer' in args['enc_type']:
+        module = importlib.import_module('neural_sp.models.seq2seq.encoders.conformer')
+        enc = module.ConformerEncoder(**args)
+    else:
+        module = importlib.import_module('neural_sp.models.seq2seq.encoders.transformer')
+        enc = module.TransformerEncoder(**args)
+    enc.eval()
+    return enc
+
+
+@pytest.mark.parametrize(
+    "args, block_size",
+    [
+        # unidirectional
+        ({'enc_type': 'uni_transformer'}, 1),
+        ({'enc_type': 'uni_transformer'}, 5),
+        ({'enc_type': 'uni_transformer', 'pe_type': 'relative_xl'}, 4),
+        ({'enc_type': 'uni_transformer', 'subsample': "2_1_1", 'subsample_type': 'drop'}, 4),
+        # blocks are not aligned with subsampling windows
+        ({'enc_type': 'uni_transformer', 'subsample': "2_1_1", 'subsample_type': 'drop'}, 5),
+        ({'enc_type': 'uni_transformer', 'subsample': "2_1_1", 'subsample_type': 'drop'}, 3),
+        ({'enc_type': 'uni_transformer', 'subsample': "2_2_1", 'subsample_type': 'max_pool'}, 7),
+        ({'enc_type': 'uni_conformer', 'subsample': "2_1_1", 'subsample_type': 'add'}, 1),
+        ({'enc_type': 'uni_conformer'}, 1),
+        ({'enc_type': 'uni_conformer'}, 4),
+        ({'enc_type': 'uni_conformer', 'pe_type': 'relative_xl'}, 4),
+        ({'enc_type': 'uni_conformer_v2', 'pe_type': 'add'}, 4),
+        # unidirectional with frontend CNN, whose outputs are delayed by lookahead
+        ({'enc_type': 'conv_uni_transformer'}, 1),
+        ({'enc_type': 'conv_uni_transformer'}, 5),
+        ({'enc_type': 'conv_uni_conformer'}, 7),
+        ({'enc_type': 'conv_uni_conformer', 'pe_type': 'relative_xl'}, 16),
+        # chunkwise (mask), where the ring buffers wrap around
+        ({'enc_type': 'transformer', 'chunk_size_left': "16", 'chunk_size_current': "8"}, 8),
+        ({'enc_type': 'conformer', 'chunk_size_left': "16", 'chunk_size_current': "8"}, 8),
+        ({'enc_type': 'conformer', 'chunk_size_left': "8", 'chunk_size_current': "8",
+          'pe_type': 'relative_xl'}, 8),
+        ({'enc_type': 'conformer_v2', 'chunk_size_left': "16", 'chunk_size_current': "8",
+          'pe_type': 'add'}, 8),
+        ({'enc_type': 'conformer', 'chunk_size_left': "16", 'chunk_size_current': "8",
+          'subsample': "2_1_1"}, 8),
+        ({'enc_type': 'conv_transformer', 'chunk_size_left': "16", 'chunk_size_current': "8"}, 8),
+        # blocks are not aligned with chunks
+        ({'enc_type': 'transformer', 'chunk_size_left': "16", 'chunk_size_current': "8"}, 4),
+        ({'enc_type': 'transformer', 'chunk_size_left': "16", 'chunk_size_current': "8"}, 5),
+        ({'enc_type': 'conformer', 'chunk_size_left': "16", 'chunk_size_current': "8",
+          'subsample': "2_1_1"}, 12),
+        ({'enc_type': 'conv_transformer', 'chunk_size_left': "16", 'chunk_size_current': "8"}, 3),
+        ({'enc_type': 'conv_conformer', 'chunk_size_left': "32", 'chunk_size_current': "16"}, 16),
+    ]
+)
+@pytest.mark.parametrize("xmax", [96, 93])
+def test_forward_block(args, block_size, xmax):
+    args = make_args(**args)
+    enc = build_encoder(args)
+
+    bs = 2
+    xs = torch.randn(bs, xmax, args['input_dim'])
+    with torch.no_grad():
+        eout_dict = enc(xs, torch.IntTensor([xmax] * bs), task='ys')
+        eouts_all = eout_dict['ys']['xs']
+
+        state = enc.init_block_state()
+        eouts = []
+        for t in range(0, xmax, block_size):
+            eout_block, state = enc.forward_block(xs[:, t:t + block_size], state,
+                                                  is_last=t + block_size >= xmax)
+            eouts.append(eout_block)
+        eouts = torch.cat(eouts, dim=1)
+    assert eouts.size() == eouts_all.size()
+    assert torch.allclose(eouts, eouts_all, atol=1e-5)
+
+    # memory is bounded by the left-context budget
+    for lth, cache in enumerate(state['layers']):
+        assert cache['kv']['len'] <= cache['kv']['max_len']
+        if enc.lc_bidir:
+            assert cache['kv']['key'].size(2) == cache['kv']['max_len']
+
+
+@pytest.mark.parametrize("enc_type", ['uni_transformer', 'uni_conformer'])
+def test_forward_block_budget(enc_type):
+    args = make_args(enc_type=enc_type)
+    enc = build_encoder(args)
+
+    n_left = 12
+    block_size = 5
+    xs = torch.randn(1, 200, args['input_dim'])
+    with torch.no_grad():
+        state = enc.init_block_state(n_left=n_left)
+        for t in range(0, 40, block_size):
+            _, state = enc.forward_block(xs[:, t:t + block_size], state)
+        buffers = [cache['kv']['key'] for cache in state['layers']]
+
+        # buffers are reused in place over arbitrarily long inputs
+        for t in range(40, 200, block_size):
+            eout_block, state = enc.forward_block(xs[:, t:t + block_size], state)
+            for lth, cache in enumerate(state['layers']):
+                assert cache['kv']['len'] == n_left
+                assert cache['kv']['key'] is buffers[lth]
+
+        # the last block only depends on the last `n_left` (+ `kernel_size - 1` for
+        # the convolution module) frames in the first layer
+        # NOTE: the receptive field grows with depth, so compare with a 1-layer encoder
+        enc.layers = enc.layers[:1]
+        state = enc.init_block_state(n_left=n_left)
+        eout_ref = None
+        for t in range(0, 200, block_size):
+            eout_ref, state = enc.forward_block(xs[:, t:t + block_size], state)
+        state = enc.init_block_state(n_left=n_left)
+        for t in range(200 - 6 * block_size, 200, block_size):  # >= n_left + kernel_size - 1 + block_size
+            eout_block, state = enc.forward_block(xs[:, t:t + block_size], state)
+    if 'conformer' not in enc_type:
+        # NOTE: positional encoding is absolute in Transformer
+        return
+    assert torch.allclose(eout_block, eout_ref, atol=1e-5)
@@ -0,0 +1,79 @@
+#! /usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""Test for edit distance."""
+
+import numpy as np
+import pytest
+
+from neural_sp.evaluators.edit_distance import compute_wer
+
+
+def compute_wer_reference(ref, hyp):
+    """Pure Python implementation of compute_wer (without normalization)."""
+    d = [[0] * (len(hyp) + 1) for _ in range(len(ref) + 1)]
+    for i in range(len(ref) + 1):
+        d[i][0] = i
+    for j in range(len(hyp) + 1):
+        d[0][j] = j
+    for i in range(1, len(ref) + 1):
+        for j in range(1, len(hyp) + 1):
+            if ref[i - 1] == hyp[j - 1]:
+                d[i][j] = d[i - 1][j - 1]
+            else:
+                d[i][j] = min(d[i - 1][j - 1], d[i][j - 1], d[i - 1][j]) + 1
+
+    x, y = len(ref), len(hyp)
+    error_list = []
+    while x > 0 or y > 0:
+        if x > 0 and y > 0 and d[x][y] == d[x - 1][y - 1] and ref[x - 1] == hyp[y - 1]:
+            error_list.append("C")
+            x, y = x - 1, y - 1
+        elif y > 0 and d[x][y] == d[x][y - 1] + 1:
+            error_list.append("I")
+            y = y - 1
+        elif x > 0 and y > 0 and d[x][y] == d[x - 1][y - 1] + 1:
+            error_list.append("S")
+            x, y = x - 1, y - 1
+        else:
+            error_list.append("D")
+            x = x - 1
+    return (d[len(ref)][len(hyp)] * 100, error_list.count("S") * 100,
+            error_list.count("I") * 100, error_list.count("D") * 100)
+
+
+@pytest.mark.parametrize(
+    "ref, hyp", [
+        ('', ''),
+        ('a b c', ''),
+        ('', 'a b c'),
+        ('a b c', 'a b c'),
+        ('a b c d', 'a x c d e'),
+        ('a a a b', 'b a a a'),
+        ('the cat sat on the mat', 'a cat sat the mat mat'),
+    ]
+)
+def test_compute_wer(ref, hyp):
+    ref, hyp = ref.split(), hyp.split()
+    assert compute_wer(ref, hyp) == compute_wer_reference(ref, hyp)
+
+
+@pytest.mark.parametrize("vocab", [2, 5, 100])
+def test_compute_wer_random(vocab):
+    np.random.seed(vocab)
+    for _ in range(50):
+        ref = [str(w) for w in np.random.randint(0, vocab, np.random.randint(0, 40))]
+        hyp = [str(w) for w in np.random.randint(0, vocab, np.random.randint(0, 40))]
+        assert compute_wer(ref, hyp) == compute_wer_reference(ref, hyp)
+        if len(ref) > 0:
+            assert np.allclose(compute_wer(ref, hyp, normalize=True)[0],
+                               compute_wer_reference(ref, hyp)[0] / len(ref))
+
+
+def test_compute_wer_long():
+    # longer than the range of uint16
+    ref = ['a'] * 70000
+    hyp = ['a', 'b'] * 5
+    wer, n_sub, n_ins, n_del = compute_wer(ref, hyp)
+    assert wer == 69995 * 100
+    assert (n_sub, n_ins, n_del) == (500, 0, 69990 * 100)
@@ -0,0 +1,70 @@
+#! /usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""Test for merging and scoring sharded trn files."""
+
+import codecs
+import os
+import pytest
+
+from neural_sp.evaluators.edit_distance import compute_wer
+from neural_sp.evaluators.trn import (
+    load_trn,
+    merge_trn,
+    score_trn
+)
+
+
+REFS = ['a b c', 'd e', 'f g h i', 'j', 'k l m', 'n o p q r', 'sx ty']
+HYPS = ['a b c', 'd', 'f x h i', 'j k', 'k l m', 'n p q r', 'sx tz']
+
+
+def write_trn(path, texts, utt_names):
+    with codecs.open(path, 'w', encoding='utf-8') as f:
+        for text, utt_name in zip(texts, utt_names):
+            f.write(text + ' (' + utt_name + ')\n')
+
+
+@pytest.mark.parametrize("n_shards", [1, 2, 3, 7, 10])
+def test_merge_trn(tmpdir, n_shards):
+    utt_names = ['spk_%d-utt%03d' % (i % 2, i) for i in range(len(REFS))]
+    shard_paths = []
+    for shard_id in range(n_shards):
+        path = os.path.join(str(tmpdir), 'ref%d.trn' % shard_id)
+        write_trn(path, REFS[shard_id::n_shards], utt_names[shard_id::n_shards])
+        shard_paths.append(path)
+
+    trn_path = os.path.join(str(tmpdir), 'ref.trn')
+    assert merge_trn(shard_paths, trn_path) == len(REFS)
+    assert load_trn(trn_path) == list(zip(utt_names, REFS))
+
+
+@pytest.mark.parametrize("unit", ['word', 'wp', 'char', 'char_nowb', 'phone'])
+@pytest.mark.parametrize("corpus", ['librispeech', 'csj'])
+def test_score_trn(tmpdir, unit, corpus):
+    utt_names = ['spk-utt%03d' % i for i in range(len(REFS))]
+    ref_trn_path = os.path.join(str(tmpdir), 'ref.trn')
+    hyp_trn_path = os.path.join(str(tmpdir), 'hyp.trn')
+    write_trn(ref_trn_path, REFS, utt_names)
+    write_trn(hyp_trn_path, HYPS, utt_names)
+
+    wer, cer = score_trn(ref_trn_path, hyp_trn_path, unit, corpus)
+
+    wer_ref = sum([compute_wer(ref=r.split(' '), hyp=h.split(' '))[0] for r, h in zip(REFS, HYPS)])
+    wer_ref /= sum([len(r.split(' ')) for r in REFS])
+    if 'nowb' in unit:
+        assert wer == 0
+    else:
+        assert abs(wer - wer_ref) < 1e-6
+
+    if unit == 'wp' or 'char' in unit:
+        if corpus == 'csj':
+            refs = [r.replace(' ', '') for r in REFS]
+            hyps = [h.replace(' ', '') for h in HYPS]
+        else:
+            refs, hyps = REFS, HYPS
+        cer_ref = sum([compute_wer(ref=list(r), hyp=list(h))[0] for r, h in zip(refs, hyps)])
+        cer_ref /= sum([len(r) for r in refs])
+        assert abs(cer - cer_ref) < 1e-6
+    else:
+        assert cer == 0
@@ -0,0 +1,101 @@
+#! /usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""Test for GatedConvLM."""
+
+import argparse
+import importlib
+import numpy as np
+import pytest
+import torch
+
+
+VOCAB = 100  # large for adaptive softmax
+
+
+def make_args(**kwargs):
+    args = dict(
+        lm_type='gated_conv_custom',
+        n_units=16,
+        n_projs=0,
+        n_layers=3,
+        kernel_size=4,
+        emb_dim=16,
+        vocab=VOCAB,
+        dropout_in=0.1,
+        dropout_hidden=0.1,
+        lsm_prob=0.0,
+        param_init=0.1,
+        adaptive_softmax=False,
+        tie_embedding=False,
+    )
+    args.update(kwargs)
+    return argparse.Namespace(**args)
+
+
+@pytest.mark.parametrize(
+    "args", [
+        ({'n_layers': 1}),
+        ({'n_layers': 3}),
+        ({'kernel_size': 1}),
+        ({'emb_dim': 8}),
+        ({'n_projs': 8}),
+        ({'lsm_prob': 0.1}),
+        ({'tie_embedding': True}),
+    ]
+)
+def test_forward(args):
+    args = make_args(**args)
+
+    ylens = [4, 5, 3, 7] * 200
+    ys = [np.random.randint(0, VOCAB, ylen).astype(np.int64) for ylen in ylens]
+    device = "cpu"
+
+    module = importlib.import_module('neural_sp.models.lm.gated_convlm')
+    lm = module.GatedConvLM(args)
+    lm = lm.to(device)
+    loss, state, observation = lm(ys, state=None, n_caches=0)
+    assert loss.item() >= 0
+    assert isinstance(observation, dict)
+
+
+@pytest.mark.parametrize(
+    "args", [
+        ({'n_layers': 1}),
+        ({'n_layers': 3}),
+        ({'kernel_size': 1}),
+        ({'kernel_size': 5}),
+        ({'emb_dim': 8}),
+        ({'n_projs': 8}),
+    ]
+)
+def test_decode_incremental(args):
+    args = make_args(**args)
+
+    batch_size = 4
+    ylen = 20
+    ys = torch.randint(4, VOCAB, (batch_size, ylen))
+
+    module = importlib.import_module('neural_sp.models.lm.gated_convlm')
+    lm = module.GatedConvLM(args)
+    lm.eval()
+
+    with torch.no_grad():
+        logits, _, _ = lm.decode(ys)
+
+        # token by token
+        state = None
+        logits_inc = []
+        for t in range(ylen):
+            logits_t, _, state = lm.decode(ys[:, t:t + 1], state, incremental=True)
+            logits_inc.append(logits_t)
+        assert torch.allclose(logits, torch.cat(logits_inc, dim=1), atol=1e-5)
+
+        # prefix at once, then token by token
+        n_prefix = ylen // 2
+        logits_prefix, _, state = lm.decode(ys[:, :n_prefix], None, incremental=True)
+        logits_inc = [logits_prefix]
+        for t in range(n_prefix, ylen):
+            logits_t, _, state = lm.decode(ys[:, t:t + 1], state, incremental=True)
+            logits_inc.append(logits_t)
+        assert torch.allclose(logits, torch.cat(logits_inc, dim=1), atol=1e-5)
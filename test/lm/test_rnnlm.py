@@ -7,6 +7,7 @@ import argparse
 import importlib
 import numpy as np
 import pytest
+import torch
 
 
 VOCAB = 100  # large for adaptive softmax
@@ -69,3 +70,39 @@ def test_forward(args):
     # assert loss.size(0) == 1
     assert loss.item() >= 0
     assert isinstance(observation, dict)
+
+
+@pytest.mark.parametrize("n_caches", [1, 5, 20])
+def test_forward_cache(n_caches):
+    args = make_args()
+
+    ylen = 30
+    ys = np.random.randint(4, VOCAB, ylen).astype(np.int64)
+
+    module = importlib.import_module('neural_sp.models.lm.rnnlm')
+    lm = module.RNNLM(args)
+    lm.eval()
+
+    # reference implementation with an unbounded list of caches
+    cache_ids, cache_keys = [], []
+    state, state_ref = None, None
+    for t in range(ylen - 1):
+        loss, state, _ = lm([ys[t:t + 2]], state, is_eval=True, n_caches=n_caches)
+
+        with torch.no_grad():
+            ys_in = torch.from_numpy(ys[t:t + 1]).unsqueeze(0)
+            logits, out, state_ref = lm.decode(ys_in, state_ref)
+            probs = torch.softmax(logits, dim=-1)[0, 0]
+            if len(cache_ids) > 0:
+                keys = torch.cat(cache_keys[-n_caches:], dim=0)
+                attn = torch.softmax(lm.cache_theta * torch.matmul(keys, out[0, -1]), dim=0)
+                cache_probs = torch.zeros_like(probs)
+                for offset, idx in enumerate(cache_ids[-n_caches:]):
+                    cache_probs[idx] += attn[offset]
+                probs = (1 - lm.cache_lambda) * probs + lm.cache_lambda * cache_probs
+            loss_ref = -torch.log(probs[ys[t + 1]])
+            cache_ids.append(int(ys[t + 1]))
+            cache_keys.append(out[:, -1])
+
+        assert np.allclose(loss.item(), loss_ref.item(), atol=1e-5)
+        assert lm.cache_history() == cache_ids[-n_caches:]
@@ -7,6 +7,7 @@ import argparse
 import importlib
 import numpy as np
 import pytest
+import torch
 
 
 VOCAB = 100  # large for adaptive softmax
@@ -80,3 +81,50 @@ def test_forward(args):
     # assert loss.size(0) == 1
     assert loss.item() >= 0
     assert isinstance(observation, dict)
+
+
+def to_chronological(lm, mems):
+    """Reorder ring buffers of memory from the oldest to the newest."""
+    mlen = mems['mlen']
+    order = (torch.arange(mlen) + mems['offset']) % mlen if mlen == lm.mem_len else torch.arange(mlen)
+    return {'mems': [m.index_select(1, order) for m in mems['mems']], 'offset': mlen, 'mlen': mlen}
+
+
+@pytest.mark.parametrize("mem_len", [1, 7, 20])
+def test_update_memory(mem_len):
+    args = make_args(mem_len=mem_len, recog_mem_len=0)
+
+    module = importlib.import_module('neural_sp.models.lm.transformer_xl')
+    lm = module.TransformerXL(args)
+
+    batch_size, d_model = 3, args.transformer_d_model
+    mems = None
+    mems_ref = [torch.empty(batch_size, 0, d_model) for _ in range(lm.n_layers)]
+    for qlen in [3, 5, 1, 11, 2, 30, 4]:
+        hidden_states = [torch.randn(batch_size, qlen, d_model) for _ in range(lm.n_layers)]
+        mems = lm.update_memory(mems, hidden_states)
+
+        # reference: concatenate and slice
+        mems_ref = [torch.cat([m, h], dim=1)[:, -mem_len:] for m, h in zip(mems_ref, hidden_states)]
+        assert mems['mlen'] == mems_ref[0].size(1)
+        for m, m_ref in zip(to_chronological(lm, mems)['mems'], mems_ref):
+            assert torch.equal(m, m_ref)
+
+
+@pytest.mark.parametrize("mem_len", [5, 8])
+def test_decode_memory_ring_offset(mem_len):
+    args = make_args(mem_len=mem_len, recog_mem_len=0)
+
+    module = importlib.import_module('neural_sp.models.lm.transformer_xl')
+    lm = module.TransformerXL(args)
+    lm.eval()
+
+    batch_size = 2
+    mems = None
+    with torch.no_grad():
+        for qlen in [3, 4, 6, 2, 5]:
+            ys = torch.randint(4, VOCAB, (batch_size, qlen))
+            mems_chrono = None if mems is None else to_chronological(lm, mems)
+            logits_ref, _, _ = lm.decode(ys, mems=mems_chrono)
+            logits, _, mems = lm.decode(ys, mems=mems)
+            assert torch.allclose(logits, logits_ref, atol=1e-5)
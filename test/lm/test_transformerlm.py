@@ -7,6 +7,7 @@ import argparse
 import importlib
 import numpy as np
 import pytest
+import torch
 
 
 VOCAB = 100  # large for adaptive softmax
@@ -79,3 +80,75 @@ def test_forward(args):
     # assert loss.size(0) == 1
     assert loss.item() >= 0
     assert isinstance(observation, dict)
+
+
+@pytest.mark.parametrize(
+    "args", [
+        ({'transformer_n_heads': 1}),
+        ({'transformer_n_heads': 4}),
+        ({'transformer_pe_type': 'none'}),
+        ({'tie_embedding': True}),
+    ]
+)
+def test_decode_incremental(args):
+    args = make_args(**args)
+
+    batch_size = 4
+    ylen = 70  # exceed the initial capacity of key/value buffers
+    ys = torch.randint(4, VOCAB, (batch_size, ylen))
+
+    module = importlib.import_module('neural_sp.models.lm.transformerlm')
+    lm = module.TransformerLM(args)
+    lm.eval()
+
+    with torch.no_grad():
+        logits, _, _ = lm.decode(ys)
+
+        # token by token
+        state = None
+        logits_inc = []
+        for t in range(ylen):
+            logits_t, _, state = lm.decode(ys[:, t:t + 1], state, incremental=True)
+            logits_inc.append(logits_t)
+        logits_inc = torch.cat(logits_inc, dim=1)
+        assert state[0]['len'] == ylen
+        assert torch.allclose(logits, logits_inc, atol=1e-5)
+
+        # prefix at once, then token by token
+        n_prefix = ylen // 2
+        logits_prefix, _, state = lm.decode(ys[:, :n_prefix], None, incremental=True)
+        logits_inc = [logits_prefix]
+        for t in range(n_prefix, ylen):
+            logits_t, _, state = lm.decode(ys[:, t:t + 1], state, incremental=True)
+            logits_inc.append(logits_t)
+        logits_inc = torch.cat(logits_inc, dim=1)
+        assert torch.allclose(logits, logits_inc, atol=1e-5)
+
+
+def test_predict_1dconv():
+    args = make_args(transformer_pe_type='1dconv3L')
+
+    batch_size = 4
+    ylen = 10
+    ys = torch.randint(4, VOCAB, (batch_size, ylen))
+
+    module = importlib.import_module('neural_sp.models.lm.transformerlm')
+    lm = module.TransformerLM(args)
+    lm.eval()
+
+    with torch.no_grad():
+        logits, _, _ = lm.decode(ys)
+        log_probs_ref = torch.log_softmax(logits, dim=-1)
+
+        # all tokens at once
+        _, _, log_probs = lm.predict(ys, None)
+        assert log_probs.size() == (batch_size, ylen, VOCAB)
+        assert torch.allclose(log_probs, log_probs_ref, atol=1e-5)
+
+        # token by token, where all positions are recomputed at each step
+        state = None
+        log_probs = []
+        for t in range(ylen):
+            _, state, log_probs_t = lm.predict(ys[:, t:t + 1], state)
+            log_probs.append(log_probs_t)
+        assert torch.allclose(torch.cat(log_probs, dim=1), log_probs_ref, atol=1e-5)
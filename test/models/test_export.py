@@ -0,0 +1,120 @@
+#! /usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""Test for exporting encoders and greedy decoders to TorchScript."""
+
+import numpy as np
+import os
+import pytest
+import torch
+
+from neural_sp.bin.args_asr import (
+    build_parser,
+    register_args_decoder,
+    register_args_encoder
+)
+from neural_sp.models.seq2seq.export import (
+    export_ctc_greedy,
+    export_encoder,
+    export_transformer_greedy
+)
+from neural_sp.models.seq2seq.speech2text import Speech2Text
+from neural_sp.models.torch_utils import pad_list
+
+np.random.seed(0)
+torch.manual_seed(0)
+
+INPUT_DIM = 8
+CONV_ARGS = ['--conv_channels', '4_4', '--conv_kernel_sizes', '(3,3)_(3,3)',
+             '--conv_strides', '(1,1)_(1,1)', '--conv_poolings', '(2,2)_(2,2)']
+
+
+def make_model(enc_type, extra_args=[]):
+    input_args = ['--corpus', 'test', '--dict', 'dict.txt',
+                  '--enc_type', enc_type, '--dec_type', 'transformer'] + extra_args
+    parser = build_parser()
+    args = parser.parse_known_args(input_args)[0]
+    parser = register_args_encoder(parser, args, enc_type)
+    args = parser.parse_known_args(input_args)[0]  # to avoid args conflict
+    parser = register_args_decoder(parser, args, 'transformer')
+    args = parser.parse_args(input_args)
+    args.input_dim = INPUT_DIM
+    args.vocab = 10
+    args.vocab_sub1 = -1
+    args.vocab_sub2 = -1
+    args.enc_n_layers = 2
+    args.dec_n_layers = 2
+    args.transformer_enc_d_model = 16
+    args.transformer_dec_d_model = 16
+    args.transformer_enc_d_ff = 32
+    args.transformer_dec_d_ff = 32
+    args.transformer_enc_n_heads = 2
+    args.transformer_dec_n_heads = 2
+    args.ctc_weight = 0.3
+    args.dec_config_sub1 = {}
+
+    model = Speech2Text(args)
+    model.eval()
+    params = {k: v for k, v in vars(args).items() if 'recog' in k}
+    params['recog_beam_width'] = 1
+    return model, params
+
+
+def make_inputs(xlens):
+    return [np.random.randn(xlen, INPUT_DIM).astype(np.float32) for xlen in xlens]
+
+
+@pytest.mark.parametrize(
+    "enc_type, extra_args",
+    [
+        ('transformer', []),
+        ('transformer', ['--transformer_enc_pe_type', 'relative']),
+        ('transformer', ['--subsample', '2_1', '--subsample_type', 'max_pool']),
+        ('conv_transformer', CONV_ARGS),
+        ('conformer', []),
+        ('conv_conformer', CONV_ARGS),
+    ]
+)
+def test_export(tmpdir, enc_type, extra_args):
+    model, params = make_model(enc_type, extra_args)
+
+    # export with an example mini-batch, and serialize
+    xs = make_inputs([40, 32])
+    xs_pad = pad_list([torch.from_numpy(x) for x in xs], 0.)
+    encoder = export_encoder(model, xs_pad, torch.IntTensor([40, 32]))
+    with torch.no_grad():
+        eouts, _ = encoder(xs_pad, torch.IntTensor([40, 32]))
+    ctc_greedy = export_ctc_greedy(model)
+    att_greedy = export_transformer_greedy(model, eouts, params['recog_max_len_ratio'])
+    for name, module in [('encoder', encoder), ('ctc', ctc_greedy), ('att', att_greedy)]:
+        path = os.path.join(str(tmpdir), name + '.pt')
+        torch.jit.save(module, path)
+    encoder = torch.jit.load(os.path.join(str(tmpdir), 'encoder.pt'))
+    ctc_greedy = torch.jit.load(os.path.join(str(tmpdir), 'ctc.pt'))
+    att_greedy = torch.jit.load(os.path.join(str(tmpdir), 'att.pt'))
+
+    # exported modules generalize to different lengths and batch sizes
+    for xlens in [[40, 32], [57, 23], [25, 25, 18], [33]]:
+        xs = make_inputs(xlens)
+        xs_pad = pad_list([torch.from_numpy(x) for x in xs], 0.)
+        with torch.no_grad():
+            eout_dict = model.encode(xs)
+            eouts_ref, elens_ref = eout_dict['ys']['xs'], eout_dict['ys']['xlens']
+            eouts, elens = encoder(xs_pad, torch.IntTensor(xlens))
+        assert torch.allclose(eouts, eouts_ref, atol=1e-5)
+        assert elens.tolist() == elens_ref.tolist()
+
+        # CTC greedy decoding
+        params['recog_ctc_weight'] = 1.0
+        hyps_ref = model.decode(xs, params, None)[0]
+        with torch.no_grad():
+            hyps, hyp_lens = ctc_greedy(eouts, elens)
+        assert [hyps[b, :hyp_lens[b]].tolist() for b in range(len(xs))] == [h[0] for h in hyps_ref]
+        assert (hyps[hyps >= 0] != model.blank).all()
+
+        # attention-based greedy decoding
+        params['recog_ctc_weight'] = 0.0
+        hyps_ref = model.decode(xs, params, None)[0]
+        with torch.no_grad():
+            hyps, ylens = att_greedy(eouts)
+        assert [hyps[b, :ylens[b]].tolist() for b in range(len(xs))] == [list(h[0]) for h in hyps_ref]
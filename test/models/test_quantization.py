@@ -0,0 +1,100 @@
+#! /usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""Test for dynamic int8 quantization of Speech2Text."""
+
+import copy
+import numpy as np
+from omegaconf import OmegaConf
+import os
+import pytest
+import torch
+
+from neural_sp.bin.args_asr import (
+    build_parser,
+    register_args_decoder,
+    register_args_encoder
+)
+from neural_sp.bin.train_utils import (
+    load_checkpoint,
+    save_inference_checkpoint
+)
+from neural_sp.models.seq2seq.speech2text import Speech2Text
+from neural_sp.models.torch_utils import quantize_model
+
+np.random.seed(0)
+torch.manual_seed(0)
+
+INPUT_DIM = 8
+
+
+def make_args(enc_type):
+    input_args = ['--corpus', 'test', '--dict', 'dict.txt',
+                  '--enc_type', enc_type, '--dec_type', 'lstm']
+    parser = build_parser()
+    args = parser.parse_known_args(input_args)[0]
+    parser = register_args_encoder(parser, args, enc_type)
+    parser = register_args_decoder(parser, args, 'lstm')
+    args = parser.parse_args(input_args)
+    args.input_dim = INPUT_DIM
+    args.vocab = 10
+    args.vocab_sub1 = -1
+    args.vocab_sub2 = -1
+    args.enc_n_units = 16
+    args.enc_n_layers = 2
+    args.dec_n_units = 16
+    args.emb_dim = 16
+    args.attn_dim = 16
+    args.ctc_weight = 0.3
+    args.dec_config_sub1 = {}
+    return args
+
+
+def count_modules(model, module_types):
+    return sum([isinstance(m, module_types) for m in model.modules()])
+
+
+@pytest.mark.parametrize("enc_type", ['blstm', 'lstm', 'transformer'])
+def test_quantize_model(tmpdir, enc_type):
+    args = make_args(enc_type)
+    model = Speech2Text(args)
+    model.eval()
+    params = {k: v for k, v in vars(args).items() if 'recog' in k}
+    params['recog_beam_width'] = 2
+    xs = [np.random.randn(xlen, INPUT_DIM).astype(np.float32) for xlen in [40, 32]]
+
+    model_q = quantize_model(copy.deepcopy(model))
+    assert count_modules(model_q, (torch.nn.Linear, torch.nn.LSTM, torch.nn.LSTMCell)) == 0
+
+    # encoder outputs are close to those of the float32 model
+    with torch.no_grad():
+        eouts = model.encode(xs)['ys']['xs']
+        eouts_q = model_q.encode(xs)['ys']['xs']
+    assert torch.allclose(eouts, eouts_q, atol=0.1 * eouts.abs().max().item())
+
+    # attention-based and joint CTC-attention beam search
+    for ctc_weight in [0.0, 0.3]:
+        params['recog_ctc_weight'] = ctc_weight
+        hyps = model_q.decode(xs, params, None, utt_ids=['utt1', 'utt2'])[0]
+        assert len(hyps) == len(xs)
+
+    # export float16 weights, which are quantized when loaded
+    save_dir = str(tmpdir)
+    checkpoint_path = os.path.join(save_dir, 'model.epoch-1')
+    torch.save({'model_state_dict': model.state_dict()}, checkpoint_path)
+    OmegaConf.save(OmegaConf.create(vars(args)), os.path.join(save_dir, 'conf.yml'))
+    inference_path = os.path.join(save_dir, 'model.inference')
+    save_inference_checkpoint(checkpoint_path, inference_path, dtype='float16', quantize=True)
+
+    # float weights are kept unless the model runs on CPU
+    model_new = Speech2Text(args)
+    load_checkpoint(inference_path, model_new)
+    assert count_modules(model_new, (torch.nn.Linear, torch.nn.LSTM, torch.nn.LSTMCell)) > 0
+
+    model_new = Speech2Text(args)
+    model_new.eval()
+    load_checkpoint(inference_path, model_new, quantize=True)
+    assert count_modules(model_new, (torch.nn.Linear, torch.nn.LSTM, torch.nn.LSTMCell)) == 0
+    with torch.no_grad():
+        eouts_new = model_new.encode(xs)['ys']['xs']
+    assert torch.allclose(eouts_new, eouts_q, atol=0.1 * eouts.abs().max().item())
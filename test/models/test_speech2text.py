@@ -0,0 +1,156 @@
+#! /usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""Test for Speech2Text."""
+
+import numpy as np
+import pytest
+import torch
+
+from neural_sp.bin.args_asr import (
+    build_parser,
+    register_args_decoder,
+    register_args_encoder
+)
+from neural_sp.models.seq2seq.speech2text import Speech2Text
+
+np.random.seed(0)
+torch.manual_seed(0)
+
+INPUT_DIM = 8
+
+
+def make_model(enc_type, **enc_args):
+    input_args = ['--corpus', 'test', '--dict', 'dict.txt',
+                  '--enc_type', enc_type, '--dec_type', 'lstm']
+    parser = build_parser()
+    args = parser.parse_known_args(input_args)[0]
+    parser = register_args_encoder(parser, args, enc_type)
+    parser = register_args_decoder(parser, args, 'lstm')
+    args = parser.parse_args(input_args)
+    args.input_dim = INPUT_DIM
+    args.vocab = 10
+    args.vocab_sub1 = 12
+    args.vocab_sub2 = -1
+    args.enc_n_units = 16
+    args.enc_n_layers = 2
+    args.enc_n_layers_sub1 = 1
+    args.dec_n_units = 16
+    args.emb_dim = 16
+    args.attn_dim = 16
+    args.ctc_weight = 0.3
+    args.sub1_weight = 0.5
+    args.ctc_weight_sub1 = 0.5
+    args.dec_config_sub1 = {}
+    for k, v in enc_args.items():
+        setattr(args, k, v)
+
+    model = Speech2Text(args)
+    params = {k: v for k, v in vars(args).items() if 'recog' in k}
+    params['recog_ctc_weight'] = 1.0  # CTC greedy decoding
+    return model, params
+
+
+@pytest.mark.parametrize("enc_type", ['blstm', 'transformer'])
+def test_decode_encoder_cache(enc_type):
+    model, params = make_model(enc_type)
+
+    n_calls = []
+    model.enc.register_forward_hook(lambda *args: n_calls.append(1))
+
+    xs = [np.random.randn(xlen, INPUT_DIM).astype(np.float32) for xlen in [40, 32]]
+    utt_ids = ['utt1', 'utt2']
+
+    # reference without cache
+    params['recog_cache_encoder_outputs'] = False
+    hyps_ref = {task: model.decode(xs, params, None, utt_ids=utt_ids, task=task)[0]
+                for task in ['ys', 'ys_sub1']}
+    assert len(n_calls) == 2
+
+    # the main task and the sub task share a single encoder pass
+    n_calls.clear()
+    params['recog_cache_encoder_outputs'] = True
+    for task in ['ys', 'ys_sub1', 'ys']:
+        hyps = model.decode(xs, params, None, utt_ids=utt_ids, task=task)[0]
+        assert hyps == hyps_ref[task]
+    assert len(n_calls) == 1
+
+    # different utterances
+    model.decode(xs[:1], params, None, utt_ids=utt_ids[:1], task='ys')
+    assert len(n_calls) == 2
+
+    model.decode(xs[:1], params, None, utt_ids=utt_ids[:1], task='ys')
+    assert len(n_calls) == 2
+
+    # parameter update (training step) invalidates the cache
+    model.reset_encoder_cache()
+    model.decode(xs[:1], params, None, utt_ids=utt_ids[:1], task='ys')
+    assert len(n_calls) == 3
+
+
+@pytest.mark.parametrize("enc_type", ['blstm', 'transformer'])
+def test_plot_attention(enc_type, tmpdir):
+    model, _ = make_model(enc_type)
+    model.save_path = str(tmpdir)
+
+    xs = [np.random.randn(xlen, INPUT_DIM).astype(np.float32) for xlen in [40, 32]]
+    batch = {'xs': xs, 'ys': [[1, 2, 3], [4, 5]], 'ys_sub1': [[1, 2, 3, 4], [5, 6]],
+             'utt_ids': ['utt1', 'utt2'], 'speakers': ['spk1', 'spk2'], 'trigger_points': None}
+    model.eval()
+    with torch.no_grad():
+        model(batch, task='all', is_eval=True)
+    model.plot_attention()
+
+    # attention weights in the encoder are plotted by AttentionPlotter
+    assert sorted(tmpdir.listdir()) == [tmpdir.join('dec_att_weights')]
+    assert len(tmpdir.join('dec_att_weights').listdir()) > 0
+
+
+@pytest.mark.parametrize(
+    "enc_type, enc_args",
+    [
+        ('conv_uni_transformer', {'conv_channels': "4_4", 'conv_kernel_sizes': "(3,3)_(3,3)",
+                                  'conv_strides': "(1,1)_(1,1)", 'conv_poolings': "(2,2)_(2,2)"}),
+        ('transformer', {'enc_n_layers_sub1': 0, 'lc_type': 'mask',
+                         'lc_chunk_size_left': "16", 'lc_chunk_size_current': "8"}),
+    ]
+)
+def test_encode_streaming_block(enc_type, enc_args):
+    model, params = make_model(enc_type, **enc_args)
+    model.eval()
+    params['recog_block_sync_size'] = 12
+    assert model._block_processing_available()
+
+    x = np.random.randn(45, INPUT_DIM).astype(np.float32)
+    with torch.no_grad():
+        eout_ref = model.encode([x], 'ys')['ys']['xs']
+        eout, elens = model.encode_streaming([x], params)
+    assert eout.size() == eout_ref.size()
+    assert torch.allclose(eout, eout_ref, atol=1e-5)
+    assert elens.tolist() == [eout_ref.size(1)]
+
+
+def test_encode_streaming_frontend_incremental():
+    model, params = make_model('conv_uni_transformer',
+                               conv_channels="4_4", conv_kernel_sizes="(3,3)_(3,3)",
+                               conv_strides="(1,1)_(1,1)", conv_poolings="(2,2)_(2,2)")
+    model.eval()
+    params['recog_block_sync_size'] = 12
+
+    n_frames = []
+    forward_incremental = model.enc.conv.forward_incremental
+
+    def forward_incremental_hook(xs, *args, **kwargs):
+        n_frames.append(xs.size(1))
+        return forward_incremental(xs, *args, **kwargs)
+
+    model.enc.conv.forward_incremental = forward_incremental_hook
+    n_calls_offline = []
+    model.enc.conv.register_forward_hook(lambda *args: n_calls_offline.append(1))
+
+    x = np.random.randn(45, INPUT_DIM).astype(np.float32)
+    with torch.no_grad():
+        model.encode_streaming([x], params)
+    # the frontend CNN processes only new frames without recomputing context frames
+    assert n_frames == [12, 12, 12, 9]
+    assert len(n_calls_offline) == 0
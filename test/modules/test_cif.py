@@ -87,3 +87,120 @@ def test_forward_incremental(args):
         assert isinstance(attn_state, dict)
         alpha = attn_state['alpha']
         assert alpha.size() == (batch_size, xmax)
+
+
+def integrate_and_fire_reference(eouts, elens, alpha_norm, ylens, ymax, beta, mode):
+    """Recursion over frames in the original implementation of CIF.forward."""
+    bs, xmax, enc_dim = eouts.size()
+    cv = eouts.new_zeros(bs, ymax + 1, enc_dim)
+    aws = eouts.new_zeros(bs, ymax + 1, xmax)
+    n_tokens = torch.zeros(bs, dtype=torch.int64)
+    state = eouts.new_zeros(bs, enc_dim)
+    alpha_accum = eouts.new_zeros(bs)
+    for j in range(xmax):
+        alpha_accum_prev = alpha_accum
+        alpha_accum += alpha_norm[:, j]
+
+        if mode == 'parallel' and (alpha_accum >= beta).sum() == 0:
+            # No boundary is located in all utterances in mini-batch
+            # Carry over to the next frame
+            state += alpha_norm[:, j, None] * eouts[:, j]
+            aws[:, n_tokens, j] += alpha_norm[:, j]
+        else:
+            for b in range(bs):
+                # skip the padding region
+                if j > elens[b] - 1:
+                    continue
+
+                # skip all-fired utterance
+                if mode == 'parallel' and n_tokens[b].item() >= ylens[b]:
+                    continue
+
+                if alpha_accum[b] < beta:
+                    # No boundary is located
+                    # Carry over to the next frame
+                    state[b] += alpha_norm[b, j, None] * eouts[b, j]
+                    aws[b, n_tokens[b], j] += alpha_norm[b, j]
+
+                    # tail handling
+                    if mode == 'incremental' and j == elens[b] - 1:
+                        if alpha_accum[b] >= 0.5:
+                            n_tokens[b] += 1
+                            cv[b, n_tokens[b]] = state[b]
+                        break
+                else:
+                    # A boundary is located
+                    ak1 = 1 - alpha_accum_prev[b]
+                    ak2 = alpha_norm[b, j] - ak1
+                    cv[b, n_tokens[b]] = state[b] + ak1 * eouts[b, j]
+                    aws[b, n_tokens[b], j] += ak1
+                    n_tokens[b] += 1
+                    # Carry over to the next frame
+                    state[b] = ak2 * eouts[b, j]
+                    alpha_accum[b] = ak2
+                    aws[b, n_tokens[b], j] += ak2
+
+                    if mode == 'incremental':
+                        break
+
+            if mode == 'incremental' and n_tokens[0] >= 1:
+                break
+
+    return cv[:, :ymax], aws[:, :ymax]
+
+
+@pytest.mark.parametrize(
+    "threshold, elens, ylens",
+    [
+        (1.0, [40], [5]),
+        (1.0, [40, 33, 17, 3], [5, 9, 2, 1]),
+        (0.9, [40, 33, 17, 3], [5, 9, 2, 1]),
+        (1.0, [40, 40], [20, 39]),  # some weights are larger than 1
+        (0.9, [40, 40], [20, 39]),
+        (1.0, [40, 38, 40, 20], [3, 3, 3, 0]),  # frames without boundaries in any utterance
+        (0.5, [40, 30], [4, 2]),  # weights after all tokens are fired
+    ]
+)
+def test_integrate_and_fire(threshold, elens, ylens):
+    args = make_args(threshold=threshold)
+    torch.manual_seed(0)
+
+    batch_size = len(elens)
+    xmax = max(elens)
+    eouts = torch.randn(batch_size, xmax, args['enc_dim'], dtype=torch.float64)
+    elens = torch.IntTensor(elens)
+    ylens = torch.IntTensor(ylens)
+
+    module = importlib.import_module('neural_sp.models.modules.cif')
+    cif = module.CIF(**args).double()
+    cif.train()
+
+    for mode in ['parallel', 'incremental']:
+        if mode == 'incremental':
+            # NOTE: original weights are used
+            eouts = eouts[:1] * 10
+            elens, ylens = elens[:1], None
+        cv, aws, attn_state = cif(eouts, elens, ylens, mode=mode)
+        if mode == 'parallel':
+            alpha_norm = attn_state['alpha'] / attn_state['alpha'].sum(1, keepdim=True) * ylens.unsqueeze(1)
+            ymax = max(ylens)
+        else:
+            alpha_norm = attn_state['alpha']
+            ymax = 1
+        alpha_norm = alpha_norm.detach().clone().requires_grad_()
+        cv_ref, aws_ref = integrate_and_fire_reference(eouts, elens, alpha_norm, ylens, ymax,
+                                                       threshold, mode)
+        assert cv.size() == cv_ref.size()
+        assert aws.size() == aws_ref.size()
+        assert torch.allclose(aws, aws_ref, atol=1e-10)
+        assert torch.allclose(cv, cv_ref, atol=1e-10)
+
+        # gradients w.r.t. the normalized weights
+        alpha_norm_new = alpha_norm.detach().clone().requires_grad_()
+        cv_new, aws_new = module.integrate_and_fire(
+            eouts, alpha_norm_new, threshold, elens, ylens if mode == 'parallel' else torch.ones(1),
+            ymax, share_carry_over=(mode == 'parallel'))
+        w = torch.randn_like(cv_new)
+        (cv_ref * w).sum().backward()
+        (cv_new * w).sum().backward()
+        assert torch.allclose(alpha_norm_new.grad, alpha_norm.grad, atol=1e-10)
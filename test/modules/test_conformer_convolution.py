@@ -64,3 +64,44 @@ def test_forward(args):
             assert out.size() == out_incremental.size()
             if not torch.allclose(out, out_incremental, equal_nan=True):
                 warnings.warn("Incremental output did not match.", UserWarning)
+
+
+@pytest.mark.parametrize(
+    "args, chunk_size",
+    [
+        ({'kernel_size': 3}, 1),
+        ({'kernel_size': 7}, 1),
+        ({'kernel_size': 7}, 4),
+        ({'kernel_size': 7}, 16),
+        ({'kernel_size': 31}, 5),
+        ({'kernel_size': 7, 'normalization': 'group_norm'}, 4),
+        ({'kernel_size': 7, 'normalization': 'layer_norm'}, 4),
+    ]
+)
+def test_forward_incremental(args, chunk_size):
+    args = make_args(**args)
+    args['causal'] = True
+
+    batch_size = 4
+    xmax = 45
+    device = "cpu"
+
+    module = importlib.import_module('neural_sp.models.modules.conformer_convolution')
+    conv = module.ConformerConvBlock(**args)
+    conv = conv.to(device)
+    conv.eval()
+
+    xs = torch.randn(batch_size, xmax, args['d_model'], device=device)
+    with torch.no_grad():
+        out = conv(xs)
+
+        # each chunk is computed with cached inputs of depthwise conv only
+        out_incremental = []
+        cache = None
+        for t in range(0, xmax, chunk_size):
+            out_chunk, cache = conv.forward_incremental(xs[:, t:t + chunk_size], cache)
+            assert out_chunk.size() == (batch_size, min(chunk_size, xmax - t), args['d_model'])
+            assert cache.size() == (batch_size, args['d_model'], args['kernel_size'] - 1)
+            out_incremental.append(out_chunk)
+        out_incremental = torch.cat(out_incremental, dim=1)
+    assert torch.allclose(out, out_incremental, atol=1e-6)
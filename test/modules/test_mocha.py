@@ -6,6 +6,18 @@
 import importlib
 import pytest
 import torch
+import torch.nn.functional as F
+
+from neural_sp.models.modules.mocha.hma_train import (
+    parallel_monotonic_attention,
+    safe_cumprod
+)
+from neural_sp.models.modules.mocha.mocha_train import (
+    moving_sum,
+    soft_chunkwise_attention
+)
+
+torch.manual_seed(0)
 
 
 def make_args(**kwargs):
@@ -170,3 +182,129 @@ def test_forward_hard(args):
             if args['chunk_size'] > 1:
                 assert beta is not None
                 assert beta.size() == (bs, args['n_heads_mono'] * args['n_heads_chunk'], 1, klen)
+
+
+def parallel_monotonic_attention_reference(e_ma, aw_prev, trigger_points, eps,
+                                           no_denom, lookahead, stableemit_weight):
+    """Recurrence over output steps building the autograd graph at every step."""
+    p_choose = torch.sigmoid(e_ma)
+    if stableemit_weight > 0:
+        p_choose = (1 - stableemit_weight) * p_choose
+    cumprod_1mp_choose = safe_cumprod(1 - p_choose, eps=eps)
+    alpha = []
+    for i in range(e_ma.size(2)):
+        denom = 1 if no_denom else torch.clamp(
+            cumprod_1mp_choose[:, :, i:i + 1], min=eps, max=1.0)
+        aw_prev = p_choose[:, :, i:i + 1] * cumprod_1mp_choose[:, :, i:i + 1] * \
+            torch.cumsum(aw_prev / denom, dim=-1)
+        if trigger_points is not None:
+            aw_prev = aw_prev.clone()
+            for b in range(e_ma.size(0)):
+                aw_prev[b, :, :, trigger_points[b, i:i + 1] + lookahead + 1:] = 0
+        alpha.append(aw_prev)
+    return torch.cat(alpha, dim=2), p_choose
+
+
+def moving_sum_reference(x, back, forward):
+    """Moving sum as a padded 1D convolution with ones."""
+    bs, n_heads_mono, n_heads_chunk, qlen, klen = x.size()
+    x_padded = F.pad(x.reshape(-1, klen), pad=[back, forward]).unsqueeze(1)
+    x_sum = F.conv1d(x_padded, x.new_ones(1, 1, back + forward + 1))
+    return x_sum.squeeze(1).view(bs, n_heads_mono, n_heads_chunk, qlen, -1)
+
+
+@pytest.mark.parametrize(
+    "H_ma, qlen, no_denom, decot, stableemit_weight, eps",
+    [
+        (1, 1, False, False, 0., 1e-6),
+        (1, 8, False, False, 0., 1e-6),
+        (4, 8, False, False, 0., 1e-6),
+        (4, 8, True, False, 0., 1e-6),
+        (4, 8, False, True, 0., 1e-6),
+        (4, 8, False, False, 0.1, 1e-6),
+        (4, 8, False, False, 0., 1e-2),  # denominators are clamped
+    ]
+)
+def test_parallel_monotonic_attention(H_ma, qlen, no_denom, decot, stableemit_weight, eps):
+    bs, klen = 3, 30
+    lookahead = 2
+    e_ma = torch.randn(bs, H_ma, qlen, klen, dtype=torch.float64) * 2 - 1
+    aw_prev = torch.softmax(torch.randn(bs, H_ma, 1, klen, dtype=torch.float64), dim=-1)
+    trigger_points = None
+    if decot:
+        trigger_points = torch.randint(-1, klen - lookahead, (bs, qlen)).sort(dim=-1)[0]
+
+    outs, grads = [], []
+    for fn in [parallel_monotonic_attention, parallel_monotonic_attention_reference]:
+        e_ma_i = e_ma.clone().requires_grad_()
+        aw_prev_i = aw_prev.clone().requires_grad_()
+        if fn is parallel_monotonic_attention:
+            alpha, p_choose = fn(e_ma_i, aw_prev_i, trigger_points, eps, 0.,
+                                 no_denom, decot, lookahead, stableemit_weight)
+        else:
+            alpha, p_choose = fn(e_ma_i, aw_prev_i, trigger_points, eps,
+                                 no_denom, lookahead, stableemit_weight)
+        assert alpha.size() == (bs, H_ma, qlen, klen)
+        # weighted sum to propagate different gradients to every position
+        w = torch.arange(alpha.numel(), dtype=alpha.dtype).view(alpha.size()) % 7
+        (alpha * w).sum().backward()
+        outs.append(alpha.detach())
+        grads.append((e_ma_i.grad, aw_prev_i.grad))
+
+    assert torch.allclose(outs[0], outs[1], atol=1e-10)
+    for g, g_ref in zip(grads[0], grads[1]):
+        assert torch.allclose(g, g_ref, atol=1e-8)
+
+
+def test_parallel_monotonic_attention_gradcheck():
+    e_ma = torch.randn(2, 2, 4, 6, dtype=torch.float64, requires_grad=True)
+    aw_prev = torch.rand(2, 2, 1, 6, dtype=torch.float64, requires_grad=True)
+    assert torch.autograd.gradcheck(
+        lambda e, a: parallel_monotonic_attention(e, a, None, 1e-6, 0., False, False, 0, 0.)[0],
+        (e_ma, aw_prev))
+
+
+@pytest.mark.parametrize(
+    "back, forward",
+    [(0, 0), (3, 0), (0, 3), (2, 5), (7, 8), (0, 15), (0, 19), (19, 0), (0, 100), (100, 0)]
+)
+def test_moving_sum(back, forward):
+    x = torch.rand(2, 3, 2, 4, 20)
+    assert torch.allclose(moving_sum(x, back, forward),
+                          moving_sum_reference(x, min(back, 19), min(forward, 19)), atol=1e-5)
+
+
+@pytest.mark.parametrize(
+    "H_ma, H_ca, chunk_size, share",
+    [
+        (1, 1, 4, True),
+        (1, 1, -1, True),
+        (4, 1, 4, True),
+        (1, 4, 4, True),
+        (4, 4, 4, True),
+        (4, 4, 4, False),
+        (4, 4, -1, False),
+    ]
+)
+def test_soft_chunkwise_attention(H_ma, H_ca, chunk_size, share):
+    bs, qlen, klen = 2, 5, 24
+    alpha = torch.softmax(torch.randn(bs, H_ma, qlen, klen), dim=-1)
+    u = torch.randn(bs, H_ca if share else H_ma * H_ca, qlen, klen)
+
+    beta = soft_chunkwise_attention(alpha, u.clone(), None, chunk_size, H_ca, 1.0, share)
+
+    # reference with alpha repeated over CA heads and the convolutional moving sum
+    alpha_ref = alpha.unsqueeze(2).repeat([1, 1, H_ca, 1, 1])
+    u_ref = u.unsqueeze(1)
+    if H_ma > 1 and not share:
+        u_ref = u_ref.view(bs, H_ma, H_ca, qlen, klen)
+    softmax_exp = torch.clamp(torch.exp(u_ref - u_ref.max(dim=-1, keepdim=True)[0]), min=1e-5)
+    if chunk_size == -1:
+        denom = torch.cumsum(softmax_exp, dim=-1)
+        beta_ref = softmax_exp * moving_sum_reference(alpha_ref / denom, 0, klen - 1)
+    else:
+        denom = moving_sum_reference(softmax_exp, chunk_size - 1, 0)
+        beta_ref = softmax_exp * moving_sum_reference(alpha_ref / denom, 0, chunk_size - 1)
+    beta_ref = beta_ref.view(bs, -1, qlen, klen)
+    assert beta.size() == (bs, H_ma * H_ca, qlen, klen)
+    assert torch.allclose(beta, beta_ref, atol=1e-6)
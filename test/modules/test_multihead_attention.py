@@ -64,3 +64,91 @@ def test_forward(args):
         assert cv.size() == (batch_size, 1, value.size(2))
         assert aws.size() == (batch_size, args['n_heads'], 1, klen)
         assert isinstance(attn_state, dict)
+
+
+@pytest.mark.parametrize(
+    "args, qlen, mask_type",
+    [
+        ({}, 5, 'none'),
+        ({}, 5, 'pad'),
+        ({}, 40, 'causal'),
+        ({}, 40, 'pad_query'),
+        ({'n_heads': 1}, 5, 'pad'),
+        ({'bias': False}, 5, 'pad'),
+    ]
+)
+def test_forward_fused(args, qlen, mask_type):
+    args = make_args(**args)
+
+    batch_size = 4
+    klen = 40
+    key = torch.randn(batch_size, klen, args['kdim'])
+    query = torch.randn(batch_size, qlen, args['qdim'])
+    xlens = torch.IntTensor([40, 33, 17, 1])
+    mask = None
+    if mask_type != 'none':
+        mask = (torch.arange(klen).unsqueeze(0) < xlens.unsqueeze(1)).unsqueeze(1).repeat([1, qlen, 1])
+        if mask_type == 'causal':
+            mask = mask & torch.tril(torch.ones(qlen, klen, dtype=torch.bool)).unsqueeze(0)
+        elif mask_type == 'pad_query':
+            # some queries cannot attend to any keys
+            mask = mask & (torch.arange(qlen).unsqueeze(0) < xlens.unsqueeze(1)).unsqueeze(2)
+        mask = mask.byte()
+
+    module = importlib.import_module('neural_sp.models.modules.multihead_attention')
+    attention = module.MultiheadAttentionMechanism(**args)
+    attention.eval()
+    with torch.no_grad():
+        cv_ref, aws, _ = attention(key, key, query, mask=mask)
+        cv, aws_fused, _ = attention(key, key, query, mask=mask, need_weights=False)
+    assert aws.size() == (batch_size, args['n_heads'], qlen, klen)
+    assert aws_fused is None
+    assert torch.allclose(cv, cv_ref, atol=1e-6)
+
+    # gradients match without dropout
+    # NOTE: except for fully-masked queries, which are padding
+    valid = torch.ones(batch_size, qlen, 1) if mask is None else mask.max(2, keepdim=True)[0].float()
+    attention.train()
+    attention.dropout_attn.p = 0.
+    grads = []
+    for need_weights in [True, False]:
+        attention.zero_grad()
+        cv = attention(key, key, query, mask=mask, need_weights=need_weights)[0]
+        (cv * valid).sum().backward()
+        grads.append(attention.w_query.weight.grad.clone())
+    assert torch.allclose(grads[0], grads[1], atol=1e-5)
+
+
+@pytest.mark.parametrize(
+    "max_len, chunk_sizes",
+    [
+        (12, [5] * 10),
+        (12, [1] * 30),
+        (12, [3, 20, 7, 1, 12]),
+        (8, [8] * 4),
+        (0, [4] * 3),
+    ]
+)
+def test_kv_ring_buffer(max_len, chunk_sizes):
+    batch_size = 2
+    n_heads = 4
+    d_k = 8
+
+    module = importlib.import_module('neural_sp.models.modules.multihead_attention')
+    kv_cache = module.init_kv_ring_buffer(max_len)
+    keys = []
+    for L in chunk_sizes:
+        key = torch.randn(batch_size, n_heads, L, d_k)
+        keys.append(key)
+        kv_cache = module.update_kv_ring_buffer(kv_cache, key, key * 2, min_capacity=4)
+        keys_all = torch.cat(keys, dim=2)
+        n_valid = min(max_len, keys_all.size(2))
+        assert kv_cache['len'] == n_valid
+        if n_valid == 0:
+            continue
+        assert kv_cache['key'].size(2) <= max_len
+        # restore the chronological order from the oldest entry
+        capacity = kv_cache['key'].size(2)
+        idx = (kv_cache['offset'] + torch.arange(n_valid)) % capacity
+        assert torch.equal(kv_cache['key'].index_select(2, idx), keys_all[:, :, -n_valid:])
+        assert torch.equal(kv_cache['value'].index_select(2, idx), keys_all[:, :, -n_valid:] * 2)
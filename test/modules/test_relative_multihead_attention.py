@@ -103,3 +103,53 @@ def test_forward(args):
     assert cv.size() == cv_incremental.size()
     if not torch.allclose(cv, cv_incremental, equal_nan=True):
         warnings.warn("Incremental output did not match.", UserWarning)
+
+
+def rel_shift_reference(xs, mem_offset=0, clamp_len=-1):
+    """Reference implementation of the relative shift with explicit loops."""
+    bs, qlen, klen, n_heads = xs.size()
+    mlen = klen - qlen
+    xs_shifted = torch.zeros_like(xs)
+    for i in range(qlen):
+        for j in range(klen):
+            # chronological position of the j-th key
+            pos = (j - mem_offset) % mlen if j < mlen else j
+            rel_pos = abs(mlen + i - pos)
+            if clamp_len > 0:
+                rel_pos = min(rel_pos, clamp_len)
+            xs_shifted[:, i, j] = xs[:, i, rel_pos]
+    return xs_shifted
+
+
+@pytest.mark.parametrize(
+    "qlen, mlen, mem_offset, clamp_len",
+    [
+        (1, 0, 0, -1),
+        (7, 0, 0, -1),
+        (7, 0, 0, 3),
+        (1, 12, 0, -1),
+        (5, 12, 0, -1),
+        (5, 12, 7, -1),
+        (5, 12, 11, 4),
+        (12, 5, 3, -1),
+    ]
+)
+def test_rel_shift(qlen, mlen, mem_offset, clamp_len):
+    batch_size = 2
+    n_heads = 4
+    args = make_args(n_heads=n_heads, clamp_len=clamp_len)
+
+    module_mha = importlib.import_module('neural_sp.models.modules.relative_multihead_attention')
+    attention = module_mha.RelativeMultiheadAttentionMechanism(**args)
+
+    xs = torch.randn(batch_size, qlen, mlen + qlen, n_heads)
+    xs_shifted_ref = rel_shift_reference(xs, mem_offset, clamp_len)
+    for _ in range(2):  # the second call hits the cache
+        xs_shifted = attention._rel_shift(xs, mem_offset)
+        assert torch.equal(xs_shifted, xs_shifted_ref)
+
+    # traced graphs generalize to different lengths
+    traced = torch.jit.trace(lambda x: attention._rel_shift(x, mem_offset), (xs,), check_trace=False)
+    for qlen_new, mlen_new in [(qlen, mlen), (qlen + 2, mlen + 3), (qlen + 5, mlen + 1)]:
+        xs = torch.randn(batch_size, qlen_new, mlen_new + qlen_new, n_heads)
+        assert torch.equal(traced(xs), rel_shift_reference(xs, mem_offset, clamp_len))
@@ -0,0 +1,102 @@
+#! /usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""Test for capturing and plotting attention weights during training."""
+
+import math
+import os
+import pytest
+import torch
+
+from neural_sp.models.seq2seq.encoders.transformer import TransformerEncoder
+from neural_sp.trainers.attention_capture import (
+    AttentionCapture,
+    AttentionPlotter
+)
+
+torch.manual_seed(0)
+
+
+def make_encoder(n_layers=3):
+    return TransformerEncoder(
+        input_dim=16, enc_type='transformer', n_heads=4, n_layers=n_layers,
+        n_layers_sub1=0, n_layers_sub2=0, d_model=8, d_ff=16, ffn_bottleneck_dim=0,
+        ffn_activation='relu', pe_type='add', layer_norm_eps=1e-12, last_proj_dim=0,
+        dropout_in=0.1, dropout=0.1, dropout_att=0.1, dropout_layer=0.,
+        subsample="1_1_1", subsample_type='max_pool', n_stacks=1, n_splices=1,
+        frontend_conv=None, task_specific_layer=False, param_init='xavier_uniform',
+        clamp_len=-1, lookahead="0", chunk_size_left="0", chunk_size_current="0",
+        chunk_size_right="0", streaming_type='mask')
+
+
+@pytest.mark.parametrize(
+    "layers, heads, utt_ids, max_len",
+    [
+        ("", "", "0", 256),
+        ("1", "0_2", "0_-1", 16),
+        ("0_2", "3", "1", 7),
+        ("", "", "0_5", 100),  # out-of-range utterances are ignored
+    ]
+)
+def test_capture(layers, heads, utt_ids, max_len):
+    enc = make_encoder()
+    capture = AttentionCapture(layers, heads, utt_ids, max_len).attach(enc)
+
+    bs, xmax = 3, 100
+    xs = torch.randn(bs, xmax, 16)
+    xlens = torch.IntTensor([100, 80, 50])
+
+    # nothing is captured unless enabled, and the fused kernel is used
+    enc.eval()
+    with torch.no_grad():
+        enc(xs, xlens, task='all')
+    assert capture.pop() == {}
+    assert all(layer.xx_aws is None for layer in enc.layers)
+
+    with capture(enabled=True), torch.no_grad():
+        assert all(layer.need_weights == (layers == "" or str(lth) in layers.split('_'))
+                   for lth, layer in enumerate(enc.layers))
+        enc(xs, xlens, task='all')
+    assert not capture.enabled
+    assert not any(layer.need_weights for layer in enc.layers)
+    aws_dict = capture.pop()
+    assert capture.pop() == {}
+
+    n_layers = 3 if layers == "" else len(layers.split('_'))
+    n_heads = 4 if heads == "" else len(heads.split('_'))
+    n_utts = len([b for b in map(int, utt_ids.split('_')) if -bs <= b < bs])
+    stride = math.ceil(xmax / max_len)
+    assert len(aws_dict) == n_layers
+    for k, aws in aws_dict.items():
+        assert k.endswith('.xx_aws')
+        if layers != "":
+            assert int(k.split('.')[-2]) in map(int, layers.split('_'))
+        assert aws.dtype.name == 'float16'
+        assert aws.shape == (n_utts, n_heads, math.ceil(xmax / stride), math.ceil(xmax / stride))
+        # the first utterance/head is downsampled by average pooling
+        lth = int(k.split('.')[-2])
+        b = int(utt_ids.split('_')[0])
+        h = 0 if heads == "" else int(heads.split('_')[0])
+        aw_ref = enc.layers[lth].xx_aws[b, h, :stride, :stride].mean()
+        assert abs(float(aws[0, 0, 0, 0]) - aw_ref.item()) < 1e-3
+
+    capture.detach()
+    with capture(enabled=True), torch.no_grad():
+        enc(xs, xlens, task='all')
+    assert capture.pop() == {}
+
+
+def test_plotter(tmpdir):
+    enc = make_encoder(n_layers=2)
+    capture = AttentionCapture(heads="0_1", utt_ids="0_1", max_len=32).attach(enc)
+    enc.eval()
+    with capture(enabled=True), torch.no_grad():
+        enc(torch.randn(2, 40, 16), torch.IntTensor([40, 30]), task='all')
+
+    save_path = os.path.join(str(tmpdir), 'att_weights')
+    plotter = AttentionPlotter()
+    assert plotter.put(capture.pop(), save_path)
+    assert not plotter.put({}, save_path)
+    plotter.wait()
+    assert sorted(os.listdir(save_path)) == ['layers.%d.xx_aws_utt%d.png' % (lth, b)
+                                             for lth in range(2) for b in range(2)]
@@ -0,0 +1,84 @@
+#! /usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""Test for saving checkpoints in LRScheduler."""
+
+import os
+import pytest
+import torch
+import torch.nn as nn
+
+from neural_sp.trainers.lr_scheduler import LRScheduler
+from neural_sp.trainers.optimizer import set_optimizer
+
+
+class Wrapper(nn.Module):
+    """Mimic DataParallel, whose checkpoints are saved via `module`."""
+
+    def __init__(self, module):
+        super(Wrapper, self).__init__()
+        self.module = module
+
+
+def make_scheduler(model, save_checkpoints_async):
+    optimizer = set_optimizer(model, 'adam', 1e-3, 0)
+    return LRScheduler(optimizer, 1e-3,
+                       decay_type='metric',
+                       decay_start_epoch=1,
+                       decay_rate=0.5,
+                       save_checkpoints_topk=2,
+                       save_checkpoints_async=save_checkpoints_async)
+
+
+@pytest.mark.parametrize("save_checkpoints_async", [False, True])
+def test_save_checkpoint(tmpdir, save_checkpoints_async):
+    save_path = str(tmpdir)
+    torch.manual_seed(0)
+    model = nn.Sequential(nn.Linear(4, 8), nn.BatchNorm1d(8), nn.Linear(8, 2))
+    scheduler = make_scheduler(model, save_checkpoints_async)
+
+    state_dicts = {}
+    for metric in [3.0, 2.0, 4.0, 1.0]:
+        scheduler.epoch(metric)
+        if scheduler.is_topk:
+            scheduler.save_checkpoint(Wrapper(model), save_path)
+            state_dicts[scheduler.n_epochs] = {k: v.clone() for k, v in model.state_dict().items()}
+        # keep training while the checkpoint is written
+        with torch.no_grad():
+            for p in model.parameters():
+                p.add_(1.0)
+    scheduler.wait_checkpoint()
+
+    # only the top-k checkpoints remain, without temporary files
+    assert sorted(os.listdir(save_path)) == ['model.epoch-2', 'model.epoch-4']
+
+    for epoch in [2, 4]:
+        checkpoint = torch.load(os.path.join(save_path, 'model.epoch-%d' % epoch),
+                                map_location='cpu')
+        # parameters at the time of saving, regardless of later updates
+        for k, v in checkpoint['model_state_dict'].items():
+            assert torch.equal(v, state_dicts[epoch][k])
+        assert checkpoint['optimizer_state_dict']['_epoch'] == epoch
+        assert '_checkpoint_writer' not in checkpoint['optimizer_state_dict']
+
+    # resume from a checkpoint
+    scheduler_resumed = make_scheduler(model, save_checkpoints_async)
+    scheduler_resumed.load_state_dict(checkpoint['optimizer_state_dict'])
+    assert scheduler_resumed.n_epochs == 4
+    assert scheduler_resumed.topk_list == scheduler.topk_list
+
+
+@pytest.mark.parametrize("save_checkpoints_async", [False, True])
+def test_save_checkpoint_before_eval(tmpdir, save_checkpoints_async):
+    save_path = str(tmpdir)
+    model = nn.Linear(4, 2)
+    scheduler = make_scheduler(model, save_checkpoints_async)
+
+    # topk_list is empty before evaluation starts
+    for epoch in [1, 2, 3]:
+        scheduler.epoch()
+        assert scheduler.topk_list == []
+        scheduler.save_checkpoint(Wrapper(model), save_path)
+        scheduler.wait_checkpoint()
+        # the latest checkpoint is kept and the previous ones are removed
+        assert os.listdir(save_path) == ['model.epoch-%d' % epoch]
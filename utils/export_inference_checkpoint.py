@@ -0,0 +1,43 @@
+#! /usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Copyright 2021 Kyoto University (Hirofumi Inaguma)
+#  Apache 2.0  (http://www.apache.org/licenses/LICENSE-2.0)
+
+"""Export a model-only checkpoint for inference."""
+
+import argparse
+from distutils.util import strtobool
+import logging
+
+from neural_sp.bin.eval_utils import save_averaged_checkpoint
+from neural_sp.bin.train_utils import save_inference_checkpoint
+
+parser = argparse.ArgumentParser()
+parser.add_argument('--model', type=str,
+                    help='path to the saved model (model.epoch-*)')
+parser.add_argument('--n_average', type=int, default=1,
+                    help='number of checkpoints to average before exporting')
+parser.add_argument('--dtype', type=str, default='float16',
+                    choices=['float16', 'bfloat16', 'float32'],
+                    help='data type of parameters')
+parser.add_argument('--quantize', type=strtobool, default=False,
+                    help='apply dynamic int8 quantization when loading the model (CPU only)')
+parser.add_argument('--out', type=str,
+                    help='path to the inference checkpoint')
+args = parser.parse_args()
+
+
+def main():
+
+    logging.basicConfig(level=logging.INFO)
+
+    checkpoint_path = args.model
+    if args.n_average > 1 and 'avg' not in checkpoint_path:
+        checkpoint_path = save_averaged_checkpoint(checkpoint_path, args.n_average)
+    save_inference_checkpoint(checkpoint_path, args.out, dtype=args.dtype,
+                              quantize=bool(args.quantize))
+
+
+if __name__ == '__main__':
+    main()